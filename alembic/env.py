@@ -1,11 +1,12 @@
 from logging.config import fileConfig
-from database import Base
+from database import Base, DATABASE_URL
 from models import User, CreditRequest, ApprovalStage, CreditRequestWorkflow, WorkflowStage, CreditRequestApproval
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 from alembic import context
 
 config = context.config
+config.set_main_option("sqlalchemy.url", DATABASE_URL)
 
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
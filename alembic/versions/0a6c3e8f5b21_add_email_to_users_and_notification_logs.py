@@ -0,0 +1,41 @@
+"""add email to users and notification logs
+
+Revision ID: 0a6c3e8f5b21
+Revises: f7b2d4e6a813
+Create Date: 2026-10-19 10:03:27.540961
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a6c3e8f5b21'
+down_revision: Union[str, None] = 'f7b2d4e6a813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('email', sa.String(), nullable=True))
+    # notification_logs was only ever created by `python models.py` (create_all).
+    if not sa.inspect(op.get_bind()).has_table('notification_logs'):
+        op.create_table('notification_logs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('notification_type', sa.String(), nullable=False),
+        sa.Column('destination', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('message', sa.Text(), nullable=True),
+        sa.Column('response', sa.Text(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade() -> None:
+    # Left in place: upgrade() may have found notification_logs already there, and
+    # cannot record whether it created it. Upgrading again tolerates the table.
+    op.drop_column('users', 'email')
@@ -0,0 +1,35 @@
+"""add cancelled approval status
+
+Revision ID: 3b8e1d5f7c24
+Revises: 0a6c3e8f5b21
+Create Date: 2026-10-19 14:22:51.083417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8e1d5f7c24'
+down_revision: Union[str, None] = '0a6c3e8f5b21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Only PostgreSQL has a native enum type; elsewhere approvalstatus is a plain VARCHAR.
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE approvalstatus ADD VALUE IF NOT EXISTS 'CANCELLED'")
+    # Stages left pending behind a rejection can never be decided.
+    op.execute(
+        "UPDATE credit_request_approvals SET status = 'CANCELLED' "
+        "WHERE status = 'PENDING' AND credit_request_id IN "
+        "(SELECT id FROM credit_requests WHERE status IN ('APPROVED', 'REJECTED'))"
+    )
+
+
+def downgrade() -> None:
+    # PostgreSQL cannot drop enum values; put the rows back the way older code left them.
+    op.execute("UPDATE credit_request_approvals SET status = 'PENDING' WHERE status = 'CANCELLED'")
@@ -0,0 +1,26 @@
+"""add bureau_result to credit_requests
+
+Revision ID: 5b1e0c7f2a91
+Revises: 13a9944ffd9f
+Create Date: 2026-10-18 09:12:31.482113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1e0c7f2a91'
+down_revision: Union[str, None] = '13a9944ffd9f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('credit_requests', sa.Column('bureau_result', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('credit_requests', 'bureau_result')
@@ -0,0 +1,32 @@
+"""track screening enqueues
+
+Revision ID: 5d9a2c7e4f18
+Revises: 3b8e1d5f7c24
+Create Date: 2026-10-19 15:07:33.614208
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d9a2c7e4f18'
+down_revision: Union[str, None] = '3b8e1d5f7c24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('credit_requests', sa.Column('screening_enqueued_at', sa.DateTime(), nullable=True))
+    op.add_column('credit_requests', sa.Column('screening_attempts', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        "UPDATE credit_requests SET screening_enqueued_at = created_at, screening_attempts = 1 "
+        "WHERE status = 'SCREENING'"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('credit_requests', 'screening_attempts')
+    op.drop_column('credit_requests', 'screening_enqueued_at')
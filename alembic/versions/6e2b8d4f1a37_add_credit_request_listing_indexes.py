@@ -0,0 +1,31 @@
+"""add credit request listing indexes
+
+Revision ID: 6e2b8d4f1a37
+Revises: a4d61f0c8b27
+Create Date: 2026-10-18 16:05:41.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e2b8d4f1a37'
+down_revision: Union[str, None] = 'a4d61f0c8b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_credit_requests_created_at_id', 'credit_requests', ['created_at', 'id'], unique=False)
+    op.create_index('ix_credit_requests_status_created_at_id', 'credit_requests', ['status', 'created_at', 'id'], unique=False)
+    op.create_index('ix_credit_requests_user_id_created_at_id', 'credit_requests', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_credit_requests_amount_created_at', 'credit_requests', ['amount', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_credit_requests_amount_created_at', table_name='credit_requests')
+    op.drop_index('ix_credit_requests_user_id_created_at_id', table_name='credit_requests')
+    op.drop_index('ix_credit_requests_status_created_at_id', table_name='credit_requests')
+    op.drop_index('ix_credit_requests_created_at_id', table_name='credit_requests')
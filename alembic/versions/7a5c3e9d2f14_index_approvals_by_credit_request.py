@@ -0,0 +1,25 @@
+"""index approvals by credit request
+
+Revision ID: 7a5c3e9d2f14
+Revises: d3f7a1b9c2e8
+Create Date: 2026-10-18 17:21:36.940512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a5c3e9d2f14'
+down_revision: Union[str, None] = 'd3f7a1b9c2e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_credit_request_approvals_credit_request_id'), 'credit_request_approvals', ['credit_request_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_credit_request_approvals_credit_request_id'), table_name='credit_request_approvals')
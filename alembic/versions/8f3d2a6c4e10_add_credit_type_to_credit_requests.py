@@ -0,0 +1,26 @@
+"""add credit_type to credit_requests
+
+Revision ID: 8f3d2a6c4e10
+Revises: 5b1e0c7f2a91
+Create Date: 2026-10-18 10:41:07.315902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3d2a6c4e10'
+down_revision: Union[str, None] = '5b1e0c7f2a91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('credit_requests', sa.Column('credit_type', sa.String(), nullable=False, server_default='pessoal'))
+
+
+def downgrade() -> None:
+    op.drop_column('credit_requests', 'credit_type')
@@ -0,0 +1,28 @@
+"""add rating and income to users
+
+Revision ID: a4d61f0c8b27
+Revises: 2c7a9e4b1d53
+Create Date: 2026-10-18 15:22:09.663140
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d61f0c8b27'
+down_revision: Union[str, None] = '2c7a9e4b1d53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('rating', sa.Float(), nullable=True))
+    op.add_column('users', sa.Column('income', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'income')
+    op.drop_column('users', 'rating')
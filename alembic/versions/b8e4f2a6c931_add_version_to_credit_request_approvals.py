@@ -0,0 +1,26 @@
+"""add version to credit request approvals
+
+Revision ID: b8e4f2a6c931
+Revises: 7a5c3e9d2f14
+Create Date: 2026-10-18 18:05:12.417306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e4f2a6c931'
+down_revision: Union[str, None] = '7a5c3e9d2f14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('credit_request_approvals', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('credit_request_approvals', 'version')
@@ -0,0 +1,29 @@
+"""add approval work queue indexes
+
+Revision ID: c2d9e5a7f310
+Revises: b8e4f2a6c931
+Create Date: 2026-10-18 19:02:47.218834
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2d9e5a7f310'
+down_revision: Union[str, None] = 'b8e4f2a6c931'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_credit_request_approvals_stage_id_status_id', 'credit_request_approvals', ['stage_id', 'status', 'id'], unique=False)
+    op.create_index('ix_credit_request_approvals_credit_request_id_status', 'credit_request_approvals', ['credit_request_id', 'status'], unique=False)
+    op.drop_index(op.f('ix_credit_request_approvals_credit_request_id'), table_name='credit_request_approvals')
+
+
+def downgrade() -> None:
+    op.create_index(op.f('ix_credit_request_approvals_credit_request_id'), 'credit_request_approvals', ['credit_request_id'], unique=False)
+    op.drop_index('ix_credit_request_approvals_credit_request_id_status', table_name='credit_request_approvals')
+    op.drop_index('ix_credit_request_approvals_stage_id_status_id', table_name='credit_request_approvals')
@@ -0,0 +1,38 @@
+"""create credit request counters
+
+Revision ID: d3f7a1b9c2e8
+Revises: 6e2b8d4f1a37
+Create Date: 2026-10-18 16:48:12.507319
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f7a1b9c2e8'
+down_revision: Union[str, None] = '6e2b8d4f1a37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('credit_request_counters',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', postgresql.ENUM('PENDING', 'APPROVED', 'REJECTED', name='approvalstatus', create_type=False), nullable=False),
+    sa.Column('credit_type', sa.String(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'status', 'credit_type')
+    )
+    op.execute(
+        "INSERT INTO credit_request_counters (day, status, credit_type, count) "
+        "SELECT date(created_at), status, credit_type, count(*) FROM credit_requests "
+        "WHERE created_at IS NOT NULL GROUP BY date(created_at), status, credit_type"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('credit_request_counters')
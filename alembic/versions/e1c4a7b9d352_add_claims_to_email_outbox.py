@@ -0,0 +1,28 @@
+"""add claims to email outbox
+
+Revision ID: e1c4a7b9d352
+Revises: 5d9a2c7e4f18
+Create Date: 2026-10-19 16:42:08.183527
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1c4a7b9d352'
+down_revision: Union[str, None] = '5d9a2c7e4f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('email_outbox', sa.Column('claimed_by', sa.String(), nullable=True))
+    op.add_column('email_outbox', sa.Column('claimed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('email_outbox', 'claimed_at')
+    op.drop_column('email_outbox', 'claimed_by')
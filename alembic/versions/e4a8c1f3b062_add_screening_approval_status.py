@@ -0,0 +1,30 @@
+"""add screening approval status
+
+Revision ID: e4a8c1f3b062
+Revises: c2d9e5a7f310
+Create Date: 2026-10-18 20:41:09.553120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a8c1f3b062'
+down_revision: Union[str, None] = 'c2d9e5a7f310'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Only PostgreSQL has a native enum type; elsewhere approvalstatus is a plain VARCHAR.
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE approvalstatus ADD VALUE IF NOT EXISTS 'SCREENING'")
+
+
+def downgrade() -> None:
+    # PostgreSQL cannot drop enum values. Let the workers finish every request in
+    # screening (with INTAKE_MODE=sync) before downgrading.
+    pass
@@ -0,0 +1,26 @@
+"""add cpf to users
+
+Revision ID: f7b2d4e6a813
+Revises: e4a8c1f3b062
+Create Date: 2026-10-19 09:12:40.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7b2d4e6a813'
+down_revision: Union[str, None] = 'e4a8c1f3b062'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('cpf', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'cpf')
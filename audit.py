@@ -0,0 +1,247 @@
+import atexit
+import datetime
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import insert
+
+from database import SessionLocal
+from models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+AUDIT_ENQUEUE_TIMEOUT = float(os.getenv("AUDIT_ENQUEUE_TIMEOUT", "0.5"))
+AUDIT_STRICT_ACTIONS = {a for a in os.getenv("AUDIT_STRICT_ACTIONS", "").split(",") if a}
+AUDIT_WRITE_ATTEMPTS = int(os.getenv("AUDIT_WRITE_ATTEMPTS", "5"))
+AUDIT_RETRY_BACKOFF = float(os.getenv("AUDIT_RETRY_BACKOFF", "0.2"))
+AUDIT_SPILL_PATH = os.getenv("AUDIT_SPILL_PATH", "audit-spill.jsonl")
+
+audit_queue_depth = Gauge("audit_queue_depth", "Audit entries waiting to be flushed")
+audit_flush_seconds = Histogram("audit_flush_seconds", "Time spent writing one audit batch")
+audit_entries = Counter("audit_entries_total", "Audit entries written", ["mode"])
+audit_spilled = Counter("audit_entries_spilled_total", "Audit entries written to the spill file after failed flushes")
+
+_STOP = object()
+
+
+class AuditBuffer:
+    """Queues audit entries and writes them in batches from a background thread.
+
+    A batch is flushed when it reaches `batch_size` entries or `flush_interval`
+    seconds after its first entry. When the queue is full, callers wait up to
+    `enqueue_timeout` and then write their entry synchronously. A batch that
+    cannot be written is retried with backoff and then appended to this
+    process's `<spill_path>.<pid>` file, which is loaded again when the writer
+    starts and on flush, so entries are never dropped. Files left behind by
+    processes that have exited are claimed and loaded the same way.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        maxsize=AUDIT_QUEUE_SIZE,
+        batch_size=AUDIT_BATCH_SIZE,
+        flush_interval=AUDIT_FLUSH_INTERVAL,
+        enqueue_timeout=AUDIT_ENQUEUE_TIMEOUT,
+        attempts=AUDIT_WRITE_ATTEMPTS,
+        backoff=AUDIT_RETRY_BACKOFF,
+        spill_path=AUDIT_SPILL_PATH,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.attempts = attempts
+        self.backoff = backoff
+        self.spill_path = spill_path
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def put(self, entry):
+        self.start()
+        try:
+            self._queue.put(entry, timeout=self.enqueue_timeout)
+        except queue.Full:
+            logger.warning("Audit queue full, writing entry synchronously")
+            self._write([entry])
+        audit_queue_depth.set(self._queue.qsize())
+
+    def flush(self):
+        """Write everything currently queued (and anything spilled earlier) from the calling thread."""
+        self.replay_spill()
+        batch = self._drain(self.batch_size, timeout=0)
+        while batch:
+            self._write(batch)
+            batch = self._drain(self.batch_size, timeout=0)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            try:
+                self._queue.put_nowait(_STOP)
+            except queue.Full:
+                pass
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        self.flush()
+
+    def _drain(self, limit, timeout):
+        batch = []
+        deadline = time.monotonic() + timeout
+        while len(batch) < limit:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    entry = self._queue.get(timeout=remaining)
+                else:
+                    entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                deadline = 0
+                continue
+            batch.append(entry)
+        audit_queue_depth.set(self._queue.qsize())
+        return batch
+
+    def _run(self):
+        self.replay_spill()
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if first is _STOP:
+                break
+            batch = [first] + self._drain(self.batch_size - 1, timeout=self.flush_interval)
+            self._write(batch)
+
+    def _write(self, entries):
+        started = time.perf_counter()
+        with self._write_lock:
+            for attempt in range(self.attempts):
+                if attempt:
+                    time.sleep(min(self.backoff * 2 ** (attempt - 1), 5.0))
+                if self._insert(entries):
+                    audit_flush_seconds.observe(time.perf_counter() - started)
+                    audit_entries.labels("buffered").inc(len(entries))
+                    return
+            self._spill(entries)
+
+    def _insert(self, entries):
+        db = self.session_factory()
+        try:
+            db.execute(insert(AuditLog), entries)
+            db.commit()
+            return True
+        except Exception:
+            db.rollback()
+            logger.warning(f"Failed to write {len(entries)} audit entries", exc_info=True)
+            return False
+        finally:
+            db.close()
+
+    def _spill(self, entries):
+        path = f"{self.spill_path}.{os.getpid()}"
+        with open(path, "a") as spill:
+            for entry in entries:
+                spill.write(json.dumps(entry, default=datetime.datetime.isoformat) + "\n")
+        audit_spilled.inc(len(entries))
+        logger.error(f"Spilled {len(entries)} audit entries to {path}")
+
+    def _spill_files(self):
+        """Spill files owned by this process or by processes that are gone; other live writers keep theirs."""
+        pid = os.getpid()
+        owned = []
+        for path in glob.glob(glob.escape(self.spill_path) + ".*"):
+            owner = path[len(self.spill_path) + 1:].split(".", 1)[0]
+            if owner.isdigit() and (int(owner) == pid or not _process_alive(int(owner))):
+                owned.append(path)
+        return sorted(owned)
+
+    def replay_spill(self):
+        """Writes entries spilled by earlier failed flushes; they stay on disk until the write succeeds.
+
+        Each file is renamed to a name unique to this call before it is read, so a
+        file is replayed by one process only and later spills go to a fresh file.
+        """
+        with self._write_lock:
+            for path in self._spill_files():
+                claimed = f"{self.spill_path}.{os.getpid()}.{uuid.uuid4().hex}.replay"
+                try:
+                    os.rename(path, claimed)
+                except FileNotFoundError:
+                    continue
+                with open(claimed) as spill:
+                    entries = [json.loads(line) for line in spill if line.strip()]
+                for entry in entries:
+                    if entry.get("timestamp"):
+                        entry["timestamp"] = datetime.datetime.fromisoformat(entry["timestamp"])
+                if entries and not self._insert(entries):
+                    return
+                os.remove(claimed)
+                if entries:
+                    audit_entries.labels("buffered").inc(len(entries))
+                    logger.info(f"Wrote {len(entries)} spilled audit entries from {path}")
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+audit_logger = AuditBuffer()
+atexit.register(audit_logger.stop)
+
+
+def log_audit(db, user_id, action, credit_request_id=None, details="", ip=None, strict=None):
+    entry = {
+        "user_id": user_id,
+        "action": action,
+        "credit_request_id": credit_request_id,
+        "details": details,
+        "ip": ip,
+        "timestamp": datetime.datetime.utcnow(),
+    }
+    if strict is None:
+        strict = action in AUDIT_STRICT_ACTIONS
+    if not strict:
+        audit_logger.put(entry)
+        return
+    if db is None:
+        db = SessionLocal()
+        try:
+            db.add(AuditLog(**entry))
+            db.commit()
+        finally:
+            db.close()
+    else:
+        db.add(AuditLog(**entry))
+        db.commit()
+    audit_entries.labels("strict").inc()
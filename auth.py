@@ -2,14 +2,36 @@ from fastapi import Depends, HTTPException, status, FastAPI
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from database import SessionLocal
+from database import ReadSessionLocal
 import models
 from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+from prometheus_client import Counter
+from redis_client import get_async_redis, get_redis
+from revocation import revocation_store
+from types import SimpleNamespace
+import collections
+import hashlib
+import logging
 import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
 
 SECRET_KEY = os.getenv("SECRET_KEY", "changeme")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_VERSION_KEY = "auth:principals:version"
+PRINCIPAL_VERSION_CHECK_INTERVAL = float(os.getenv("PRINCIPAL_VERSION_CHECK_INTERVAL", "1.0"))
+PRINCIPAL_REDIS_WARNING_INTERVAL = 60.0
+
+principal_cache_requests = Counter(
+    "principal_cache_requests_total", "Principal cache lookups in get_current_user", ["result"]
+)
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -21,10 +43,15 @@ def verify_password(plain_password: str, hashed_password: str):
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+def _load_user(username: str):
+    db = ReadSessionLocal()
+    try:
+        return db.query(models.User).filter(models.User.username == username).first()
+    finally:
+        db.close()
+
 def authenticate_user(username: str, password: str):
-    db = SessionLocal()
-    user = db.query(models.User).filter(models.User.username == username).first()
-    db.close()
+    user = _load_user(username)
     if not user or not verify_password(password, user.password):
         return None
     return user
@@ -33,11 +60,143 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
     to_encode.update({"exp": expire})
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+class Principal(SimpleNamespace):
+    """Detached snapshot of a User, safe to share between requests."""
+
+    PRIVATE_FIELDS = ("password", "mfa_secret")
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(**{
+            column.name: getattr(user, column.name)
+            for column in models.User.__table__.columns
+            if column.name not in cls.PRIVATE_FIELDS
+        })
+
+
+class PrincipalCache:
+    """Token -> Principal, bounded LRU with a short TTL capped at the token's expiry.
+
+    Entries are invalidated per user when their role, MFA or preferences
+    change. The change is broadcast by bumping a version counter in Redis;
+    every worker compares against it at most once per `check_interval`
+    seconds in refresh() and drops its whole cache when it moved. Without
+    Redis, other workers pick up the change once PRINCIPAL_CACHE_TTL passes.
+    """
+
+    def __init__(self, maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL, clock=time.time,
+                 redis_factory=get_redis, async_redis_factory=get_async_redis,
+                 check_interval=PRINCIPAL_VERSION_CHECK_INTERVAL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.redis_factory = redis_factory
+        self.async_redis_factory = async_redis_factory
+        self.check_interval = check_interval
+        self._entries = collections.OrderedDict()
+        self._keys_by_user = collections.defaultdict(set)
+        self._version = None
+        self._checked_at = None
+        self._warned_at = None
+        self._lock = threading.Lock()
+
+    def _redis_failed(self, action):
+        now = self.clock()
+        if self._warned_at is None or now - self._warned_at >= PRINCIPAL_REDIS_WARNING_INTERVAL:
+            self._warned_at = now
+            logger.warning(f"Could not {action} principal cache version in Redis", exc_info=True)
+
+    @staticmethod
+    def key(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token):
+        key = self.key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            principal, expires_at = entry
+            if expires_at <= self.clock():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return principal
+
+    def put(self, token, principal, token_exp=None):
+        expires_at = self.clock() + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        key = self.key(token)
+        with self._lock:
+            self._entries[key] = (principal, expires_at)
+            self._entries.move_to_end(key)
+            self._keys_by_user[principal.id].add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    async def refresh(self):
+        now = self.clock()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        client = self.async_redis_factory()
+        if client is None:
+            return
+        try:
+            version = await client.get(PRINCIPAL_VERSION_KEY) or "0"
+        except Exception:
+            self._redis_failed("read")
+            return
+        if self._version is not None and version != self._version:
+            self.clear()
+        self._version = version
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.pop(user_id, ())):
+                self._entries.pop(key, None)
+        client = self.redis_factory()
+        if client is None:
+            return
+        try:
+            client.incr(PRINCIPAL_VERSION_KEY)
+        except Exception:
+            self._redis_failed("bump")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _remove(self, key):
+        principal, _ = self._entries.pop(key)
+        keys = self._keys_by_user.get(principal.id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[principal.id]
+
+
+principal_cache = PrincipalCache()
+
+
+def invalidate_principal(user_id: int):
+    principal_cache.invalidate_user(user_id)
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
-    if is_token_blacklisted(token):
+    if await revocation_store.ais_revoked(_token_id(token)[0]):
         raise HTTPException(status_code=401, detail="Token has been revoked")
+    await principal_cache.refresh()
+    principal = principal_cache.get(token)
+    if principal is not None:
+        principal_cache_requests.labels("hit").inc()
+        return principal
+    principal_cache_requests.labels("miss").inc()
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -50,12 +209,12 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    db = SessionLocal()
-    user = db.query(models.User).filter(models.User.username == username).first()
-    db.close()
+    user = await run_in_threadpool(_load_user, username)
     if user is None:
         raise credentials_exception
-    return user
+    principal = Principal.from_user(user)
+    principal_cache.put(token, principal, payload.get("exp"))
+    return principal
 
 app = FastAPI()
 
@@ -74,11 +233,19 @@ def login(form_data: OAuth2PasswordRequestForm = Depends()):
 def read_users_me(current_user: dict = Depends(get_current_user)):
     return current_user
 
-# In-memory blacklist for tokens
-blacklisted_tokens = set()
+def _token_id(token: str):
+    """The token's `jti` claim, or a hash of the token for tokens issued without one."""
+    try:
+        claims = jwt.get_unverified_claims(token)
+    except JWTError:
+        claims = {}
+    return claims.get("jti") or hashlib.sha256(token.encode()).hexdigest(), claims.get("exp")
 
 def blacklist_token(token: str):
-    blacklisted_tokens.add(token)
+    token_id, exp = _token_id(token)
+    if exp is None:
+        exp = time.time() + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    revocation_store.revoke(token_id, exp)
 
 def is_token_blacklisted(token: str) -> bool:
-    return token in blacklisted_tokens
\ No newline at end of file
+    return revocation_store.is_revoked(_token_id(token)[0])
\ No newline at end of file
@@ -0,0 +1,62 @@
+"""Compare two benchmark result files.
+
+    python -m benchmarks.compare benchmarks/results/abc123-load.json benchmarks/results/def456-load.json
+    python -m benchmarks.compare old.json new.json --fail-over 10
+
+Exits with status 1 when any p95 regresses by more than --fail-over percent.
+"""
+import argparse
+import json
+import sys
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "rps")
+
+
+def _change(old, new):
+    if old in (None, 0) or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def compare(baseline, candidate):
+    """{name: {metric: (old, new, percent_change)}} for names present in both runs."""
+    rows = {}
+    for name in sorted(baseline["results"].keys() & candidate["results"].keys()):
+        old, new = baseline["results"][name], candidate["results"][name]
+        rows[name] = {metric: (old.get(metric), new.get(metric), _change(old.get(metric), new.get(metric)))
+                      for metric in METRICS}
+    return rows
+
+
+def regressions(rows, threshold):
+    return [name for name, metrics in rows.items()
+            if metrics["p95_ms"][2] is not None and metrics["p95_ms"][2] > threshold]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--fail-over", type=float, help="Fail when a p95 grows by more than this percent")
+    args = parser.parse_args()
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)
+    with open(args.candidate) as fh:
+        candidate = json.load(fh)
+    print(f"{baseline.get('commit')} -> {candidate.get('commit')}")
+    rows = compare(baseline, candidate)
+    print(f"{'name':<28}" + "".join(f"{metric:>26}" for metric in METRICS))
+    for name, metrics in rows.items():
+        cells = []
+        for old, new, change in metrics.values():
+            cells.append(f"{old} -> {new}" + (f" ({change:+.0f}%)" if change is not None else ""))
+        print(f"{name:<28}" + "".join(f"{cell:>26}" for cell in cells))
+    if args.fail_over is not None:
+        failed = regressions(rows, args.fail_over)
+        if failed:
+            print(f"p95 regressed more than {args.fail_over}%: {', '.join(failed)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Measure credit-request intake throughput against a running API.
+
+Start the stub bureau and the API first, e.g.:
+    uvicorn benchmarks.stub_bureau:app --port 9100 &
+    BUREAU_URL=http://localhost:9100/check uvicorn routes:app --port 8000 &
+    python -m benchmarks.intake_throughput --requests 2000 --concurrency 100
+"""
+import argparse
+import asyncio
+import collections
+import random
+import time
+
+import httpx
+
+
+async def _worker(client, queue, args, statuses, latencies):
+    while True:
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        params = {
+            "user_id": random.randint(1, args.users),
+            "amount": round(random.uniform(500, 50000), 2),
+            "credit_type": random.choice(["pessoal", "empresarial", "consignado"]),
+        }
+        started = time.perf_counter()
+        try:
+            response = await client.post("/api/v1/credit-requests/", params=params)
+            statuses[response.status_code] += 1
+        except httpx.HTTPError as exc:
+            statuses[type(exc).__name__] += 1
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(args):
+    queue = asyncio.Queue()
+    for _ in range(args.requests):
+        queue.put_nowait(None)
+    statuses = collections.Counter()
+    latencies = []
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            _worker(client, queue, args, statuses, latencies) for _ in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(f"requests:    {args.requests}")
+    print(f"elapsed:     {elapsed:.2f}s")
+    print(f"throughput:  {args.requests / elapsed:.1f} req/s")
+    print(f"p50 latency: {latencies[len(latencies) // 2] * 1000:.1f}ms")
+    print(f"p99 latency: {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f}ms")
+    print(f"statuses:    {dict(statuses)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=100)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""Mixed-workload load test for the API.
+
+Starts the stub bureau, a stub SMTP server and `routes:app` (uvicorn) against
+a freshly seeded SQLite database in a temp directory, with REDIS_URL empty so
+the in-process cache and revocation fallbacks stand in for Redis:
+
+    python -m benchmarks.load_test --duration 30 --concurrency 50
+    python -m benchmarks.load_test --mix create=50,list=30,approve=20 --workers 4
+
+To target an API you started yourself, seed its database first and pass the URL:
+
+    DATABASE_URL=postgresql://... python -m benchmarks.load_test --seed-only
+    python -m benchmarks.load_test --base-url http://localhost:8000
+
+Per-endpoint p50/p95/p99 latency and requests/sec are printed and written to
+benchmarks/results/<commit>-load.json (see benchmarks/compare.py).
+"""
+import argparse
+import asyncio
+import collections
+import contextlib
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.report import print_table, summarize, write_report
+from benchmarks.stub_smtp import StubSMTPServer
+
+PASSWORD = "bench-password"
+SECRET_KEY = "bench-secret"
+DEFAULT_MIX = "login=5,create=30,list=25,approve=15,reject=5,dashboard=20"
+CREDIT_TYPES = (("pessoal", 70), ("empresarial", 20), ("consignado", 10))
+STATUSES = (None, None, "PENDING", "APPROVED", "REJECTED")
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("login", "create", "list", "approve", "reject", "dashboard"):
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}")
+        mix[name] = int(weight)
+    return mix
+
+
+def seed(database_url, customers, analysts):
+    """Creates the schema, users, workflow stages and the default business rule."""
+    from sqlalchemy import create_engine, insert
+
+    import models
+    from auth import hash_password
+
+    engine = create_engine(database_url)
+    models.Base.metadata.create_all(engine)
+    password = hash_password(PASSWORD)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"username": f"customer-{i}", "role": "customer", "password": password, "rating": 700, "income": 8000,
+             "cpf": f"{i:011d}", "email": f"customer-{i}@example.com"}
+            for i in range(customers)
+        ])
+        conn.execute(insert(models.User), [
+            {"username": f"analyst-{i}", "role": "analyst", "password": password, "rating": None, "income": None}
+            for i in range(analysts)
+        ])
+        conn.execute(insert(models.WorkflowStage), [
+            {"name": name, "order": order} for order, name in enumerate(["analyst", "manager", "director"], 1)
+        ])
+        conn.execute(insert(models.BusinessRule), [
+            {"name": "default", "min_rating": 600, "min_income": 2000, "block_if_bureau_restriction": True}
+        ])
+    engine.dispose()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with {process.returncode} before becoming ready")
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def _uvicorn(app, port, env, workers=1):
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        env=env,
+    )
+
+
+@contextlib.contextmanager
+def local_stack(args):
+    """Yields the base URL of a seeded API wired to the stubs; tears everything down on exit."""
+    workdir = tempfile.mkdtemp(prefix="credit-bench-")
+    database_url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    seed(database_url, args.customers, args.analysts)
+    smtp = StubSMTPServer()
+    smtp.start()
+    bureau_port, api_port = _free_port(), _free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        REDIS_URL="",
+        SECRET_KEY=SECRET_KEY,
+        BUREAU_URL=f"http://127.0.0.1:{bureau_port}/check",
+        STUB_BUREAU_LATENCY_MS=str(args.bureau_latency_ms),
+        STUB_BUREAU_RESTRICTION_RATE="0",
+        SMTP_HOST="127.0.0.1",
+        SMTP_PORT=str(smtp.port),
+        SMTP_STARTTLS="0",
+        SMTP_USER="",
+        PRINCIPAL_CACHE_TTL=str(args.principal_cache_ttl),
+    )
+    processes = [_uvicorn("benchmarks.stub_bureau:app", bureau_port, env)]
+    try:
+        _wait_ready(f"http://127.0.0.1:{bureau_port}/docs", processes[0])
+        processes.append(_uvicorn("routes:app", api_port, env, args.workers))
+        _wait_ready(f"http://127.0.0.1:{api_port}/api/v1/health", processes[1])
+        yield f"http://127.0.0.1:{api_port}"
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        smtp.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+class Workload:
+    """Issues weighted operations; approve/reject work through requests created during the run."""
+
+    def __init__(self, client, args, analyst_tokens, rng):
+        self.client = client
+        self.args = args
+        self.analyst_tokens = analyst_tokens
+        self.rng = rng
+        self.pending = collections.deque()
+        self.operations = list(args.mix)
+        self.weights = [args.mix[name] for name in self.operations]
+
+    def _headers(self):
+        return {"Authorization": f"Bearer {self.rng.choice(self.analyst_tokens)}"}
+
+    async def login(self):
+        return await self.client.post("/api/v1/token", data={
+            "username": f"customer-{self.rng.randrange(self.args.customers)}", "password": PASSWORD,
+        })
+
+    async def create(self):
+        credit_type = self.rng.choices([t for t, _ in CREDIT_TYPES], [w for _, w in CREDIT_TYPES])[0]
+        response = await self.client.post("/api/v1/credit-requests/", params={
+            "user_id": self.rng.randint(1, self.args.customers),
+            "amount": round(self.rng.uniform(500, 50000), 2),
+            "credit_type": credit_type,
+        })
+        if response.status_code == 200:
+            self.pending.append(response.json()["id"])
+        return response
+
+    async def list(self):
+        params = {"limit": 20}
+        status = self.rng.choice(STATUSES)
+        if status:
+            params["status"] = status
+        return await self.client.get("/api/v1/credit-requests/", params=params, headers=self._headers())
+
+    async def approve(self):
+        return await self.client.post(
+            f"/api/v1/credit-requests/{self.pending.popleft()}/approve", headers=self._headers()
+        )
+
+    async def reject(self):
+        return await self.client.post(
+            f"/api/v1/credit-requests/{self.pending.popleft()}/reject",
+            params={"reason": "load test"}, headers=self._headers(),
+        )
+
+    async def dashboard(self):
+        return await self.client.get("/api/v1/dashboard/summary")
+
+    def pick(self):
+        name = self.rng.choices(self.operations, self.weights)[0]
+        if name in ("approve", "reject") and not self.pending:
+            return "create"
+        return name
+
+
+async def _worker(workload, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        name = workload.pick()
+        started = time.perf_counter()
+        try:
+            response = await getattr(workload, name)()
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        latencies[name].append(time.perf_counter() - started)
+        if not ok:
+            errors[name] += 1
+
+
+async def _login(client, username):
+    response = await client.post("/api/v1/token", data={"username": username, "password": PASSWORD})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run(args, base_url):
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        analyst_tokens = [await _login(client, f"analyst-{i}") for i in range(args.analysts)]
+        latencies = collections.defaultdict(list)
+        errors = collections.Counter()
+        rng = random.Random(args.seed)
+        workload = Workload(client, args, analyst_tokens, rng)
+        if args.warmup:
+            await asyncio.gather(*(
+                _worker(workload, time.perf_counter() + args.warmup, collections.defaultdict(list), collections.Counter())
+                for _ in range(args.concurrency)
+            ))
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            _worker(workload, started + args.duration, latencies, errors) for _ in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+    results = {name: summarize(values, elapsed, errors[name]) for name, values in latencies.items()}
+    results["all"] = summarize([v for values in latencies.values() for v in values], elapsed, sum(errors.values()))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", help="Benchmark an already running, already seeded API")
+    parser.add_argument("--seed-only", action="store_true", help="Seed DATABASE_URL and exit")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument("--customers", type=int, default=200)
+    parser.add_argument("--analysts", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the local API")
+    parser.add_argument("--bureau-latency-ms", type=float, default=50)
+    parser.add_argument("--principal-cache-ttl", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    if args.seed_only:
+        seed(os.getenv("DATABASE_URL", "sqlite:///./credit_approval.db"), args.customers, args.analysts)
+        return
+    if args.base_url:
+        results = asyncio.run(run(args, args.base_url))
+    else:
+        with local_stack(args) as base_url:
+            results = asyncio.run(run(args, base_url))
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "seed_only")}
+    print_table(results)
+    print(f"\nwritten to {write_report('load', config, results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Microbenchmarks for hot functions on the request path.
+
+    python -m benchmarks.microbench --iterations 20000
+    python -m benchmarks.microbench --only get_current_user_miss
+
+Runs against an in-memory SQLite database with REDIS_URL empty, and writes
+benchmarks/results/<commit>-micro.json (see benchmarks/compare.py).
+"""
+import os
+
+os.environ.setdefault("REDIS_URL", "")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import audit
+import auth
+import models
+from benchmarks.report import print_table, summarize, write_report
+from revocation import RevocationStore
+from utils import get_email_template
+
+
+def _session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, autoflush=False)
+
+
+def _timed(fn, iterations):
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def bench_get_current_user(iterations):
+    Session = _session_factory()
+    db = Session()
+    db.add(models.User(username="bench", role="analyst", password="x"))
+    db.commit()
+    db.close()
+    auth.ReadSessionLocal = Session
+    auth.revocation_store = RevocationStore(redis_factory=lambda: None)
+    token = auth.create_access_token({"sub": "bench"})
+    loop = asyncio.new_event_loop()
+
+    def hit():
+        loop.run_until_complete(auth.get_current_user(token))
+
+    def miss():
+        auth.principal_cache.clear()
+        loop.run_until_complete(auth.get_current_user(token))
+
+    try:
+        hit()
+        return {
+            "get_current_user_hit": _timed(hit, iterations),
+            "get_current_user_miss": _timed(miss, iterations),
+        }
+    finally:
+        loop.close()
+
+
+def bench_log_audit(iterations):
+    audit.audit_logger = audit.AuditBuffer(session_factory=_session_factory())
+    try:
+        results = {"log_audit": _timed(
+            lambda: audit.log_audit(None, 1, "view_credit_request", 1, "bench", ip="127.0.0.1"), iterations
+        )}
+    finally:
+        audit.audit_logger.stop()
+    return results
+
+
+def bench_get_email_template(iterations):
+    return {
+        "get_email_template_approved": _timed(lambda: get_email_template("approved", 42), iterations),
+        "get_email_template_rejected": _timed(lambda: get_email_template("rejected", 42, reason="bench"), iterations),
+    }
+
+
+BENCHMARKS = {
+    "get_current_user": bench_get_current_user,
+    "log_audit": bench_log_audit,
+    "get_email_template": bench_get_email_template,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=10000)
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS))
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    results = {}
+    for name in args.only or BENCHMARKS:
+        results.update(BENCHMARKS[name](args.iterations))
+    print_table(results)
+    config = {"iterations": args.iterations, "only": args.only}
+    print(f"\nwritten to {write_report('micro', config, results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Shared result format for the benchmark scripts.
+
+Every script writes one JSON document:
+
+    {"kind": "load" | "micro", "commit": "<git sha>", "started_at": "...",
+     "config": {...}, "results": {"<name>": {"count": ..., "p50_ms": ..., ...}}}
+
+so runs from different commits can be diffed with benchmarks/compare.py.
+"""
+import datetime
+import json
+import os
+import platform
+import subprocess
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed=None, errors=0):
+    """Latency summary in milliseconds; `latencies` are seconds."""
+    values = sorted(latencies)
+    summary = {
+        "count": len(values),
+        "errors": errors,
+        "p50_ms": _ms(percentile(values, 50)),
+        "p95_ms": _ms(percentile(values, 95)),
+        "p99_ms": _ms(percentile(values, 99)),
+        "max_ms": _ms(values[-1] if values else None),
+    }
+    if elapsed:
+        summary["rps"] = round(len(values) / elapsed, 1)
+    return summary
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_report(kind, config, results, output=None):
+    commit = git_commit()
+    document = {
+        "kind": kind,
+        "commit": commit,
+        "started_at": datetime.datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "config": config,
+        "results": results,
+    }
+    if output is None:
+        output = os.path.join("benchmarks", "results", f"{commit or 'unknown'}-{kind}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as fh:
+        json.dump(document, fh, indent=2, sort_keys=True)
+    return output
+
+
+def print_table(results):
+    print(f"{'name':<28}{'count':>8}{'err':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, row in sorted(results.items()):
+        print(
+            f"{name:<28}{row['count']:>8}{row['errors']:>6}{row.get('rps') or '':>9}"
+            f"{row['p50_ms'] or '':>10}{row['p95_ms'] or '':>10}{row['p99_ms'] or '':>10}"
+        )
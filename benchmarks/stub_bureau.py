@@ -0,0 +1,40 @@
+"""Local stand-in for the credit bureau.
+
+Run with:
+    STUB_BUREAU_LATENCY_MS=200 STUB_BUREAU_FAILURE_RATE=0.1 \
+        uvicorn benchmarks.stub_bureau:app --port 9100
+
+and point the API at it with BUREAU_URL=http://localhost:9100/check.
+"""
+import asyncio
+import hashlib
+import os
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+LATENCY_MS = float(os.getenv("STUB_BUREAU_LATENCY_MS", "50"))
+JITTER_MS = float(os.getenv("STUB_BUREAU_JITTER_MS", "10"))
+FAILURE_RATE = float(os.getenv("STUB_BUREAU_FAILURE_RATE", "0"))
+HANG_RATE = float(os.getenv("STUB_BUREAU_HANG_RATE", "0"))
+RESTRICTION_RATE = float(os.getenv("STUB_BUREAU_RESTRICTION_RATE", "0.1"))
+
+app = FastAPI()
+
+
+def _digest(cpf):
+    return hashlib.sha256(str(cpf).encode()).digest()
+
+
+@app.post("/check")
+async def check(request: Request):
+    payload = await request.json()
+    cpf = payload.get("cpf")
+    if random.random() < HANG_RATE:
+        await asyncio.sleep(60)
+    await asyncio.sleep(max(0.0, random.gauss(LATENCY_MS, JITTER_MS)) / 1000)
+    if random.random() < FAILURE_RATE:
+        return JSONResponse(status_code=503, content={"error": "bureau unavailable"})
+    digest = _digest(cpf)
+    return {"cpf": cpf, "restriction": digest[0] / 255 < RESTRICTION_RATE, "score": 300 + digest[1] * 2}
@@ -0,0 +1,98 @@
+"""Minimal local SMTP stand-in that records messages instead of delivering them.
+
+Run with:
+    python -m benchmarks.stub_smtp --port 2525
+
+and point the app at it with SMTP_HOST=localhost SMTP_PORT=2525 SMTP_STARTTLS=0 SMTP_USER=.
+"""
+import argparse
+import socketserver
+import threading
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line):
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self._reply("220 stub-smtp ready")
+        sender, recipients = None, []
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            command = raw.decode(errors="replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self._reply("250-stub-smtp")
+                self._reply("250 AUTH PLAIN LOGIN")
+            elif verb == "AUTH":
+                self._reply("235 Authentication successful")
+            elif verb == "MAIL":
+                sender, recipients = command[10:].strip("<> "), []
+                self._reply("250 OK")
+            elif verb == "RCPT":
+                recipient = command[8:].strip("<> ")
+                if recipient in server.reject_recipients:
+                    self._reply("550 Mailbox unavailable")
+                else:
+                    recipients.append(recipient)
+                    self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    line = self.rfile.readline().decode(errors="replace")
+                    if line in (".\r\n", ".\n", ""):
+                        break
+                    lines.append(line)
+                with server.lock:
+                    server.messages.append({"from": sender, "to": recipients, "data": "".join(lines)})
+                self._reply("250 OK queued")
+            elif verb in ("RSET", "NOOP"):
+                self._reply("250 OK")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0, reject_recipients=()):
+        super().__init__((host, port), _SMTPHandler)
+        self.messages = []
+        self.connections = 0
+        self.reject_recipients = set(reject_recipients)
+        self.lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SMTP stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    args = parser.parse_args()
+    server = StubSMTPServer(args.host, args.port)
+    print(f"stub SMTP listening on {args.host}:{server.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,152 @@
-import requests
-
-def cpf_bureau_check(cpf: str) -> dict:
-    url = "https://api.serasa.com/check"
-    payload = {"cpf": cpf}
-    headers = {"Authorization": "Bearer ACESS_TOKEN"}
-    response = requests.post(url, json=payload, headers=headers)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        return {"error": response.text}
\ No newline at end of file
+import asyncio
+import os
+import threading
+import time
+
+import httpx
+
+BUREAU_URL = os.getenv("BUREAU_URL", "https://api.serasa.com/check")
+BUREAU_TOKEN = os.getenv("BUREAU_TOKEN", "ACESS_TOKEN")
+BUREAU_CONNECT_TIMEOUT = float(os.getenv("BUREAU_CONNECT_TIMEOUT", "1.0"))
+BUREAU_READ_TIMEOUT = float(os.getenv("BUREAU_READ_TIMEOUT", "3.0"))
+BUREAU_MAX_CONNECTIONS = int(os.getenv("BUREAU_MAX_CONNECTIONS", "50"))
+BUREAU_MAX_KEEPALIVE = int(os.getenv("BUREAU_MAX_KEEPALIVE", "20"))
+BUREAU_FAILURE_THRESHOLD = int(os.getenv("BUREAU_FAILURE_THRESHOLD", "5"))
+BUREAU_RESET_TIMEOUT = float(os.getenv("BUREAU_RESET_TIMEOUT", "30"))
+
+
+class BureauUnavailable(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and rejects calls
+    until `reset_timeout` has passed, then lets a single probe through."""
+
+    def __init__(self, failure_threshold=BUREAU_FAILURE_THRESHOLD, reset_timeout=BUREAU_RESET_TIMEOUT, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def release(self):
+        """Ends a call that says nothing about the bureau's health, freeing the probe slot if it held it."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._probing = False
+
+
+breaker = CircuitBreaker()
+
+
+def _headers():
+    return {"Authorization": f"Bearer {BUREAU_TOKEN}"}
+
+
+class BureauClient:
+    """Async bureau client sharing one keep-alive connection pool per event loop."""
+
+    def __init__(self, url=BUREAU_URL, circuit_breaker=breaker, transport=None):
+        self.url = url
+        self.breaker = circuit_breaker
+        self.transport = transport
+        self._client = None
+        self._loop = None
+
+    def _get_client(self):
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._discard_client()
+            self._client = httpx.AsyncClient(
+                headers=_headers(),
+                timeout=httpx.Timeout(BUREAU_READ_TIMEOUT, connect=BUREAU_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=BUREAU_MAX_CONNECTIONS,
+                    max_keepalive_connections=BUREAU_MAX_KEEPALIVE,
+                ),
+                transport=self.transport,
+            )
+            self._loop = loop
+        return self._client
+
+    def _discard_client(self):
+        """Closes the client of another event loop on that loop. A loop that is already closed took
+        its transports with it, and their sockets are released when the client is collected."""
+        client, loop = self._client, self._loop
+        self._client = None
+        self._loop = None
+        if client is not None and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+    async def check(self, cpf: str) -> dict:
+        if not self.breaker.allow():
+            raise BureauUnavailable("Bureau circuit is open")
+        try:
+            response = await self._get_client().post(self.url, json={"cpf": cpf})
+        except httpx.PoolTimeout as exc:
+            # Our own connection pool is exhausted; the bureau may be healthy, so only retry later.
+            self.breaker.release()
+            raise BureauUnavailable("No bureau connection available") from exc
+        except httpx.TransportError as exc:
+            self.breaker.record_failure()
+            raise BureauUnavailable(str(exc)) from exc
+        except httpx.HTTPError as exc:
+            self.breaker.release()
+            raise BureauUnavailable(str(exc)) from exc
+        except BaseException:
+            # Cancellation (a client disconnect) must not leave a half-open probe in flight forever.
+            self.breaker.record_failure()
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+            raise BureauUnavailable(f"Bureau returned {response.status_code}")
+        self.breaker.record_success()
+        if response.status_code == 200:
+            return response.json()
+        return {"error": response.text}
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+
+bureau_client = BureauClient()
+
+
+async def cpf_bureau_check_async(cpf: str) -> dict:
+    return await bureau_client.check(cpf)
@@ -0,0 +1,171 @@
+import asyncio
+import collections
+import hashlib
+import json
+import logging
+import os
+import time
+
+from prometheus_client import Counter
+
+from bureau import cpf_bureau_check_async
+from redis_client import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+BUREAU_CACHE_SIZE = int(os.getenv("BUREAU_CACHE_SIZE", "10000"))
+BUREAU_CACHE_POSITIVE_TTL = int(os.getenv("BUREAU_CACHE_POSITIVE_TTL", "86400"))
+BUREAU_CACHE_NEGATIVE_TTL = int(os.getenv("BUREAU_CACHE_NEGATIVE_TTL", "3600"))
+BUREAU_CACHE_REDIS = os.getenv("BUREAU_CACHE_REDIS", "0") == "1"
+
+bureau_cache_requests = Counter(
+    "bureau_cache_requests_total", "Bureau cache lookups", ["result"]
+)
+
+
+class LRUCache:
+    def __init__(self, maxsize, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._data = collections.OrderedDict()
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at <= self.clock():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl):
+        self._data[key] = (value, self.clock() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class BureauCache:
+    """CPF-keyed bureau results with in-process LRU, optional Redis and
+    single-flight: concurrent misses for one CPF share one bureau call."""
+
+    def __init__(
+        self,
+        fetch=cpf_bureau_check_async,
+        maxsize=BUREAU_CACHE_SIZE,
+        positive_ttl=BUREAU_CACHE_POSITIVE_TTL,
+        negative_ttl=BUREAU_CACHE_NEGATIVE_TTL,
+        use_redis=BUREAU_CACHE_REDIS,
+        clock=time.monotonic,
+    ):
+        self.fetch = fetch
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.use_redis = use_redis
+        self._local = LRUCache(maxsize, clock=clock)
+        self._inflight = {}
+
+    def ttl_for(self, result):
+        if "error" in result:
+            return 0
+        return self.negative_ttl if result.get("restriction") else self.positive_ttl
+
+    async def get(self, cpf):
+        if not cpf:
+            raise ValueError("A CPF is required for a bureau lookup")
+        while True:
+            result = self._local.get(cpf)
+            if result is not None:
+                bureau_cache_requests.labels("hit").inc()
+                return result
+            pending = self._inflight.get(cpf)
+            if pending is None:
+                return await self._lead(cpf)
+            bureau_cache_requests.labels("coalesced").inc()
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                # Only the leader's caller went away; the first waiter back here takes over.
+
+    async def _lead(self, cpf):
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[cpf] = future
+        try:
+            result = await self._load(cpf)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(cpf, None)
+
+    async def _load(self, cpf):
+        result = await self._redis_get(cpf)
+        if result is not None:
+            bureau_cache_requests.labels("redis_hit").inc()
+        else:
+            bureau_cache_requests.labels("miss").inc()
+            result = await self.fetch(cpf)
+        ttl = self.ttl_for(result)
+        if ttl:
+            self._local.set(cpf, result, ttl)
+            await self._redis_set(cpf, result, ttl)
+        return result
+
+    def _redis_key(self, cpf):
+        return "bureau:" + hashlib.sha256(str(cpf).encode()).hexdigest()
+
+    async def _redis_get(self, cpf):
+        client = get_async_redis() if self.use_redis else None
+        if client is None:
+            return None
+        try:
+            raw = await client.get(self._redis_key(cpf))
+        except Exception:
+            logger.warning("Bureau cache Redis read failed", exc_info=True)
+            return None
+        return json.loads(raw) if raw else None
+
+    async def _redis_set(self, cpf, result, ttl):
+        client = get_async_redis() if self.use_redis else None
+        if client is None:
+            return
+        try:
+            await client.set(self._redis_key(cpf), json.dumps(result), ex=ttl)
+        except Exception:
+            logger.warning("Bureau cache Redis write failed", exc_info=True)
+
+    def invalidate(self, cpf=None):
+        if cpf is None:
+            self._local.clear()
+        else:
+            self._local.pop(cpf)
+
+
+bureau_cache = BureauCache()
+
+
+async def cached_bureau_check(cpf, stored=None):
+    """Prefer the result already stored on the credit request, then the cache."""
+    if stored is not None:
+        return stored
+    return await bureau_cache.get(cpf)
@@ -0,0 +1,169 @@
+import logging
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import anyio.to_thread
+
+from database import ReadSessionLocal
+import models
+from redis_client import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+CONFIG_VERSION_KEY = "config:version"
+CONFIG_VERSION_CHECK_INTERVAL = float(os.getenv("CONFIG_VERSION_CHECK_INTERVAL", "1.0"))
+CONFIG_CACHE_TTL = float(os.getenv("CONFIG_CACHE_TTL", "60"))
+CONFIG_REDIS_WARNING_INTERVAL = float(os.getenv("CONFIG_REDIS_WARNING_INTERVAL", "60"))
+
+APPROVAL_FLOWS = {
+    "pessoal": ["analyst"],
+    "empresarial": ["analyst", "manager"],
+    "consignado": ["analyst", "manager", "director"]
+}
+DEFAULT_FLOW = ["analyst"]
+
+_READ_VERSION = object()
+
+
+def _snapshot(row):
+    return SimpleNamespace(**{column.name: getattr(row, column.name) for column in row.__table__.columns})
+
+
+class ConfigCache:
+    """In-memory copy of BusinessRule rows and per-credit-type workflow stages.
+
+    Writers call invalidate(), which bumps a version counter in Redis; every
+    worker compares its snapshot against that counter at most once per
+    `check_interval` seconds. Without Redis, snapshots expire after `ttl`.
+    Async callers use aget()/astages(), which check the version with the
+    async client and reload in a worker thread, off the event loop.
+    """
+
+    def __init__(self, session_factory=ReadSessionLocal, flows=APPROVAL_FLOWS, check_interval=CONFIG_VERSION_CHECK_INTERVAL,
+                 ttl=CONFIG_CACHE_TTL, redis_factory=get_redis, async_redis_factory=get_async_redis,
+                 clock=time.monotonic):
+        self.session_factory = session_factory
+        self.flows = flows
+        self.check_interval = check_interval
+        self.ttl = ttl
+        self.redis_factory = redis_factory
+        self.async_redis_factory = async_redis_factory
+        self.clock = clock
+        self._snapshot = None
+        self._version = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._warned_at = None
+        self._lock = threading.Lock()
+
+    def _redis_failed(self, action):
+        """Logs Redis failures at most once per CONFIG_REDIS_WARNING_INTERVAL; the cache falls back to its TTL."""
+        now = self.clock()
+        if self._warned_at is None or now - self._warned_at >= CONFIG_REDIS_WARNING_INTERVAL:
+            self._warned_at = now
+            logger.warning(f"Could not {action} config version in Redis", exc_info=True)
+
+    def _remote_version(self):
+        client = self.redis_factory()
+        if client is None:
+            return None
+        try:
+            return client.get(CONFIG_VERSION_KEY) or "0"
+        except Exception:
+            self._redis_failed("read")
+            return None
+
+    async def _aremote_version(self):
+        client = self.async_redis_factory()
+        if client is None:
+            return None
+        try:
+            return await client.get(CONFIG_VERSION_KEY) or "0"
+        except Exception:
+            self._redis_failed("read")
+            return None
+
+    def _due_for_check(self):
+        if self._snapshot is None:
+            return True
+        now = self.clock()
+        if now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        return True
+
+    def _changed(self, version):
+        if version is None:
+            return self.clock() - self._loaded_at >= self.ttl
+        return version != self._version
+
+    def _is_stale(self):
+        if not self._due_for_check():
+            return False
+        return self._snapshot is None or self._changed(self._remote_version())
+
+    def _load(self, version=_READ_VERSION):
+        if version is _READ_VERSION:
+            version = self._remote_version()
+        db = self.session_factory()
+        try:
+            rules = {rule.name: _snapshot(rule) for rule in db.query(models.BusinessRule).all()}
+            stages = db.query(models.WorkflowStage).order_by(models.WorkflowStage.order).all()
+        finally:
+            db.close()
+        stages_by_type = {
+            credit_type: [_snapshot(stage) for stage in stages if stage.name in names]
+            for credit_type, names in self.flows.items()
+        }
+        default_stages = [_snapshot(stage) for stage in stages if stage.name in DEFAULT_FLOW]
+        self._snapshot = SimpleNamespace(rules=rules, stages_by_type=stages_by_type, default_stages=default_stages)
+        self._version = version
+        self._loaded_at = self._checked_at = self.clock()
+        logger.info(f"Configuration cache loaded (version={version})")
+
+    def get(self):
+        with self._lock:
+            if self._is_stale():
+                self._load()
+            return self._snapshot
+
+    def _reload(self, seen, version):
+        with self._lock:
+            if self._snapshot is None or self._snapshot is seen:
+                self._load(version)
+            return self._snapshot
+
+    async def aget(self):
+        snapshot = self._snapshot
+        if not self._due_for_check():
+            return snapshot
+        version = await self._aremote_version()
+        if snapshot is not None and not self._changed(version):
+            return snapshot
+        return await anyio.to_thread.run_sync(self._reload, snapshot, version)
+
+    def rule(self, name="default"):
+        return self.get().rules.get(name)
+
+    def stages(self, credit_type):
+        snapshot = self.get()
+        return snapshot.stages_by_type.get(credit_type, snapshot.default_stages)
+
+    async def astages(self, credit_type):
+        snapshot = await self.aget()
+        return snapshot.stages_by_type.get(credit_type, snapshot.default_stages)
+
+    def invalidate(self):
+        self._snapshot = None
+        client = self.redis_factory()
+        if client is None:
+            return
+        try:
+            client.incr(CONFIG_VERSION_KEY)
+        except Exception:
+            self._redis_failed("bump")
+
+
+config_cache = ConfigCache()
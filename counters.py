@@ -0,0 +1,133 @@
+"""Per-day, per-status, per-credit-type request counts for the dashboard.
+
+    python counters.py --rebuild
+"""
+import argparse
+import collections
+import datetime
+import os
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+import models
+
+DASHBOARD_DAYS = int(os.getenv("DASHBOARD_DAYS", "30"))
+
+_upsert_dialects = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def _day(value):
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value[:10])
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    return value
+
+
+def bump(db, deltas):
+    """Adds {(day, status, credit_type): delta} to the counters in the caller's transaction."""
+    table = models.CreditRequestCounter
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    dialect_insert = _upsert_dialects.get(db.get_bind().dialect.name)
+    for (day, status, credit_type), delta in deltas.items():
+        key = {"day": day, "status": status, "credit_type": credit_type}
+        if dialect_insert is not None:
+            stmt = dialect_insert(table).values(count=delta, **key)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=["day", "status", "credit_type"],
+                set_={"count": table.count + stmt.excluded.count},
+            ))
+            continue
+        updated = db.execute(
+            update(table).filter_by(**key).values(count=table.count + delta)
+        ).rowcount
+        if not updated:
+            db.execute(insert(table).values(count=delta, **key))
+
+
+def record_created(db, requests, status=models.ApprovalStatus.PENDING):
+    """`requests` are (created_at, credit_type) pairs of newly inserted requests in `status`."""
+    deltas = collections.Counter(
+        (_day(created_at), status, credit_type) for created_at, credit_type in requests
+    )
+    bump(db, deltas)
+
+
+def record_transition(db, credit_request, old_status, new_status):
+    record_transitions(db, [credit_request], old_status, new_status)
+
+
+def record_transitions(db, credit_requests, old_status, new_status):
+    """`credit_requests` need `created_at` and `credit_type`; all moved from `old_status` to `new_status`."""
+    deltas = collections.Counter()
+    for credit_request in credit_requests:
+        day = _day(credit_request.created_at)
+        deltas[(day, old_status, credit_request.credit_type)] -= 1
+        deltas[(day, new_status, credit_request.credit_type)] += 1
+    bump(db, deltas)
+
+
+def rebuild(db):
+    """Recomputes every counter from credit_requests, in one transaction."""
+    day = func.date(models.CreditRequest.created_at)
+    rows = db.execute(
+        select(day, models.CreditRequest.status, models.CreditRequest.credit_type, func.count())
+        .where(models.CreditRequest.created_at.is_not(None))
+        .group_by(day, models.CreditRequest.status, models.CreditRequest.credit_type)
+    ).all()
+    db.execute(delete(models.CreditRequestCounter))
+    if rows:
+        db.execute(insert(models.CreditRequestCounter), [
+            {"day": _day(d), "status": status, "credit_type": credit_type, "count": count}
+            for d, status, credit_type, count in rows
+        ])
+    db.commit()
+    return len(rows)
+
+
+def summary(db, days=DASHBOARD_DAYS, today=None):
+    table = models.CreditRequestCounter
+    since = (today or datetime.datetime.utcnow().date()) - datetime.timedelta(days=days - 1)
+    totals = dict(db.execute(select(table.status, func.sum(table.count)).group_by(table.status)).all())
+    by_type = collections.defaultdict(dict)
+    for credit_type, status, count in db.execute(
+        select(table.credit_type, table.status, func.sum(table.count)).group_by(table.credit_type, table.status)
+    ):
+        by_type[credit_type][status.value] = count
+    by_day = collections.defaultdict(dict)
+    for day, status, count in db.execute(
+        select(table.day, table.status, table.count).where(table.day >= since).order_by(table.day)
+    ):
+        by_day[day.isoformat()][status.value] = by_day[day.isoformat()].get(status.value, 0) + count
+    return {
+        "total_requests": sum(totals.values()),
+        "pending": totals.get(models.ApprovalStatus.PENDING, 0),
+        "approved": totals.get(models.ApprovalStatus.APPROVED, 0),
+        "rejected": totals.get(models.ApprovalStatus.REJECTED, 0),
+        "screening": totals.get(models.ApprovalStatus.SCREENING, 0),
+        "by_credit_type": dict(by_type),
+        "by_day": dict(by_day),
+    }
+
+
+def main():
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain the dashboard request counters")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute all counters from credit_requests")
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        if args.rebuild:
+            print(f"Rebuilt {rebuild(db)} counter rows")
+        else:
+            parser.print_help()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,118 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///./credit_approval.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./credit_approval.db")
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def async_url(url):
+    """Maps a sync database URL onto the matching asyncio driver."""
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme.split('+')[0], scheme)}://{rest}"
+
+
+def _is_sqlite(url):
+    return url.startswith("sqlite")
+
+
+def _is_sqlite_memory(url):
+    return url.split("://", 1)[1] in ("", "/:memory:") or "mode=memory" in url
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.close()
+
+
+def engine_options(url, writer=True):
+    """Pool settings for `url`.
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+    SQLite file databases run in WAL mode so readers never block the writer.
+    The writer engine gets a single connection, which queues write
+    transactions inside the process instead of having them poll on
+    SQLITE_BUSY; busy_timeout is only the backstop for writers in other
+    processes (Celery workers). Readers use the regular pool, so
+    request handlers must keep reads that span slow calls (bureau checks,
+    streamed bodies) off the writer session.
+    """
+    if not _is_sqlite(url):
+        return {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_pre_ping": DB_POOL_PRE_PING,
+            "pool_recycle": DB_POOL_RECYCLE,
+        }
+    options = {"connect_args": {"check_same_thread": False}}
+    if not _is_sqlite_memory(url):
+        options.update(
+            pool_size=1 if writer else DB_POOL_SIZE,
+            max_overflow=0 if writer else DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+def make_engine(url, writer=True):
+    engine = create_engine(url, **engine_options(url, writer))
+    if _is_sqlite(url):
+        event.listen(engine, "connect", _sqlite_pragmas)
+    return engine
+
+
+def make_async_engine(url, writer=True):
+    engine = create_async_engine(async_url(url), **engine_options(url, writer))
+    if _is_sqlite(url):
+        event.listen(engine.sync_engine, "connect", _sqlite_pragmas)
+    return engine
+
+
+def _read_url():
+    if DATABASE_READ_URL:
+        return DATABASE_READ_URL
+    if _is_sqlite(DATABASE_URL) and not _is_sqlite_memory(DATABASE_URL):
+        return DATABASE_URL
+    return None
+
+
+engine = make_engine(DATABASE_URL)
+read_engine = make_engine(_read_url(), writer=False) if _read_url() else engine
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
\ No newline at end of file
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+async_engine = make_async_engine(DATABASE_URL)
+async_read_engine = make_async_engine(_read_url(), writer=False) if _read_url() else async_engine
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+Base = declarative_base()
+
+
+def engines():
+    """Every distinct sync engine, including the ones behind the async engines, by role."""
+    named = {
+        "write": engine,
+        "read": read_engine,
+        "async_write": async_engine.sync_engine,
+        "async_read": async_read_engine.sync_engine,
+    }
+    unique = {}
+    for name, candidate in named.items():
+        if all(candidate is not seen for seen in unique.values()):
+            unique[name] = candidate
+    return unique
@@ -0,0 +1,267 @@
+import asyncio
+import collections
+import json
+import logging
+import os
+import re
+import threading
+
+from prometheus_client import Counter, Gauge
+
+from redis_client import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+EVENT_STREAM_KEY = "events:credit-requests"
+EVENT_STREAM_MAXLEN = int(os.getenv("EVENT_STREAM_MAXLEN", "100000"))
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+EVENT_RETRY_BACKOFF = float(os.getenv("EVENT_RETRY_BACKOFF", "0.5"))
+EVENT_STREAM_MAX_FAILURES = int(os.getenv("EVENT_STREAM_MAX_FAILURES", "5"))
+EVENT_SUBSCRIBER_QUEUE_SIZE = int(os.getenv("EVENT_SUBSCRIBER_QUEUE_SIZE", "1000"))
+
+_CLOSED = object()
+_EVENT_ID = re.compile(r"^\d+-\d+$")
+
+events_published = Counter("credit_request_events_published_total", "Status change events published", ["result"])
+event_subscribers = Gauge("credit_request_event_subscribers", "Open status change event streams")
+
+
+def valid_event_id(event_id):
+    return bool(_EVENT_ID.match(event_id))
+
+
+def _id_key(event_id):
+    return tuple(int(part) for part in event_id.split("-"))
+
+
+class _Subscriber:
+    def __init__(self, reader, maxsize):
+        self.reader = reader
+        self.queue = asyncio.Queue(maxsize)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+        self.reader.subscribers.discard(self)
+        try:
+            self.queue.put_nowait(_CLOSED)
+        except asyncio.QueueFull:
+            pass
+
+
+class _StreamReader:
+    """The single XREAD loop of one event loop and the subscribers it feeds."""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.task = None
+
+
+class EventBus:
+    """Credit request status changes, in order, with resumable ids.
+
+    With Redis the events go to a capped stream that every worker reads, so a
+    subscriber sees decisions made on any worker and can resume after the id
+    it last saw (for SSE, the Last-Event-ID header). Without Redis the last
+    `maxlen` events are kept in process. Subscribers get None after
+    `heartbeat` seconds without events so streams can send keepalives.
+
+    Each event loop runs one reader task that tails the stream and copies
+    entries into every subscriber's queue; a subscriber resuming from an id
+    first reads the entries it missed itself. When Redis fails the reader
+    backs off (subscribers yield None) and ends every stream after
+    `max_failures` failures in a row, so clients reconnect with their last
+    id. A subscriber whose queue fills up (`queue_size` entries behind) is
+    ended the same way.
+    """
+
+    def __init__(self, redis_factory=get_redis, async_redis_factory=get_async_redis, maxlen=EVENT_STREAM_MAXLEN,
+                 heartbeat=EVENT_HEARTBEAT_SECONDS, retry_backoff=EVENT_RETRY_BACKOFF,
+                 max_failures=EVENT_STREAM_MAX_FAILURES, queue_size=EVENT_SUBSCRIBER_QUEUE_SIZE):
+        self.redis_factory = redis_factory
+        self.async_redis_factory = async_redis_factory
+        self.maxlen = maxlen
+        self.heartbeat = heartbeat
+        self.retry_backoff = retry_backoff
+        self.max_failures = max_failures
+        self.queue_size = queue_size
+        self._readers = {}
+        self._local = collections.deque(maxlen=maxlen)
+        self._seq = 0
+        self._waiters = set()
+        self._lock = threading.Lock()
+
+    def publish_many(self, events):
+        if not events:
+            return
+        client = self.redis_factory()
+        if client is None:
+            self._publish_local(events)
+            return
+        try:
+            self._pipeline(client, events).execute()
+        except Exception:
+            self._publish_failed(events)
+            return
+        events_published.labels("redis").inc(len(events))
+
+    async def apublish_many(self, events):
+        """publish_many for async callers, through the asyncio client."""
+        if not events:
+            return
+        client = self.async_redis_factory()
+        if client is None:
+            self._publish_local(events)
+            return
+        try:
+            await self._pipeline(client, events).execute()
+        except Exception:
+            self._publish_failed(events)
+            return
+        events_published.labels("redis").inc(len(events))
+
+    def _pipeline(self, client, events):
+        pipe = client.pipeline(transaction=False)
+        for event in events:
+            pipe.xadd(EVENT_STREAM_KEY, {"data": json.dumps(event)}, maxlen=self.maxlen, approximate=True)
+        return pipe
+
+    def _publish_failed(self, events):
+        logger.warning(f"Could not publish {len(events)} credit request events", exc_info=True)
+        events_published.labels("error").inc(len(events))
+
+    def _publish_local(self, events):
+        with self._lock:
+            for event in events:
+                self._seq += 1
+                self._local.append((self._seq, event))
+            waiters = list(self._waiters)
+        events_published.labels("local").inc(len(events))
+        for loop, wakeup in waiters:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                pass
+
+    async def subscribe(self, last_id=None):
+        """Yields (event_id, event) for events after `last_id`, or from now on when it is None."""
+        client = self.async_redis_factory()
+        if client is None:
+            async for item in self._subscribe_local(last_id):
+                yield item
+            return
+        subscriber = self._register(client)
+        try:
+            while last_id is not None:
+                try:
+                    response = await client.xread({EVENT_STREAM_KEY: last_id}, count=100)
+                except Exception:
+                    logger.warning("Could not read missed credit request events, closing subscription", exc_info=True)
+                    return
+                if not response:
+                    break
+                for _, entries in response:
+                    for entry_id, fields in entries:
+                        last_id = entry_id
+                        yield entry_id, json.loads(fields["data"])
+            while True:
+                if subscriber.closed and subscriber.queue.empty():
+                    return
+                try:
+                    item = await asyncio.wait_for(subscriber.queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if item is _CLOSED:
+                    return
+                if item is None:
+                    yield None
+                    continue
+                entry_id, event = item
+                if last_id is not None and _id_key(entry_id) <= _id_key(last_id):
+                    continue
+                last_id = entry_id
+                yield entry_id, event
+        finally:
+            self._unregister(subscriber)
+
+    def _register(self, client):
+        loop = asyncio.get_running_loop()
+        reader = self._readers.get(loop)
+        if reader is None or reader.task.done():
+            reader = self._readers[loop] = _StreamReader()
+            reader.task = loop.create_task(self._read_stream(client, reader))
+        subscriber = _Subscriber(reader, self.queue_size)
+        reader.subscribers.add(subscriber)
+        return subscriber
+
+    def _unregister(self, subscriber):
+        reader = subscriber.reader
+        reader.subscribers.discard(subscriber)
+        if not reader.subscribers and not reader.task.done():
+            reader.task.cancel()
+        loop = asyncio.get_running_loop()
+        if self._readers.get(loop) is reader and not reader.subscribers:
+            del self._readers[loop]
+
+    async def _read_stream(self, client, reader):
+        last_id = None
+        failures = 0
+        while True:
+            try:
+                if last_id is None:
+                    newest = await client.xrevrange(EVENT_STREAM_KEY, count=1)
+                    last_id = newest[0][0] if newest else "0-0"
+                response = await client.xread({EVENT_STREAM_KEY: last_id}, block=int(self.heartbeat * 1000), count=100)
+            except Exception:
+                failures += 1
+                if failures >= self.max_failures:
+                    logger.warning("Event stream unavailable, closing subscriptions", exc_info=True)
+                    for subscriber in list(reader.subscribers):
+                        subscriber.close()
+                    return
+                if failures == 1:
+                    logger.warning("Could not read credit request events, retrying", exc_info=True)
+                await asyncio.sleep(min(self.retry_backoff * 2 ** (failures - 1), self.heartbeat))
+                self._fan_out(reader, None)
+                continue
+            failures = 0
+            for _, entries in response or ():
+                for entry_id, fields in entries:
+                    last_id = entry_id
+                    self._fan_out(reader, (entry_id, json.loads(fields["data"])))
+
+    def _fan_out(self, reader, item):
+        for subscriber in list(reader.subscribers):
+            try:
+                subscriber.queue.put_nowait(item)
+            except asyncio.QueueFull:
+                logger.warning("Event subscriber fell behind, closing its stream")
+                subscriber.close()
+
+    async def _subscribe_local(self, last_id):
+        wakeup = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), wakeup)
+        with self._lock:
+            self._waiters.add(waiter)
+            after = self._seq if last_id is None else int(last_id.split("-")[0])
+        try:
+            while True:
+                wakeup.clear()
+                with self._lock:
+                    pending = [(seq, event) for seq, event in self._local if seq > after]
+                for seq, event in pending:
+                    after = seq
+                    yield f"{seq}-0", event
+                if pending:
+                    continue
+                try:
+                    await asyncio.wait_for(wakeup.wait(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+event_bus = EventBus()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Enum, Text
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date, DateTime, Enum, Text, JSON, Index
 from sqlalchemy.orm import declarative_base, relationship
 import enum
 import datetime
@@ -12,6 +12,8 @@ class ApprovalStatus(enum.Enum):
     PENDING = "pending"
     APPROVED = "approved"
     REJECTED = "rejected"
+    SCREENING = "screening"
+    CANCELLED = "cancelled"
 
 class User(Base):
     __tablename__ = "users"
@@ -23,6 +25,10 @@ class User(Base):
     notify_sms = Column(Boolean, default=False)
     mfa_enabled = Column(Boolean, default=False)
     mfa_secret = Column(String, nullable=True) 
+    rating = Column(Float, nullable=True)
+    income = Column(Float, nullable=True)
+    cpf = Column(String, nullable=True)
+    email = Column(String, nullable=True)
 
 class CreditRequest(Base):
     __tablename__ = "credit_requests"
@@ -32,7 +38,16 @@ class CreditRequest(Base):
     status = Column(Enum(ApprovalStatus), default=ApprovalStatus.PENDING, index=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
     user = relationship("User")
-    redit_type = Column(String, nullable=False, default="pessoal")
+    credit_type = Column(String, nullable=False, default="pessoal")
+    bureau_result = Column(JSON, nullable=True)
+    screening_enqueued_at = Column(DateTime, nullable=True)
+    screening_attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    __table_args__ = (
+        Index("ix_credit_requests_created_at_id", "created_at", "id"),
+        Index("ix_credit_requests_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_credit_requests_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_credit_requests_amount_created_at", "amount", "created_at"),
+    )
 
 class ApprovalStage(Base):
     __tablename__ = "approval_stages"
@@ -69,10 +84,15 @@ class CreditRequestApproval(Base):
     approver_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     reviewed_at = Column(DateTime, nullable=True)
     rejection_reason = Column(String, nullable=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     credit_request = relationship("CreditRequest")
     stage = relationship("WorkflowStage")
     approver = relationship("User")
+    __table_args__ = (
+        Index("ix_credit_request_approvals_stage_id_status_id", "stage_id", "status", "id"),
+        Index("ix_credit_request_approvals_credit_request_id_status", "credit_request_id", "status"),
+    )
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
@@ -105,6 +125,29 @@ class NotificationLog(Base):
     response = Column(Text)                              
     timestamp = Column(DateTime, default=datetime.datetime.utcnow)
 
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    __table_args__ = (Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+    claimed_by = Column(String, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+
+class CreditRequestCounter(Base):
+    __tablename__ = "credit_request_counters"
+    day = Column(Date, primary_key=True)
+    status = Column(Enum(ApprovalStatus), primary_key=True)
+    credit_type = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
 if __name__ == "__main__":
     Base.metadata.create_all(bind=engine)
-
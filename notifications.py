@@ -1,17 +1,63 @@
+import contextlib
+import os
 import smtplib
 from email.mime.text import MIMEText
 
-def send_email(to_email, subject, body, from_email="no-reply@creditworkflow.com"):
+from sqlalchemy import insert
+
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.seuservidor.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USER = os.getenv("SMTP_USER", "usuario")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "senha")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") == "1"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "10"))
+DEFAULT_FROM_EMAIL = "no-reply@creditworkflow.com"
+
+@contextlib.contextmanager
+def smtp_session():
+    with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT) as server:
+        if SMTP_STARTTLS:
+            server.starttls()
+        if SMTP_USER:
+            server.login(SMTP_USER, SMTP_PASSWORD)
+        yield server
+
+def build_message(to_email, subject, body, from_email=DEFAULT_FROM_EMAIL):
     msg = MIMEText(body)
     msg["Subject"] = subject
     msg["From"] = from_email
     msg["To"] = to_email
+    return msg
 
-    with smtplib.SMTP("smtp.seuservidor.com", 587) as server:
-        server.starttls()
-        server.login("usuario", "senha")
+def send_email(to_email, subject, body, from_email=DEFAULT_FROM_EMAIL):
+    msg = build_message(to_email, subject, body, from_email)
+    with smtp_session() as server:
         server.sendmail(from_email, [to_email], msg.as_string())
 
+def email_address(user):
+    """Where to email `user`, or None when they have no address or opted out."""
+    return user.email if user.notify_email and user.email else None
+
+def queue_email(db, user_id, to_email, subject, body):
+    """Adds the email to the outbox in the caller's transaction; tasks.drain_email_outbox sends it."""
+    from models import EmailOutbox
+    if not to_email:
+        return None
+    message = EmailOutbox(user_id=user_id, to_email=to_email, subject=subject, body=body)
+    db.add(message)
+    return message
+
+def queue_emails(db, messages):
+    """queue_email for many (user_id, to_email, subject, body) tuples, as a single INSERT."""
+    from models import EmailOutbox
+    rows = [
+        {"user_id": user_id, "to_email": to_email, "subject": subject, "body": body}
+        for user_id, to_email, subject, body in messages if to_email
+    ]
+    if rows:
+        db.execute(insert(EmailOutbox), rows)
+    return len(rows)
+
 def send_sms(phone_number, message):
     print(f"SMS to {phone_number}: {message}")
 
@@ -19,4 +65,4 @@ def send_notification(user, subject, message):
     if getattr(user, "notify_email", False) and getattr(user, "email", None):
         send_email(user.email, subject, message)
     if getattr(user, "notify_sms", False) and getattr(user, "phone", None):
-        send_sms(user.phone, message)
\ No newline at end of file
+        send_sms(user.phone, message)
@@ -0,0 +1,62 @@
+import base64
+import datetime
+import json
+
+from sqlalchemy import tuple_
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode(values):
+    payload = json.dumps(values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode(cursor):
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def encode_cursor(created_at, id):
+    return _encode([created_at.isoformat(), id])
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, id = _decode(cursor)
+        return datetime.datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def keyset_page(query, created_at_column, id_column, limit, cursor=None):
+    """Newest-first page of `query` after `cursor`; returns (rows, next_cursor).
+
+    Seeks on (created_at, id) instead of using OFFSET, so any page costs the
+    same as the first one when a matching composite index exists.
+    """
+    if cursor:
+        query = query.filter(tuple_(created_at_column, id_column) < tuple_(*decode_cursor(cursor)))
+    rows = query.order_by(created_at_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, created_at_column.key), getattr(last, id_column.key))
+
+
+def encode_position(values):
+    return _encode(list(values))
+
+
+def decode_position(cursor, size):
+    """Integer tuple of length `size` from a cursor made by encode_position."""
+    try:
+        position = tuple(int(value) for value in _decode(cursor))
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor(cursor) from exc
+    if len(position) != size:
+        raise InvalidCursor(cursor)
+    return position
@@ -0,0 +1,181 @@
+import collections
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from prometheus_client import Counter
+
+from bureau_cache import LRUCache
+from redis_client import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", "300"))
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "5000"))
+QUERY_CACHE_PREFIX = "query-cache"
+QUERY_CACHE_REDIS_WARNING_INTERVAL = float(os.getenv("QUERY_CACHE_REDIS_WARNING_INTERVAL", "60"))
+
+query_cache_requests = Counter(
+    "query_cache_requests_total", "Endpoint result cache lookups", ["endpoint", "result"]
+)
+
+
+def _normalize(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return getattr(value, "value", value)
+
+
+def normalize_params(params):
+    """Drops unset parameters and sorts the rest, so equivalent queries share a key."""
+    return sorted((name, _normalize(value)) for name, value in params.items() if value is not None)
+
+
+class QueryCache:
+    """Caches endpoint results under tag versions.
+
+    Each key embeds the current version of every tag the entry carries.
+    invalidate() bumps those versions, which makes the old entries
+    unreachable; they then age out through their TTL. Versions are read before
+    the result is computed, so a write that lands mid-computation never leaves
+    a stale entry behind. Redis shares entries and versions between workers;
+    without it both live in process. While Redis is failing every request
+    computes its result directly and the failure is logged at most once per
+    QUERY_CACHE_REDIS_WARNING_INTERVAL.
+    """
+
+    def __init__(self, redis_factory=get_redis, async_redis_factory=get_async_redis, maxsize=QUERY_CACHE_SIZE,
+                 ttl=QUERY_CACHE_TTL, clock=time.monotonic):
+        self.redis_factory = redis_factory
+        self.async_redis_factory = async_redis_factory
+        self.ttl = ttl
+        self.clock = clock
+        self._warned_at = None
+        self._local = LRUCache(maxsize)
+        self._local_versions = collections.defaultdict(int)
+        self._lock = threading.Lock()
+
+    def _redis_failed(self, message):
+        now = self.clock()
+        if self._warned_at is None or now - self._warned_at >= QUERY_CACHE_REDIS_WARNING_INTERVAL:
+            self._warned_at = now
+            logger.warning(message, exc_info=True)
+
+    @staticmethod
+    def _tag_key(tag):
+        return f"{QUERY_CACHE_PREFIX}:tag:{tag}"
+
+    def _versions(self, client, tags):
+        if client is None:
+            with self._lock:
+                return [self._local_versions[tag] for tag in tags]
+        return [int(v or 0) for v in client.mget([self._tag_key(tag) for tag in tags])]
+
+    def _local_get(self, key):
+        with self._lock:
+            return self._local.get(key)
+
+    def _local_set(self, key, value, ttl):
+        with self._lock:
+            self._local.set(key, value, ttl)
+
+    def key(self, endpoint, params, scope, tags, versions):
+        payload = json.dumps(
+            [normalize_params(params), scope, list(zip(tags, versions))], sort_keys=True, default=str
+        )
+        return f"{QUERY_CACHE_PREFIX}:{endpoint}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+    def get_or_compute(self, endpoint, params, scope, tags, compute, ttl=None):
+        """Returns the cached result of `compute()`, which must be JSON-serializable."""
+        ttl = ttl or self.ttl
+        client = self.redis_factory()
+        try:
+            key = self.key(endpoint, params, scope, tags, self._versions(client, tags))
+            if client is None:
+                cached = self._local_get(key)
+            else:
+                cached = client.get(key)
+                cached = None if cached is None else json.loads(cached)
+        except Exception:
+            self._redis_failed("Query cache unavailable, computing without it")
+            query_cache_requests.labels(endpoint, "error").inc()
+            return compute()
+        if cached is not None:
+            query_cache_requests.labels(endpoint, "hit").inc()
+            return cached
+        query_cache_requests.labels(endpoint, "miss").inc()
+        value = compute()
+        try:
+            if client is None:
+                self._local_set(key, value, ttl)
+            else:
+                client.set(key, json.dumps(value, default=str), ex=ttl)
+        except Exception:
+            self._redis_failed("Could not store query cache entry")
+        return value
+
+    async def get_or_compute_async(self, endpoint, params, scope, tags, compute, ttl=None):
+        """get_or_compute for async handlers: `compute()` returns an awaitable and Redis is the asyncio client."""
+        ttl = ttl or self.ttl
+        client = self.async_redis_factory()
+        try:
+            if client is None:
+                key = self.key(endpoint, params, scope, tags, self._versions(None, tags))
+                cached = self._local_get(key)
+            else:
+                versions = [int(v or 0) for v in await client.mget([self._tag_key(tag) for tag in tags])]
+                key = self.key(endpoint, params, scope, tags, versions)
+                cached = await client.get(key)
+                cached = None if cached is None else json.loads(cached)
+        except Exception:
+            self._redis_failed("Query cache unavailable, computing without it")
+            query_cache_requests.labels(endpoint, "error").inc()
+            return await compute()
+        if cached is not None:
+            query_cache_requests.labels(endpoint, "hit").inc()
+            return cached
+        query_cache_requests.labels(endpoint, "miss").inc()
+        value = await compute()
+        try:
+            if client is None:
+                self._local_set(key, value, ttl)
+            else:
+                await client.set(key, json.dumps(value, default=str), ex=ttl)
+        except Exception:
+            self._redis_failed("Could not store query cache entry")
+        return value
+
+    def _bump_local(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._local_versions[tag] += 1
+
+    def invalidate(self, *tags):
+        self._bump_local(tags)
+        client = self.redis_factory()
+        if client is None:
+            return
+        try:
+            for tag in tags:
+                client.incr(self._tag_key(tag))
+        except Exception:
+            self._redis_failed(f"Could not invalidate query cache tags {tags}")
+
+    async def ainvalidate(self, *tags):
+        """invalidate for async handlers, bumping the versions with the asyncio client."""
+        self._bump_local(tags)
+        client = self.async_redis_factory()
+        if client is None:
+            return
+        try:
+            for tag in tags:
+                await client.incr(self._tag_key(tag))
+        except Exception:
+            self._redis_failed(f"Could not invalidate query cache tags {tags}")
+
+
+query_cache = QueryCache()
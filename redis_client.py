@@ -0,0 +1,34 @@
+import asyncio
+import os
+
+import redis
+import redis.asyncio as aioredis
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+
+_sync_client = None
+_async_clients = {}
+
+
+def get_redis():
+    """Shared sync client, or None when REDIS_URL is empty."""
+    global _sync_client
+    if not REDIS_URL:
+        return None
+    if _sync_client is None:
+        _sync_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+    return _sync_client
+
+
+def get_async_redis():
+    """Async client bound to the running event loop, or None when REDIS_URL is empty."""
+    if not REDIS_URL:
+        return None
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        for stale in [key for key in _async_clients if key.is_closed()]:
+            del _async_clients[stale]
+        client = aioredis.from_url(REDIS_URL, encoding="utf8", decode_responses=True)
+        _async_clients[loop] = client
+    return client
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import os
+import time
+
+import anyio.to_thread
+import psutil
+from prometheus_client import Gauge
+
+import database
+
+logger = logging.getLogger(__name__)
+
+RESOURCE_SAMPLE_INTERVAL = float(os.getenv("RESOURCE_SAMPLE_INTERVAL", "5"))
+
+cpu_usage_gauge = Gauge("app_cpu_usage_percent", "Process CPU usage since the previous sample")
+memory_usage_gauge = Gauge("app_memory_usage_mb", "Process resident set size in MB")
+thread_count_gauge = Gauge("app_threads", "Threads in the process")
+event_loop_lag_gauge = Gauge("app_event_loop_lag_seconds", "How late the sampler woke up on the event loop")
+threadpool_in_use_gauge = Gauge("app_threadpool_in_use", "Worker threads busy running sync handlers")
+threadpool_saturation_gauge = Gauge("app_threadpool_saturation", "Share of the threadpool limit in use")
+db_connections_gauge = Gauge("app_db_connections_checked_out", "Pooled DB connections in use", ["engine"])
+
+
+class ResourceSampler:
+    """Updates the process gauges every `interval` seconds from the event loop,
+    keeping psutil calls off the request path. `probes` are blocking callables
+    (e.g. gauges read from the database) run in a worker thread on each tick."""
+
+    def __init__(self, interval=RESOURCE_SAMPLE_INTERVAL, engines=None, process=None, probes=None):
+        self.interval = interval
+        self.engines = database.engines() if engines is None else engines
+        self.process = process or psutil.Process()
+        self.probes = list(probes or ())
+        self._task = None
+
+    def sample(self, lag=0.0):
+        with self.process.oneshot():
+            cpu_usage_gauge.set(self.process.cpu_percent())
+            memory_usage_gauge.set(self.process.memory_info().rss / 1024 / 1024)
+            thread_count_gauge.set(self.process.num_threads())
+        event_loop_lag_gauge.set(lag)
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        threadpool_in_use_gauge.set(limiter.borrowed_tokens)
+        threadpool_saturation_gauge.set(limiter.borrowed_tokens / limiter.total_tokens)
+        for name, sampled_engine in self.engines.items():
+            checkedout = getattr(sampled_engine.pool, "checkedout", None)
+            if checkedout is not None:
+                db_connections_gauge.labels(name).set(checkedout())
+
+    async def run(self):
+        self.process.cpu_percent()
+        lag = 0.0
+        while True:
+            try:
+                self.sample(lag)
+                for probe in self.probes:
+                    await anyio.to_thread.run_sync(probe)
+            except Exception:
+                logger.warning("Resource sampling failed", exc_info=True)
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - started - self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+resource_sampler = ResourceSampler()
@@ -0,0 +1,167 @@
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+
+import anyio.to_thread
+from prometheus_client import Counter
+
+from redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+REVOKED_KEY = "auth:revoked"
+REVOKED_LOG_KEY = "auth:revoked:log"
+REVOKED_SEQ_KEY = "auth:revoked:seq"
+# Numbers the log entry in the same step that stores it, so a worker that has seen
+# sequence N can never miss an entry with a lower number that lands later.
+REVOKE_SCRIPT = """
+local seq = redis.call('INCR', KEYS[3])
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+redis.call('ZADD', KEYS[2], seq, ARGV[1])
+return seq
+"""
+REVOCATION_SYNC_INTERVAL = float(os.getenv("REVOCATION_SYNC_INTERVAL", "1.0"))
+REVOCATION_REBUILD_INTERVAL = float(os.getenv("REVOCATION_REBUILD_INTERVAL", "300"))
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000"))
+REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", "0.001"))
+
+revocation_checks = Counter(
+    "token_revocation_checks_total", "Token revocation lookups by how they were answered", ["result"]
+)
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationStore:
+    """Revoked token IDs, each kept until its token's `exp`.
+
+    Redis holds the shared set: a sorted set scored by expiry, plus a log
+    scored by a sequence number that workers tail every `sync_interval`
+    seconds to update their Bloom filter. A Bloom miss answers "not revoked"
+    locally; only hits are confirmed against Redis. The filter is rebuilt from
+    the live entries every `rebuild_interval`, which also prunes expired ones.
+    Without Redis the store is process-local. Async callers use
+    ais_revoked(), which answers from the filter inline and moves any Redis
+    round trip to a worker thread.
+    """
+
+    def __init__(self, redis_factory=get_redis, sync_interval=REVOCATION_SYNC_INTERVAL,
+                 rebuild_interval=REVOCATION_REBUILD_INTERVAL, capacity=REVOCATION_BLOOM_CAPACITY,
+                 error_rate=REVOCATION_BLOOM_ERROR_RATE, clock=time.time):
+        self.redis_factory = redis_factory
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.clock = clock
+        self._local = {}
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._seq = 0
+        self._synced_at = None
+        self._rebuilt_at = None
+        self._lock = threading.Lock()
+
+    def revoke(self, token_id, exp):
+        if exp <= self.clock():
+            return
+        with self._lock:
+            self._local[token_id] = exp
+            self._bloom.add(token_id)
+        client = self.redis_factory()
+        if client is None:
+            return
+        try:
+            client.eval(REVOKE_SCRIPT, 3, REVOKED_KEY, REVOKED_LOG_KEY, REVOKED_SEQ_KEY, token_id, exp)
+        except Exception:
+            logger.warning("Could not store token revocation in Redis", exc_info=True)
+
+    def is_revoked(self, token_id):
+        now = self.clock()
+        client = self.redis_factory()
+        self._sync(client, now)
+        if token_id not in self._bloom:
+            revocation_checks.labels("bloom_negative").inc()
+            return False
+        exp = self._local.get(token_id)
+        if exp is None and client is not None:
+            try:
+                exp = client.zscore(REVOKED_KEY, token_id)
+            except Exception:
+                logger.warning("Could not confirm token revocation in Redis", exc_info=True)
+        revoked = exp is not None and exp > now
+        revocation_checks.labels("revoked" if revoked else "false_positive").inc()
+        return revoked
+
+    async def ais_revoked(self, token_id):
+        if not self._due_for_sync(self.clock()) and token_id not in self._bloom:
+            revocation_checks.labels("bloom_negative").inc()
+            return False
+        return await anyio.to_thread.run_sync(self.is_revoked, token_id)
+
+    def _due_for_sync(self, now):
+        return self._synced_at is None or now - self._synced_at >= self.sync_interval
+
+    def _sync(self, client, now):
+        if not self._due_for_sync(now):
+            return
+        with self._lock:
+            if not self._due_for_sync(now):
+                return
+            self._synced_at = now
+            if self._rebuilt_at is None or now - self._rebuilt_at >= self.rebuild_interval:
+                self._rebuild(client, now)
+            elif client is not None:
+                try:
+                    for token_id, seq in client.zrangebyscore(REVOKED_LOG_KEY, f"({self._seq}", "+inf", withscores=True):
+                        self._bloom.add(token_id)
+                        self._seq = max(self._seq, int(seq))
+                except Exception:
+                    logger.warning("Could not sync token revocations from Redis", exc_info=True)
+
+    def _rebuild(self, client, now):
+        """Reloads the filter; if Redis fails the current one is kept and the rebuild retried on the next sync."""
+        self._local = {token_id: exp for token_id, exp in self._local.items() if exp > now}
+        live = list(self._local)
+        seq = self._seq
+        if client is not None:
+            try:
+                expired = client.zrangebyscore(REVOKED_KEY, "-inf", now)
+                if expired:
+                    client.zrem(REVOKED_KEY, *expired)
+                    client.zrem(REVOKED_LOG_KEY, *expired)
+                seq = int(client.get(REVOKED_SEQ_KEY) or 0)
+                live.extend(client.zrangebyscore(REVOKED_KEY, f"({now}", "+inf"))
+            except Exception:
+                logger.warning("Could not load token revocations from Redis", exc_info=True)
+                return
+        bloom = BloomFilter(max(self.capacity, 2 * len(live)), self.error_rate)
+        for token_id in live:
+            bloom.add(token_id)
+        self._bloom = bloom
+        self._seq = seq
+        self._rebuilt_at = now
+
+
+revocation_store = RevocationStore()
@@ -1,53 +1,69 @@
 import datetime
 import logging
 import os
-from typing import Optional
-from urllib import request
+from typing import List, Literal, Optional
 
-from fastapi import FastAPI, Depends, HTTPException, Query, APIRouter
+from fastapi import FastAPI, Depends, HTTPException, Query, APIRouter, Response
+from starlette.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
 from fastapi import Request
+import asyncio
+import collections
+import json
 import pyotp
 from fastapi import Header
-from bureau import consulta_bureau_cpf, cpf_bureau_check
+from starlette.concurrency import run_in_threadpool
+from bureau import BUREAU_MAX_CONNECTIONS, BureauUnavailable, bureau_client
 
 
 import jwt
 import models
-from database import SessionLocal
-from auth import authenticate_user, create_access_token, get_current_user
-from pydantic import BaseModel
+from database import AsyncReadSessionLocal, AsyncSessionLocal, ReadSessionLocal, SessionLocal, engines
+from auth import authenticate_user, create_access_token, get_current_user, invalidate_principal
+from pydantic import BaseModel, ValidationError
 from schemas import CreditRequestResponse
+from pagination import InvalidCursor, decode_position, encode_position, keyset_page
+from query_cache import query_cache
+import counters
+import events
 import schemas
+import screening
+import tasks
+import transitions
 from prometheus_fastapi_instrumentator import Instrumentator
-from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
-import redis.asyncio as aioredis
-from fastapi_cache.decorator import cache
-from utils import get_email_template
-from notifications import send_email
-from prometheus_client import Gauge
-import psutil
-
-cpu_usage_gauge = Gauge("cpu_usage_percent", "CPU usage percentage")
-memory_usage_gauge = Gauge("memory_usage_mb", "Memory usage in MB")
+from audit import audit_logger, log_audit
+from config_cache import config_cache
+from rule_engine import RuleContext, evaluate_rules
+from simulate import simulate_rule_change
+from resource_sampler import resource_sampler
+import sql_metrics
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
-SECRET_KEY = os.getenv("SECRET_KEY", "secret")
 REFRESH_SECRET_KEY = os.getenv("REFRESH_SECRET_KEY", "refresh_secret")
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "500"))
+# Rows of a chunk evaluated at once; more than the bureau pool holds would time out waiting for a connection.
+BATCH_BUREAU_CONCURRENCY = min(int(os.getenv("BATCH_BUREAU_CONCURRENCY", str(BUREAU_MAX_CONNECTIONS))), BUREAU_MAX_CONNECTIONS)
 
 app = FastAPI()
 api_v1 = APIRouter()
 
+for instrumented_engine in engines().values():
+    sql_metrics.instrument(instrumented_engine)
+app.add_middleware(sql_metrics.SQLMetricsMiddleware)
+resource_sampler.probes.append(screening.sample_backlog)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 ROLE_PERMISSIONS = {
@@ -56,12 +72,6 @@ ROLE_PERMISSIONS = {
     "analyst": {"approve", "reject", "view_own"},
 }
 
-APPROVAL_FLOWS = {
-    "pessoal": ["analyst"],
-    "empresarial": ["analyst", "manager"],
-    "consignado": ["analyst", "manager", "director"]
-}
-
 def has_permission(user, permission):
     return permission in ROLE_PERMISSIONS.get(user.role, set())
 
@@ -72,24 +82,21 @@ def get_db():
     finally:
         db.close()
 
-@app.middleware("http")
-async def prometheus_resource_metrics(request, call_next):
-    response = await call_next(request)
-    cpu_usage_gauge.set(psutil.cpu_percent())
-    memory_usage_gauge.set(psutil.virtual_memory().used / 1024 / 1024)
-    return response
-
-def log_audit(db, user_id, action, credit_request_id, details="", ip=None):
-    from models import AuditLog
-    audit = AuditLog(
-        user_id=user_id,
-        action=action,
-        credit_request_id=credit_request_id,
-        details=details,
-        ip=ip
-    )
-    db.add(audit)
-    db.commit()
+def get_read_db():
+    """Session for read-only routes; served by DATABASE_READ_URL when configured."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
 
 @api_v1.post("/token")
 def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), mfa_code: Optional[str] = None):
@@ -110,19 +117,10 @@ def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), mf
         data={"sub": user.username},
         expires_delta=datetime.timedelta(days=7)
     )
-    db = SessionLocal()
     ip = request.client.host if request.client else None
-    log_audit(db, user.id, "login", details="User logged in", ip=ip)
-    db.close()
+    log_audit(None, user.id, "login", details="User logged in", ip=ip)
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
-def create_access_token(data: dict, expires_delta: datetime.timedelta):
-    to_encode = data.copy()
-    expire = datetime.datetime.utcnow() + expires_delta
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm="HS256")
-    return encoded_jwt
-
 def create_refresh_token(data: dict, expires_delta: datetime.timedelta):
     to_encode = data.copy()
     expire = datetime.datetime.utcnow() + expires_delta
@@ -151,9 +149,9 @@ def refresh_token(refresh_token: str):
         raise HTTPException(status_code=401, detail="Invalid refresh token")
 
 @api_v1.get("/credit-requests/")
-@cache(expire=30, namespace=lambda db, status, user_id, start_date, end_date, min_amount, max_amount, limit, current_user=None: f"user:{current_user.id}-status:{status}-min:{min_amount}-max:{max_amount}-limit:{limit}")
-def list_credit_requests(
-    db: Session = Depends(get_db),
+async def list_credit_requests(
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
     status: Optional[str] = Query(None, description="Filter by status"),
     user_id: Optional[int] = Query(None, description="Filter by user ID"),
     start_date: Optional[datetime.date] = Query(None, description="Start date (YYYY-MM-DD)"),
@@ -161,9 +159,23 @@ def list_credit_requests(
     min_amount: Optional[float] = Query(None, description="Minimum amount"),
     max_amount: Optional[float] = Query(None, description="Maximum amount"),
     limit: int = Query(20, ge=1, le=100, description="Limit number of results"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
     current_user: models.User = Depends(get_current_user)
 ):
     logger.info("Listagem de solicitações de crédito acessada.")
+    params = {
+        "status": status, "user_id": user_id, "start_date": start_date, "end_date": end_date,
+        "min_amount": min_amount, "max_amount": max_amount, "limit": limit, "cursor": cursor,
+    }
+    page = await query_cache.get_or_compute_async(
+        "list_credit_requests", params, current_user.role, ["credit_request:*"],
+        lambda: db.run_sync(_credit_request_page, **params),
+    )
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    return page["items"]
+
+def _credit_request_page(db, status, user_id, start_date, end_date, min_amount, max_amount, limit, cursor):
     query = db.query(models.CreditRequest)
     if status:
         query = query.filter(models.CreditRequest.status == status)
@@ -177,12 +189,57 @@ def list_credit_requests(
         query = query.filter(models.CreditRequest.amount >= min_amount)
     if max_amount is not None:
         query = query.filter(models.CreditRequest.amount <= max_amount)
-    query = query.order_by(models.CreditRequest.created_at.desc()).limit(limit)
-    return [CreditRequestResponse.model_validate(r) for r in query.all()]
+    try:
+        rows, next_cursor = keyset_page(query, models.CreditRequest.created_at, models.CreditRequest.id, limit, cursor)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {
+        "items": [CreditRequestResponse.model_validate(r).model_dump(mode="json") for r in rows],
+        "next_cursor": next_cursor,
+    }
+
+@api_v1.get("/credit-requests/stream")
+async def stream_credit_request_events(
+    request: Request,
+    credit_request_id: Optional[int] = Query(None, description="Only events for this request"),
+    last_event_id: Optional[str] = Header(None, description="Resume after this event id"),
+    current_user: models.User = Depends(get_current_user)
+):
+    if last_event_id and not events.valid_event_id(last_event_id):
+        raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+    return StreamingResponse(
+        _event_stream(request, current_user, last_event_id, credit_request_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def can_see_event(user, event):
+    """Staff with view_all see everything; others see their own requests, stages of their role and their own decisions."""
+    if has_permission(user, "view_all"):
+        return True
+    return user.id in (event["user_id"], event["actor_id"]) or event["stage"] == user.role
+
+async def _event_stream(request, user, last_event_id, credit_request_id=None):
+    events.event_subscribers.inc()
+    try:
+        yield "retry: 3000\n\n"
+        async for item in events.event_bus.subscribe(last_event_id):
+            if await request.is_disconnected():
+                break
+            if item is None:
+                yield ": keepalive\n\n"
+                continue
+            event_id, event = item
+            if credit_request_id is not None and event["credit_request_id"] != credit_request_id:
+                continue
+            if can_see_event(user, event):
+                yield f"id: {event_id}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        events.event_subscribers.dec()
 
 @api_v1.get("/credit-requests/{request_id}")
-def get_credit_request_status(request_id: int, db: Session = Depends(get_db)):
-    credit_request = db.query(models.CreditRequest).filter(models.CreditRequest.id == request_id).first()
+async def get_credit_request_status(request_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    credit_request = await db.get(models.CreditRequest, request_id)
     if not credit_request:
         raise HTTPException(status_code=404, detail="Credit request not found")
     return {
@@ -194,10 +251,8 @@ def get_credit_request_status(request_id: int, db: Session = Depends(get_db)):
 
 @api_v1.post("/logout")
 def logout(request: Request, current_user: models.User = Depends(get_current_user)):
-    db = SessionLocal()
     ip = request.client.host if request.client else None
-    log_audit(db, current_user.id, "logout", details="User logged out", ip=ip)
-    db.close()
+    log_audit(None, current_user.id, "logout", details="User logged out", ip=ip)
     authorization = request.headers.get("Authorization")
     if authorization and authorization.startswith("Bearer "):
         from auth import blacklist_token
@@ -219,38 +274,71 @@ def create_workflow_stage(name: str, order: int, db: Session = Depends(get_db),
     db.add(stage)
     db.commit()
     db.refresh(stage)
+    config_cache.invalidate()
     return stage
 
-@api_v1.post("/credit-requests/", response_model=CreditRequestResponse)
-def create_credit_request(
+@api_v1.post(
+    "/credit-requests/", response_model=CreditRequestResponse,
+    responses={202: {"model": schemas.CreditRequestAccepted, "description": "Accepted for screening"}},
+)
+async def create_credit_request(
+    request: Request,
     user_id: int, 
     amount: float, 
     credit_type: str,
-    db: Session = Depends(get_db)
+    mode: Literal["sync", "async"] = Query(
+        screening.INTAKE_MODE, description="async stores the request for screening by a worker and returns 202"
+    ),
+    db: AsyncSession = Depends(get_async_db),
+    read_db: AsyncSession = Depends(get_async_read_db),
 ):
-    user = db.query(models.User).filter_by(id=user_id).first()
-    bureau_result = cpf_bureau_check(user.cpf)
-    rule = db.query(models.BusinessRule).filter_by(name="default").first()
-
-    if rule.block_if_bureau_restriction and bureau_result.get("restriction"):
-        raise HTTPException(status_code=400, detail="Blocked by bureau restriction")
-    if rule.min_rating and getattr(user, "rating", 0) < rule.min_rating:
-        raise HTTPException(status_code=400, detail="Rating below minimum")
-    if rule.min_income and getattr(user, "income", 0) < rule.min_income:
-        raise HTTPException(status_code=400, detail="Income below minimum")
-    if bureau_result.get("restriction"):
-        logger.warning(f"Credit request blocked for user {user_id} due to bureau restriction.")
-        raise HTTPException(status_code=400, detail="Request blocked due to a restriction at the credit bureau")
-    credit_request = models.CreditRequest(user_id=user_id, amount=amount)
-    db.add(credit_request)
-    db.commit()
-    db.refresh(credit_request)
+    # The writer has a single connection on SQLite; keep it free while the bureau is called.
+    user = await read_db.get(models.User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
     ip = request.client.host if request.client else None
-    log_audit(db, user_id, "create_credit_request", credit_request.id, f"Amount: {amount}", ip=ip)
-    logger.info(f"Credit request created: id={credit_request.id}, user_id={user_id}, amount={amount}")
+    if mode == "async":
+        return await _accept_credit_request(request, db, user_id, amount, credit_type, ip)
+    ctx = RuleContext(user, credit_type, amount)
+    try:
+        outcome = await evaluate_rules(ctx, config_cache)
+    except BureauUnavailable as exc:
+        logger.warning(f"Bureau unavailable for user {user_id}: {exc}")
+        raise HTTPException(status_code=503, detail="Credit bureau unavailable, try again later")
+    if not outcome.passed:
+        logger.warning(f"Credit request blocked for user {user_id} by rule {outcome.failed_rule}.")
+        raise HTTPException(status_code=400, detail=outcome.detail)
+    return await _apersist_credit_request(db, user_id, amount, credit_type, ctx.bureau_result, ip)
+
+async def _accept_credit_request(request, db, user_id, amount, credit_type, ip):
+    credit_request = await _apersist_credit_request(
+        db, user_id, amount, credit_type, None, ip, models.ApprovalStatus.SCREENING
+    )
+    await run_in_threadpool(_enqueue_screening, credit_request.id)
+    status_url = str(request.url_for("get_credit_request_status", request_id=credit_request.id))
+    body = schemas.CreditRequestAccepted(
+        **CreditRequestResponse.model_validate(credit_request).model_dump(), status_url=status_url
+    )
+    return JSONResponse(body.model_dump(mode="json"), status_code=202, headers={"Location": status_url})
 
-    stage_names = APPROVAL_FLOWS.get(credit_type, ["analyst"])
-    stages = db.query(models.WorkflowStage).filter(models.WorkflowStage.name.in_(stage_names)).order_by(models.WorkflowStage.order).all()
+def _enqueue_screening(credit_request_id):
+    try:
+        tasks.process_credit_request.delay(credit_request_id)
+    except Exception:
+        logger.warning(f"Could not queue screening of credit request {credit_request_id}; "
+                       f"it will be queued again after {screening.SCREENING_REQUEUE_SECONDS:.0f}s", exc_info=True)
+
+def _insert_credit_request(db, user_id, amount, credit_type, bureau_result, status, stages):
+    now = datetime.datetime.utcnow()
+    screening_enqueued = status == models.ApprovalStatus.SCREENING
+    credit_request = models.CreditRequest(
+        user_id=user_id, amount=amount, credit_type=credit_type, bureau_result=bureau_result, status=status,
+        created_at=now, screening_enqueued_at=now if screening_enqueued else None,
+        screening_attempts=1 if screening_enqueued else 0,
+    )
+    db.add(credit_request)
+    counters.record_created(db, [(credit_request.created_at, credit_type)], status)
+    db.flush()
     for stage in stages:
         approval = models.CreditRequestApproval(
             credit_request_id=credit_request.id,
@@ -259,8 +347,158 @@ def create_credit_request(
         )
         db.add(approval)
     db.commit()
+    db.refresh(credit_request)
+    logger.info(f"Credit request created: id={credit_request.id}, user_id={user_id}, amount={amount}")
+    return credit_request
+
+async def _apersist_credit_request(db, user_id, amount, credit_type, bureau_result, ip, status=models.ApprovalStatus.PENDING):
+    """Stores a new credit request: only the inserts run inside run_sync, on the event loop;
+    the stage lookup and cache bump use async clients and the audit entry is queued from a worker thread."""
+    stages = await config_cache.astages(credit_type) if status == models.ApprovalStatus.PENDING else []
+    credit_request = await db.run_sync(_insert_credit_request, user_id, amount, credit_type, bureau_result, status, stages)
+    await run_in_threadpool(log_audit, None, user_id, "create_credit_request", credit_request.id, f"Amount: {amount}", ip=ip)
+    await query_cache.ainvalidate("credit_request:*", "dashboard")
     return credit_request
 
+class DuplexStreamingResponse(StreamingResponse):
+    """Streams results while the request body is still being read.
+
+    StreamingResponse normally listens for disconnects on `receive`, which
+    would race the endpoint for request body chunks; here the body reader
+    sees the disconnect itself.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+async def _ndjson_lines(request):
+    buffer = b""
+    async for data in request.stream():
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+def _load_users(db, user_ids):
+    users = db.query(models.User).filter(models.User.id.in_(user_ids)).all()
+    return {user.id: user for user in users}
+
+def _bulk_insert_credit_requests(db, rows, ip):
+    now = datetime.datetime.utcnow()
+    ids = db.scalars(
+        insert(models.CreditRequest).returning(models.CreditRequest.id, sort_by_parameter_order=True),
+        [
+            {
+                "user_id": item.user_id,
+                "amount": item.amount,
+                "credit_type": item.credit_type,
+                "bureau_result": bureau_result,
+                "created_at": now,
+            }
+            for item, bureau_result in rows
+        ],
+    ).all()
+    approvals = [
+        {"credit_request_id": credit_request_id, "stage_id": stage.id, "status": models.ApprovalStatus.PENDING}
+        for credit_request_id, (item, _) in zip(ids, rows)
+        for stage in config_cache.stages(item.credit_type)
+    ]
+    if approvals:
+        db.execute(insert(models.CreditRequestApproval), approvals)
+    db.execute(insert(models.AuditLog), [
+        {
+            "user_id": item.user_id,
+            "action": "create_credit_request",
+            "credit_request_id": credit_request_id,
+            "details": f"Amount: {item.amount}",
+            "ip": ip,
+            "timestamp": now,
+        }
+        for credit_request_id, (item, _) in zip(ids, rows)
+    ])
+    counters.record_created(db, [(now, item.credit_type) for item, _ in rows])
+    db.commit()
+    query_cache.invalidate("credit_request:*", "dashboard")
+    return ids
+
+async def _process_intake_chunk(db, read_db, chunk, ip):
+    """chunk holds (line_number, item, error) tuples; returns one result dict per line.
+
+    Users are loaded through `read_db` so `db` only holds the writer connection for the insert.
+    """
+    items = [item for _, item, _ in chunk if item is not None]
+    users = await run_in_threadpool(_load_users, read_db, {item.user_id for item in items})
+    contexts = {
+        line_number: RuleContext(users[item.user_id], item.credit_type, item.amount)
+        for line_number, item, _ in chunk
+        if item is not None and item.user_id in users
+    }
+    semaphore = asyncio.Semaphore(BATCH_BUREAU_CONCURRENCY)
+
+    async def evaluate(ctx):
+        async with semaphore:
+            return await evaluate_rules(ctx, config_cache)
+
+    outcomes = dict(zip(contexts, await asyncio.gather(
+        *(evaluate(ctx) for ctx in contexts.values()),
+        return_exceptions=True,
+    )))
+    results = {}
+    accepted = []
+    for line_number, item, error in chunk:
+        if item is None:
+            results[line_number] = {"line": line_number, "status": "invalid", "errors": error}
+            continue
+        if line_number not in contexts:
+            results[line_number] = {"line": line_number, "status": "rejected", "detail": "User not found"}
+            continue
+        outcome = outcomes[line_number]
+        if isinstance(outcome, BureauUnavailable):
+            results[line_number] = {"line": line_number, "status": "error", "detail": "Credit bureau unavailable"}
+            continue
+        if isinstance(outcome, BaseException):
+            raise outcome
+        if not outcome.passed:
+            results[line_number] = {"line": line_number, "status": "rejected", "detail": outcome.detail}
+            continue
+        accepted.append((line_number, item, contexts[line_number].bureau_result))
+    if accepted:
+        ids = await run_in_threadpool(
+            _bulk_insert_credit_requests, db, [(item, bureau_result) for _, item, bureau_result in accepted], ip
+        )
+        for (line_number, _, _), credit_request_id in zip(accepted, ids):
+            results[line_number] = {"line": line_number, "status": "created", "id": credit_request_id}
+    return [results[line_number] for line_number, _, _ in chunk]
+
+@api_v1.post("/credit-requests/batch")
+async def create_credit_requests_batch(
+    request: Request, db: Session = Depends(get_db), read_db: Session = Depends(get_read_db)
+):
+    ip = request.client.host if request.client else None
+
+    async def results():
+        chunk = []
+        line_number = 0
+        async for line in _ndjson_lines(request):
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                chunk.append((line_number, schemas.CreditRequestBatchItem.model_validate_json(line), None))
+            except ValidationError as exc:
+                chunk.append((line_number, None, exc.errors(include_url=False, include_context=False, include_input=False)))
+            if len(chunk) >= BATCH_CHUNK_SIZE:
+                for result in await _process_intake_chunk(db, read_db, chunk, ip):
+                    yield json.dumps(result) + "\n"
+                chunk = []
+        if chunk:
+            for result in await _process_intake_chunk(db, read_db, chunk, ip):
+                yield json.dumps(result) + "\n"
+
+    return DuplexStreamingResponse(results(), media_type="application/x-ndjson")
+
 @api_v1.put("/business-rules/{rule_id}")
 def update_business_rule(rule_id: int, rule_data: dict, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     if current_user.role != "admin":
@@ -269,136 +507,278 @@ def update_business_rule(rule_id: int, rule_data: dict, db: Session = Depends(ge
     for key, value in rule_data.items():
         setattr(rule, key, value)
     db.commit()
+    config_cache.invalidate()
     return {"detail": "Rule updated"}
 
+@api_v1.post("/business-rules/{rule_id}/simulate")
+def simulate_business_rule(
+    rule_id: int,
+    rule_data: dict,
+    status: Optional[List[str]] = Query(None, description="Only simulate requests in these statuses"),
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    rule = db.query(models.BusinessRule).filter_by(id=rule_id).first()
+    if not rule:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    try:
+        statuses = [models.ApprovalStatus(s) for s in status] if status else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid status filter")
+    return simulate_rule_change(db, rule, rule_data, statuses)
+
 @api_v1.get("/credit-requests/{credit_request_id}/approvals")
-def list_approvals(credit_request_id: int, db: Session = Depends(get_db)):
-    approvals = db.query(models.CreditRequestApproval).filter_by(credit_request_id=credit_request_id).all()
+def list_approvals(credit_request_id: int, db: Session = Depends(get_read_db)):
+    return _approval_chain(db, credit_request_id)
+
+def _approval_chain(db, credit_request_id):
+    """One joined query over approvals, their stage and approver, in stage order."""
+    approver = aliased(models.User)
+    rows = db.execute(
+        select(
+            models.CreditRequestApproval.id,
+            models.WorkflowStage.name,
+            models.CreditRequestApproval.status,
+            approver.username,
+            models.CreditRequestApproval.reviewed_at,
+            models.CreditRequestApproval.rejection_reason,
+        )
+        .join(models.WorkflowStage, models.WorkflowStage.id == models.CreditRequestApproval.stage_id)
+        .outerjoin(approver, approver.id == models.CreditRequestApproval.approver_id)
+        .where(models.CreditRequestApproval.credit_request_id == credit_request_id)
+        .order_by(models.WorkflowStage.order, models.CreditRequestApproval.id)
+    ).all()
     return [
         {
-            "id": approval.id,
-            "stage": approval.stage.name,
-            "status": approval.status.value,
-            "approver": approval.approver.username if approval.approver else None,
-            "reviewed_at": approval.reviewed_at,
-            "rejection_reason": approval.rejection_reason
+            "id": approval_id,
+            "stage": stage,
+            "status": status.value,
+            "approver": approver_name,
+            "reviewed_at": reviewed_at,
+            "rejection_reason": rejection_reason
         }
-        for approval in approvals
+        for approval_id, stage, status, approver_name, reviewed_at, rejection_reason in rows
+    ]
+
+def _audit_trail(db, credit_request_id):
+    rows = db.execute(
+        select(
+            models.AuditLog.timestamp,
+            models.AuditLog.action,
+            models.User.username,
+            models.AuditLog.details,
+        )
+        .outerjoin(models.User, models.User.id == models.AuditLog.user_id)
+        .where(models.AuditLog.credit_request_id == credit_request_id)
+        .order_by(models.AuditLog.timestamp, models.AuditLog.id)
+    ).all()
+    return [
+        {"timestamp": timestamp, "action": action, "user": username, "details": details}
+        for timestamp, action, username, details in rows
     ]
 
+@api_v1.get("/credit-requests/{credit_request_id}/detail")
+def credit_request_detail(
+    credit_request_id: int,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """Status, approval chain and audit trail for one request, in three queries.
+
+    Visible to the request's owner and to roles with view_all."""
+    credit_request = db.execute(
+        select(
+            models.CreditRequest.id,
+            models.CreditRequest.status,
+            models.CreditRequest.amount,
+            models.CreditRequest.user_id,
+            models.CreditRequest.credit_type,
+            models.CreditRequest.created_at,
+        ).where(models.CreditRequest.id == credit_request_id)
+    ).first()
+    if not credit_request:
+        raise HTTPException(status_code=404, detail="Credit request not found")
+    if credit_request.user_id != current_user.id and not has_permission(current_user, "view_all"):
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return {
+        "id": credit_request.id,
+        "status": credit_request.status.value,
+        "amount": credit_request.amount,
+        "user_id": credit_request.user_id,
+        "credit_type": credit_request.credit_type,
+        "created_at": credit_request.created_at,
+        "approvals": _approval_chain(db, credit_request_id),
+        "audit_trail": _audit_trail(db, credit_request_id),
+    }
+
 
 @api_v1.put("/users/{user_id}/preferences")
-def update_preferences(user_id: int, preferences: schemas.UserPreferences, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def update_preferences(request: Request, user_id: int, preferences: schemas.UserPreferences, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     user = db.query(models.User).filter_by(id=user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     user.notify_email = preferences.notify_email
     user.notify_sms = preferences.notify_sms
     db.commit()
+    invalidate_principal(user.id)
+    query_cache.invalidate("user:*")
     ip = request.client.host if request.client else None
     log_audit(db, current_user.id, "update_preferences", user_id, f"notify_email={preferences.notify_email}, notify_sms={preferences.notify_sms}", ip=ip)
     return {"detail": "Preferences updated"}
 
 @api_v1.post("/credit-requests/{credit_request_id}/approve")
-def approve_stage(
+async def approve_stage(
+    request: Request,
     credit_request_id: int, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)):
+    ip = request.client.host if request.client else None
+    decided = []
+    result = await db.run_sync(_approve_stage, credit_request_id, current_user, ip, decided)
+    await query_cache.ainvalidate("credit_request:*", "dashboard")
+    await events.event_bus.apublish_many(decided)
+    return result
 
+def _approve_stage(db, credit_request_id, current_user, ip, decided):
     if not has_permission(current_user, "approve"):
         raise HTTPException(status_code=403, detail="Not authorized")
-
-    approval = db.query(models.CreditRequestApproval).join(models.WorkflowStage).filter(
-        models.CreditRequestApproval.credit_request_id == credit_request_id,
-        models.CreditRequestApproval.status == models.ApprovalStatus.PENDING,
-        models.WorkflowStage.name == current_user.role 
-    ).order_by(models.WorkflowStage.order).first()
-
-    if not approval:
+    try:
+        transitions.approve(db, credit_request_id, current_user, ip=ip, events=decided)
+    except transitions.NoPendingApproval:
         raise HTTPException(status_code=403, detail="No pending approval for your role or already approved.")
-
-    approval.status = models.ApprovalStatus.APPROVED
-    approval.approver_id = current_user.id
-    approval.reviewed_at = datetime.datetime.utcnow()
-    db.commit()
-    ip = request.client.host if request.client else None
-    log_audit(db, current_user.id, "approve", credit_request_id, "Stage approved", ip=ip)
-    credit_request = db.query(models.CreditRequest).filter_by(id=credit_request_id).first()
-    user = db.query(models.User).filter_by(id=credit_request.user_id).first()
-    template = get_email_template("approved", credit_request_id)
-    send_email(user.email, template["subject"], template["body"])
+    except transitions.TransitionConflict:
+        raise HTTPException(status_code=409, detail="Approval was decided concurrently, reload and retry.")
     return {"detail": "Stage approved"}
 
 def notify_user(user_email, subject, message):
     logger.info(f"Notify {user_email}: {subject} - {message}")
 
 @api_v1.get("/credit-requests/{credit_request_id}/history")
-def approval_history(credit_request_id: int, db: Session = Depends(get_db)):
-    approvals = db.query(models.CreditRequestApproval).filter_by(credit_request_id=credit_request_id).all()
+def approval_history(credit_request_id: int, db: Session = Depends(get_read_db)):
     return [
-        {
-            "stage": approval.stage.name,
-            "status": approval.status.value,
-            "approver": approval.approver.username if approval.approver else None,
-            "reviewed_at": approval.reviewed_at,
-            "rejection_reason": getattr(approval, "rejection_reason", None)
-        }
-        for approval in approvals
+        {key: value for key, value in approval.items() if key != "id"}
+        for approval in _approval_chain(db, credit_request_id)
     ]
 
 @api_v1.post("/credit-requests/{credit_request_id}/reject")
-def reject_stage(
+async def reject_stage(
+    request: Request,
     credit_request_id: int,
     reason: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    approval = db.query(models.CreditRequestApproval).join(models.WorkflowStage).filter(
-        models.CreditRequestApproval.credit_request_id == credit_request_id,
-        models.CreditRequestApproval.status == models.ApprovalStatus.PENDING,
-        models.WorkflowStage.name == current_user.role
-    ).order_by(models.WorkflowStage.order).first()
+    ip = request.client.host if request.client else None
+    decided = []
+    result = await db.run_sync(_reject_stage, credit_request_id, reason, current_user, ip, decided)
+    await query_cache.ainvalidate("credit_request:*", "dashboard")
+    await events.event_bus.apublish_many(decided)
+    return result
 
-    if not approval:
+def _reject_stage(db, credit_request_id, reason, current_user, ip, decided):
+    try:
+        transitions.reject(db, credit_request_id, current_user, reason, ip=ip, events=decided)
+    except transitions.NoPendingApproval:
         raise HTTPException(status_code=403, detail="No pending approval for your role or already rejected.")
+    except transitions.TransitionConflict:
+        raise HTTPException(status_code=409, detail="Approval was decided concurrently, reload and retry.")
+    return {"detail": "Stage rejected"}
 
-    approval.status = models.ApprovalStatus.REJECTED
-    approval.approver_id = current_user.id
-    approval.reviewed_at = datetime.datetime.utcnow()
-    approval.rejection_reason = reason
-    db.commit()
+@api_v1.post("/approvals/bulk")
+async def bulk_decide(
+    request: Request,
+    decision: schemas.BulkDecision,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    if not has_permission(current_user, decision.action):
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if decision.action == "reject" and not decision.reason:
+        raise HTTPException(status_code=422, detail="A reason is required to reject")
     ip = request.client.host if request.client else None
-    log_audit(db, current_user.id, "reject", credit_request_id, f"Reason: {reason}", ip=ip)
-    credit_request = db.query(models.CreditRequest).filter_by(id=credit_request_id).first()
-    user = db.query(models.User).filter_by(id=credit_request.user_id).first()
-    template = get_email_template("rejected", credit_request_id)
-    send_email(user.email, template["subject"], template["body"])
-    return {"detail": "Stage rejected"}
+    status = models.ApprovalStatus.APPROVED if decision.action == "approve" else models.ApprovalStatus.REJECTED
+    decided = []
+    outcomes = await db.run_sync(
+        transitions.decide_many, decision.credit_request_ids, current_user, status, reason=decision.reason, ip=ip,
+        events=decided,
+    )
+    changed = [i for i, outcome in outcomes.items() if outcome not in (transitions.NO_PENDING_APPROVAL, transitions.CONFLICT)]
+    if changed:
+        await query_cache.ainvalidate("credit_request:*", "dashboard")
+        await events.event_bus.apublish_many(decided)
+    logger.info(f"Bulk {decision.action} by user {current_user.id}: {len(changed)}/{len(outcomes)} applied")
+    return {
+        "results": [{"credit_request_id": i, "outcome": outcome} for i, outcome in outcomes.items()],
+        "summary": dict(collections.Counter(outcomes.values())),
+    }
+
+@api_v1.get("/work-queue")
+async def work_queue(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200, description="Limit number of results"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    items, next_cursor = await db.run_sync(_work_queue_page, current_user.role, limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+def _work_queue_page(db, role, limit, cursor):
+    """Earliest stage first, oldest approval first within a stage: the order approve_stage picks
+    stages in. Each stage is read straight off the (stage_id, status, id) index."""
+    try:
+        after = decode_position(cursor, 2) if cursor else (0, 0)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    stages = db.query(models.WorkflowStage).filter(
+        models.WorkflowStage.name == role, models.WorkflowStage.order >= after[0]
+    ).order_by(models.WorkflowStage.order).all()
+    Approval = models.CreditRequestApproval
+    rows = []
+    for stage in stages:
+        query = transitions.work_queue(db, stage)
+        if stage.order == after[0]:
+            query = query.filter(Approval.id > after[1])
+        rows.extend((stage, row) for row in query.order_by(Approval.id).limit(limit + 1 - len(rows)))
+        if len(rows) > limit:
+            break
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_position([rows[-1][0].order, rows[-1][1].id])
+    items = [
+        {
+            "approval_id": row.id,
+            "credit_request_id": row.credit_request_id,
+            "stage": stage.name,
+            "user_id": row.user_id,
+            "amount": row.amount,
+            "credit_type": row.credit_type,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+        }
+        for stage, row in rows
+    ]
+    return items, next_cursor
 
 @api_v1.get("/users/")
-@cache(expire=60)
 def list_users(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_user)
 ):
     if not has_permission(current_user, "view_all"):
         raise HTTPException(status_code=403, detail="Not authorized")
-    users = db.query(models.User).all()
-    return [{"id": u.id, "username": u.username, "role": u.role} for u in users]
+    return query_cache.get_or_compute(
+        "list_users", {}, current_user.role, ["user:*"],
+        lambda: [{"id": u.id, "username": u.username, "role": u.role} for u in db.query(models.User).all()],
+    )
 
 @api_v1.get("/dashboard/summary")
-@cache(expire=60)
-def dashboard_summary(db: Session = Depends(get_db)):
-    total_requests = db.query(models.CreditRequest).count()
-    pending = db.query(models.CreditRequest).filter(models.CreditRequest.status == models.ApprovalStatus.PENDING).count()
-    approved = db.query(models.CreditRequest).filter(models.CreditRequest.status == models.ApprovalStatus.APPROVED).count()
-    rejected = db.query(models.CreditRequest).filter(models.CreditRequest.status == models.ApprovalStatus.REJECTED).count()
-    return {
-        "total_requests": total_requests,
-        "pending": pending,
-        "approved": approved,
-        "rejected": rejected
-    }
+def dashboard_summary(db: Session = Depends(get_read_db)):
+    return query_cache.get_or_compute("dashboard_summary", {}, None, ["dashboard"], lambda: counters.summary(db))
 
 @api_v1.post("/users/{user_id}/enable-mfa")
 def enable_mfa(user_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
@@ -409,6 +789,8 @@ def enable_mfa(user_id: int, db: Session = Depends(get_db), current_user: models
     user.mfa_secret = secret
     user.mfa_enabled = True
     db.commit()
+    invalidate_principal(user.id)
+    query_cache.invalidate("user:*")
     return {
         "mfa_secret": secret,
         "otpauth_url": pyotp.totp.TOTP(secret).provisioning_uri(user.username, issuer_name="CreditWorkflow")
@@ -420,8 +802,13 @@ def healthcheck():
 
 @api_v1.on_event("startup")
 async def startup():
-    redis = aioredis.from_url("redis://localhost:6379", encoding="utf8", decode_responses=True)
-    FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
+    resource_sampler.start()
+
+@api_v1.on_event("shutdown")
+async def shutdown():
+    await resource_sampler.stop()
+    await bureau_client.aclose()
+    await run_in_threadpool(audit_logger.stop)
 
 Instrumentator().instrument(app).expose(app)
 app.include_router(api_v1, prefix="/api/v1")
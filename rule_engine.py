@@ -0,0 +1,130 @@
+import inspect
+import time
+
+from prometheus_client import Histogram
+
+from bureau_cache import cached_bureau_check
+from config_cache import config_cache
+
+LOCAL_COST = 1
+EXTERNAL_COST = 100
+
+rule_evaluation_seconds = Histogram(
+    "rule_evaluation_seconds", "Time spent evaluating one credit rule", ["rule"]
+)
+
+_rule_builders = []
+
+
+def rule_builder(builder):
+    """Registers `builder(rule, credit_type)`, which returns a Predicate or None."""
+    _rule_builders.append(builder)
+    return builder
+
+
+class Predicate:
+    """`check(ctx)` returns a failure message or None; it may be a coroutine."""
+
+    def __init__(self, name, check, cost=LOCAL_COST):
+        self.name = name
+        self.check = check
+        self.cost = cost
+
+
+class RuleContext:
+    def __init__(self, user, credit_type, amount=None, bureau_result=None):
+        self.user = user
+        self.credit_type = credit_type
+        self.amount = amount
+        self.bureau_result = bureau_result
+
+    async def bureau(self):
+        self.bureau_result = await cached_bureau_check(self.user.cpf, stored=self.bureau_result)
+        return self.bureau_result
+
+
+class RuleOutcome:
+    def __init__(self, failed_rule=None, detail=None, timings=None):
+        self.failed_rule = failed_rule
+        self.detail = detail
+        self.timings = timings or {}
+
+    @property
+    def passed(self):
+        return self.failed_rule is None
+
+
+class CompiledRules:
+    def __init__(self, predicates):
+        self.predicates = sorted(predicates, key=lambda p: p.cost)
+
+    async def evaluate(self, ctx):
+        timings = {}
+        for predicate in self.predicates:
+            started = time.perf_counter()
+            detail = predicate.check(ctx)
+            if inspect.isawaitable(detail):
+                detail = await detail
+            elapsed = time.perf_counter() - started
+            timings[predicate.name] = elapsed
+            rule_evaluation_seconds.labels(predicate.name).observe(elapsed)
+            if detail:
+                return RuleOutcome(predicate.name, detail, timings)
+        return RuleOutcome(timings=timings)
+
+
+def compile_rules(rule, credit_type):
+    predicates = [builder(rule, credit_type) for builder in _rule_builders]
+    return CompiledRules([p for p in predicates if p is not None])
+
+
+def _compiled(snapshot, credit_type):
+    """Compiled pipeline for `credit_type`, kept on the config snapshot so it is rebuilt when the config changes.
+
+    A BusinessRule named after the credit type takes precedence over "default".
+    """
+    compiled = snapshot.__dict__.setdefault("compiled_rules", {})
+    if credit_type not in compiled:
+        rule = snapshot.rules.get(credit_type) or snapshot.rules.get("default")
+        compiled[credit_type] = compile_rules(rule, credit_type)
+    return compiled[credit_type]
+
+
+async def evaluate_rules(ctx, cache=config_cache):
+    return await _compiled(await cache.aget(), ctx.credit_type).evaluate(ctx)
+
+
+@rule_builder
+def _min_rating(rule, credit_type):
+    if rule is None or not rule.min_rating:
+        return None
+    return Predicate(
+        "min_rating",
+        lambda ctx: "Rating below minimum" if (getattr(ctx.user, "rating", 0) or 0) < rule.min_rating else None,
+    )
+
+
+@rule_builder
+def _min_income(rule, credit_type):
+    if rule is None or not rule.min_income:
+        return None
+    return Predicate(
+        "min_income",
+        lambda ctx: "Income below minimum" if (getattr(ctx.user, "income", 0) or 0) < rule.min_income else None,
+    )
+
+
+@rule_builder
+def _bureau_restriction(rule, credit_type):
+    if rule is not None and rule.block_if_bureau_restriction:
+        message = "Blocked by bureau restriction"
+    else:
+        message = "Request blocked due to a restriction at the credit bureau"
+
+    async def check(ctx):
+        if ctx.bureau_result is None and not ctx.user.cpf:
+            return "A CPF is required for the credit bureau check"
+        bureau_result = await ctx.bureau()
+        return message if bureau_result.get("restriction") else None
+
+    return Predicate("bureau_restriction", check, cost=EXTERNAL_COST)
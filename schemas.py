@@ -1,8 +1,7 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel, Field, validator
-from sqlalchemy import JSON, Column
 
 class CreditRequestCreate(BaseModel):
     user_id: int = Field(..., gt=0, description="User ID must be positive")
@@ -29,12 +28,17 @@ class UserResponse(BaseModel):
     username: str
     role: str
 
-model_config = {"from_attributes": True}
+    model_config = {"from_attributes": True}
 
 class CreditRequestCreate(BaseModel):
     user_id: int
     amount: float
-    bureau_result = Column(JSON, nullable=True)
+    bureau_result: Optional[dict] = None
+
+class CreditRequestBatchItem(BaseModel):
+    user_id: int = Field(..., gt=0)
+    amount: float = Field(..., gt=0)
+    credit_type: str = "pessoal"
 
 class CreditRequestResponse(BaseModel):
     id: int
@@ -43,4 +47,16 @@ class CreditRequestResponse(BaseModel):
     status: str
     created_at: datetime
 
-model_config = {"from_attributes": True}
\ No newline at end of file
+    model_config = {"from_attributes": True}
+
+    @validator("status", pre=True)
+    def status_value(cls, value):
+        return getattr(value, "value", value)
+
+class CreditRequestAccepted(CreditRequestResponse):
+    status_url: str
+
+class BulkDecision(BaseModel):
+    credit_request_ids: List[int] = Field(..., min_length=1, max_length=500)
+    action: Literal["approve", "reject"]
+    reason: Optional[str] = None
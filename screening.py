@@ -0,0 +1,146 @@
+"""Asynchronous intake.
+
+With INTAKE_MODE=async (or ?mode=async on POST /credit-requests/) a new
+request is stored as SCREENING and the API answers 202 right away. A Celery
+worker then runs the bureau call and the rule checks and either opens the
+approval chain (PENDING) or rejects the request, so peaks queue up in the
+workers instead of in API latency. Requests whose task was lost are queued
+again by beat once SCREENING_REQUEUE_SECONDS have passed since their last
+enqueue, at most SCREENING_REQUEUE_LIMIT per run and SCREENING_MAX_ENQUEUES
+times in total; requests past that stay in SCREENING for an operator (the
+backlog gauges keep counting them).
+"""
+import datetime
+import os
+
+from prometheus_client import Gauge
+from sqlalchemy import and_, func, insert, or_, select, update
+
+import counters
+import models
+from audit import audit_entries
+from database import ReadSessionLocal
+from events import event_bus
+from models import ApprovalStatus
+from notifications import email_address, queue_emails
+from query_cache import query_cache
+from rule_engine import RuleContext
+from utils import get_email_template
+
+INTAKE_MODE = os.getenv("INTAKE_MODE", "sync")
+SCREENING_REQUEUE_SECONDS = float(os.getenv("SCREENING_REQUEUE_SECONDS", "300"))
+SCREENING_REQUEUE_LIMIT = int(os.getenv("SCREENING_REQUEUE_LIMIT", "500"))
+SCREENING_MAX_ENQUEUES = int(os.getenv("SCREENING_MAX_ENQUEUES", "5"))
+
+screening_backlog = Gauge("credit_requests_screening", "Credit requests waiting for screening")
+screening_lag = Gauge("credit_request_screening_lag_seconds", "How long the oldest request waiting for screening has waited")
+
+
+def load(db, credit_request_id):
+    """(credit_request, RuleContext) for a request still in SCREENING, or None.
+
+    The read transaction is closed before returning, so no connection is held
+    during the bureau call."""
+    row = db.execute(
+        select(models.CreditRequest, models.User)
+        .join(models.User, models.CreditRequest.user_id == models.User.id)
+        .where(models.CreditRequest.id == credit_request_id, models.CreditRequest.status == ApprovalStatus.SCREENING)
+    ).first()
+    if row is None:
+        db.rollback()
+        return None
+    credit_request, user = row
+    db.expunge(credit_request)
+    db.expunge(user)
+    db.rollback()
+    ctx = RuleContext(user, credit_request.credit_type, credit_request.amount, credit_request.bureau_result)
+    return credit_request, ctx
+
+
+def finish(db, credit_request, ctx, outcome, stages):
+    """Moves a loaded request out of SCREENING: PENDING with one approval per stage when the rules
+    passed, REJECTED (with the customer email) otherwise. Returns the new status, or None when
+    another worker finished it first."""
+    status = ApprovalStatus.PENDING if outcome.passed else ApprovalStatus.REJECTED
+    now = datetime.datetime.utcnow()
+    updated = db.execute(
+        update(models.CreditRequest)
+        .where(models.CreditRequest.id == credit_request.id, models.CreditRequest.status == ApprovalStatus.SCREENING)
+        .values(status=status, bureau_result=ctx.bureau_result)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not updated:
+        db.rollback()
+        return None
+    counters.record_transition(db, credit_request, ApprovalStatus.SCREENING, status)
+    if outcome.passed:
+        if stages:
+            db.execute(insert(models.CreditRequestApproval), [
+                {"credit_request_id": credit_request.id, "stage_id": stage.id, "status": ApprovalStatus.PENDING}
+                for stage in stages
+            ])
+        details = "Screening passed"
+    else:
+        template = get_email_template(status.value, credit_request.id, reason=outcome.detail)
+        queue_emails(db, [(ctx.user.id, email_address(ctx.user), template["subject"], template["body"])])
+        details = f"Rule {outcome.failed_rule}: {outcome.detail}"
+    db.execute(insert(models.AuditLog).values(
+        user_id=credit_request.user_id, action="screen", credit_request_id=credit_request.id, timestamp=now,
+        details=details,
+    ))
+    db.commit()
+    audit_entries.labels("strict").inc()
+    query_cache.invalidate("credit_request:*", "dashboard")
+    event_bus.publish_many([{
+        "type": "screening_passed" if outcome.passed else "request_rejected",
+        "credit_request_id": credit_request.id, "user_id": credit_request.user_id, "stage": None,
+        "actor_id": None, "at": now.isoformat(),
+    }])
+    return status
+
+
+def stale(db, older_than=SCREENING_REQUEUE_SECONDS, now=None, limit=SCREENING_REQUEUE_LIMIT,
+          max_enqueues=SCREENING_MAX_ENQUEUES):
+    """Ids of up to `limit` screening requests last enqueued more than `older_than` seconds ago,
+    skipping those already enqueued `max_enqueues` times."""
+    cutoff = (now or datetime.datetime.utcnow()) - datetime.timedelta(seconds=older_than)
+    enqueued_at = models.CreditRequest.screening_enqueued_at
+    return list(db.scalars(
+        select(models.CreditRequest.id)
+        .where(
+            models.CreditRequest.status == ApprovalStatus.SCREENING,
+            or_(enqueued_at < cutoff, and_(enqueued_at.is_(None), models.CreditRequest.created_at < cutoff)),
+            models.CreditRequest.screening_attempts < max_enqueues,
+        )
+        .order_by(models.CreditRequest.id)
+        .limit(limit)
+    ))
+
+
+def mark_enqueued(db, credit_request_ids, now=None):
+    """Records that the requests were handed to the queue again, so stale() waits a full period before the next try."""
+    if not credit_request_ids:
+        return
+    db.execute(
+        update(models.CreditRequest)
+        .where(models.CreditRequest.id.in_(credit_request_ids), models.CreditRequest.status == ApprovalStatus.SCREENING)
+        .values(screening_enqueued_at=now or datetime.datetime.utcnow(),
+                screening_attempts=models.CreditRequest.screening_attempts + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def sample_backlog(session_factory=ReadSessionLocal, now=None):
+    """Sets the backlog gauges from the requests currently in SCREENING."""
+    db = session_factory()
+    try:
+        count, oldest = db.execute(
+            select(func.count(), func.min(models.CreditRequest.created_at))
+            .where(models.CreditRequest.status == ApprovalStatus.SCREENING)
+        ).one()
+    finally:
+        db.close()
+    screening_backlog.set(count)
+    lag = ((now or datetime.datetime.utcnow()) - oldest).total_seconds() if oldest else 0.0
+    screening_lag.set(max(lag, 0.0))
@@ -0,0 +1,256 @@
+"""Synthetic users, credit requests, approval chains and logs for performance testing.
+
+    python seed_data.py --users 100000 --requests 2000000 --seed 42
+    python seed_data.py --requests 500000 --status-mix PENDING=0.7,APPROVED=0.2,REJECTED=0.1 \\
+        --credit-types pessoal=0.5,empresarial=0.5 --days 90 --end-date 2024-06-30
+
+The same arguments (including --seed and --end-date) always produce the same
+rows. Rows are appended after the current maximum ids, so it can be run on top
+of an existing database; the dashboard counters are rebuilt at the end.
+"""
+import argparse
+import datetime
+import time
+
+import numpy as np
+from sqlalchemy import func, insert, select, text
+
+import counters
+import models
+from config_cache import APPROVAL_FLOWS, DEFAULT_FLOW
+from database import SessionLocal, engine
+
+STAFF_ROLES = ("analyst", "manager", "director")
+DEFAULT_STATUS_MIX = "PENDING=0.5,APPROVED=0.3,REJECTED=0.2"
+DEFAULT_CREDIT_TYPES = "pessoal=0.6,empresarial=0.3,consignado=0.1"
+MAX_STAGES = max(len(flow) for flow in [*APPROVAL_FLOWS.values(), DEFAULT_FLOW])
+REJECTION_REASONS = ("Insufficient income", "Low credit score", "Bureau restriction", "Incomplete documentation")
+
+
+def parse_weights(value):
+    """"a=0.6,b=0.4" -> (["a", "b"], normalized probabilities)."""
+    names, weights = [], []
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        names.append(name.strip())
+        weights.append(float(weight))
+    weights = np.array(weights)
+    if (weights < 0).any() or weights.sum() <= 0:
+        raise argparse.ArgumentTypeError(f"invalid weights {value!r}")
+    return names, weights / weights.sum()
+
+
+def _next_id(conn, table):
+    return (conn.execute(select(func.max(table.id))).scalar() or 0) + 1
+
+
+def _insert(conn, table, rows):
+    if rows:
+        conn.execute(insert(table), rows)
+
+
+def _stage_ids(conn):
+    stages = {name: id_ for id_, name in conn.execute(select(models.WorkflowStage.id, models.WorkflowStage.name))}
+    missing = [name for name in STAFF_ROLES if name not in stages]
+    if missing:
+        order = (conn.execute(select(func.max(models.WorkflowStage.order))).scalar() or 0) + 1
+        _insert(conn, models.WorkflowStage.__table__, [
+            {"name": name, "order": order + i} for i, name in enumerate(missing)
+        ])
+        return _stage_ids(conn)
+    return stages
+
+
+def generate_users(conn, rng, count, staff_per_role, password_hash):
+    """Inserts customers and staff; returns (customer ids, {role: staff ids})."""
+    first = _next_id(conn, models.User)
+    ratings = np.clip(rng.normal(650, 100, count), 300, 1000).round(0)
+    incomes = rng.lognormal(8.5, 0.7, count).round(2)
+    customers = np.arange(first, first + count)
+    rows = [
+        {"id": int(user_id), "username": f"user-{user_id}", "role": "customer", "password": password_hash,
+         "notify_email": True, "notify_sms": False, "mfa_enabled": False,
+         "rating": float(rating), "income": float(income), "cpf": f"{user_id:011d}",
+         "email": f"user-{user_id}@example.com"}
+        for user_id, rating, income in zip(customers, ratings, incomes)
+    ]
+    staff = {}
+    user_id = first + count
+    for role in STAFF_ROLES:
+        staff[role] = np.arange(user_id, user_id + staff_per_role)
+        rows.extend(
+            {"id": int(i), "username": f"{role}-{i}", "role": role, "password": password_hash,
+             "notify_email": True, "notify_sms": False, "mfa_enabled": False, "rating": None, "income": None,
+             "cpf": None, "email": f"{role}-{i}@example.com"}
+            for i in staff[role]
+        )
+        user_id += staff_per_role
+    _insert(conn, models.User.__table__, rows)
+    return customers, staff
+
+
+def _chain(rng_values, status, flow, stage_ids, staff, created_at):
+    """Approval rows for one request, consistent with its final status."""
+    if status == models.ApprovalStatus.APPROVED:
+        decided, rejected_at = len(flow), None
+    elif status == models.ApprovalStatus.REJECTED:
+        decided = rejected_at = int(rng_values[0] * len(flow))
+    else:
+        decided, rejected_at = int(rng_values[0] * len(flow)), None
+    approvals = []
+    reviewed_at = created_at
+    for index, role in enumerate(flow):
+        row = {"stage_id": stage_ids[role], "status": models.ApprovalStatus.PENDING,
+               "approver_id": None, "reviewed_at": None, "rejection_reason": None}
+        if index < decided or index == rejected_at:
+            reviewed_at = reviewed_at + datetime.timedelta(hours=1 + 47 * rng_values[2 + index])
+            row["approver_id"] = int(staff[role][int(rng_values[2 + MAX_STAGES + index] * len(staff[role]))])
+            row["reviewed_at"] = reviewed_at
+            if index == rejected_at:
+                row["status"] = models.ApprovalStatus.REJECTED
+                row["rejection_reason"] = REJECTION_REASONS[int(rng_values[1] * len(REJECTION_REASONS))]
+            else:
+                row["status"] = models.ApprovalStatus.APPROVED
+        elif rejected_at is not None and index > rejected_at:
+            row["status"] = models.ApprovalStatus.CANCELLED
+        approvals.append(row)
+    return approvals
+
+
+def generate_requests(conn, rng, first_id, count, total, args, customers, staff, stage_ids, ids):
+    """Inserts one batch of requests with their approvals, audit and notification logs."""
+    statuses, status_p = args.status_mix
+    credit_types, type_p = args.credit_types
+    positions = np.arange(first_id, first_id + count) - ids["request_start"]
+    offsets = (positions + rng.random(count)) / total * args.days * 86400
+    created = [args.start + datetime.timedelta(seconds=float(s)) for s in offsets]
+    user_ids = rng.choice(customers, count)
+    amounts = rng.lognormal(args.amount_mu, args.amount_sigma, count).round(2)
+    type_index = rng.choice(len(credit_types), count, p=type_p)
+    status_index = rng.choice(len(statuses), count, p=status_p)
+    chain_values = rng.random((count, 2 + 2 * MAX_STAGES))
+
+    requests, approvals, audits, notifications = [], [], [], []
+    for i in range(count):
+        request_id = first_id + i
+        user_id = int(user_ids[i])
+        credit_type = credit_types[type_index[i]]
+        status = models.ApprovalStatus[statuses[status_index[i]]]
+        requests.append({"id": request_id, "user_id": user_id, "amount": float(amounts[i]), "status": status,
+                         "created_at": created[i], "credit_type": credit_type})
+        audits.append({"id": ids["audit"], "user_id": user_id, "action": "create_credit_request",
+                       "credit_request_id": request_id, "timestamp": created[i], "ip": "10.0.0.1",
+                       "details": f"Amount: {amounts[i]}"})
+        ids["audit"] += 1
+        flow = APPROVAL_FLOWS.get(credit_type, DEFAULT_FLOW)
+        decided_at = created[i]
+        for row in _chain(chain_values[i], status, flow, stage_ids, staff, created[i]):
+            approvals.append({"id": ids["approval"], "credit_request_id": request_id, **row})
+            ids["approval"] += 1
+            if row["reviewed_at"] is None:
+                continue
+            decided_at = row["reviewed_at"]
+            action = "approve" if row["status"] == models.ApprovalStatus.APPROVED else "reject"
+            details = "Stage approved" if action == "approve" else f"Reason: {row['rejection_reason']}"
+            audits.append({"id": ids["audit"], "user_id": row["approver_id"], "action": action,
+                           "credit_request_id": request_id, "timestamp": row["reviewed_at"], "ip": "10.0.0.2",
+                           "details": details})
+            ids["audit"] += 1
+        if status != models.ApprovalStatus.PENDING:
+            notifications.append({"id": ids["notification"], "user_id": user_id, "notification_type": "email",
+                                  "destination": f"user-{user_id}@example.com", "status": "sent",
+                                  "message": f"Credit Request #{request_id} {status.value.title()}",
+                                  "response": "OK", "timestamp": decided_at})
+            ids["notification"] += 1
+
+    _insert(conn, models.CreditRequest.__table__, requests)
+    _insert(conn, models.CreditRequestApproval.__table__, approvals)
+    _insert(conn, models.AuditLog.__table__, audits)
+    _insert(conn, models.NotificationLog.__table__, notifications)
+    return len(requests) + len(approvals) + len(audits) + len(notifications)
+
+
+def _reset_sequences(conn):
+    """Explicit ids bypass PostgreSQL sequences; move them past the loaded rows."""
+    if conn.dialect.name != "postgresql":
+        return
+    for table in (models.User, models.CreditRequest, models.CreditRequestApproval, models.AuditLog,
+                  models.NotificationLog):
+        name = table.__tablename__
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), COALESCE((SELECT MAX(id) FROM {name}), 1))"
+        ))
+
+
+def generate(args, bind=engine, session_factory=SessionLocal, log=print):
+    from auth import hash_password
+
+    rng = np.random.default_rng(args.seed)
+    started = time.perf_counter()
+    rows = 0
+    with bind.begin() as conn:
+        stage_ids = _stage_ids(conn)
+        if conn.execute(select(models.BusinessRule.id).filter_by(name="default")).first() is None:
+            _insert(conn, models.BusinessRule.__table__, [
+                {"name": "default", "min_rating": 600, "min_income": 2000, "block_if_bureau_restriction": True}
+            ])
+        customers, staff = generate_users(conn, rng, args.users, args.staff_per_role, hash_password(args.password))
+        rows += args.users + args.staff_per_role * len(STAFF_ROLES)
+        ids = {
+            "request_start": _next_id(conn, models.CreditRequest),
+            "approval": _next_id(conn, models.CreditRequestApproval),
+            "audit": _next_id(conn, models.AuditLog),
+            "notification": _next_id(conn, models.NotificationLog),
+        }
+    log(f"users: {rows} rows")
+    first_id = ids["request_start"]
+    end_id = first_id + args.requests
+    while first_id < end_id:
+        count = min(args.batch_size, end_id - first_id)
+        with bind.begin() as conn:
+            rows += generate_requests(conn, rng, first_id, count, args.requests, args, customers, staff, stage_ids, ids)
+        first_id += count
+        elapsed = time.perf_counter() - started
+        log(f"requests: {first_id - ids['request_start']}/{args.requests}, {rows} rows, {rows / elapsed:,.0f} rows/s")
+    with bind.begin() as conn:
+        _reset_sequences(conn)
+    db = session_factory()
+    try:
+        counters.rebuild(db)
+    finally:
+        db.close()
+    log(f"done: {rows} rows in {time.perf_counter() - started:.1f}s")
+    return rows
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--staff-per-role", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--status-mix", type=parse_weights, default=DEFAULT_STATUS_MIX,
+                        help="Final request status weights, e.g. PENDING=0.5,APPROVED=0.3,REJECTED=0.2")
+    parser.add_argument("--credit-types", type=parse_weights, default=DEFAULT_CREDIT_TYPES,
+                        help="Credit type weights; stages follow APPROVAL_FLOWS")
+    parser.add_argument("--amount-mu", type=float, default=9.0, help="Mean of log(amount)")
+    parser.add_argument("--amount-sigma", type=float, default=1.0, help="Standard deviation of log(amount)")
+    parser.add_argument("--days", type=int, default=365, help="Spread created_at over this many days")
+    parser.add_argument("--end-date", type=datetime.date.fromisoformat, default=datetime.date.today(),
+                        help="Last day of the range (fix it for reproducible dates)")
+    parser.add_argument("--password", default="password", help="Password for every generated user")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="Requests per transaction")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def parse_args(argv=None):
+    args = build_parser().parse_args(argv)
+    args.start = datetime.datetime.combine(args.end_date, datetime.time()) - datetime.timedelta(days=args.days - 1)
+    for name in args.status_mix[0]:
+        if name not in models.ApprovalStatus.__members__:
+            raise SystemExit(f"unknown status {name!r}")
+    return args
+
+
+if __name__ == "__main__":
+    generate(parse_args())
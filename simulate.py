@@ -0,0 +1,168 @@
+"""What-if simulation of BusinessRule changes over the stored portfolio.
+
+    python simulate.py --rule default --min-rating 650 --status pending
+"""
+import argparse
+import json
+
+import numpy as np
+from sqlalchemy import select
+
+from database import read_engine
+import models
+
+AMOUNT_BANDS = [0, 1_000, 5_000, 20_000, 100_000]
+AMOUNT_BAND_LABELS = ["0-1k", "1k-5k", "5k-20k", "20k-100k", "100k+"]
+LOAD_CHUNK_SIZE = 100_000
+SIMULATED_FIELDS = ("min_rating", "min_income", "block_if_bureau_restriction")
+
+
+def _floats(values):
+    return np.fromiter((np.nan if v is None else v for v in values), dtype=np.float64, count=len(values))
+
+
+def load_portfolio(bind=read_engine, statuses=None):
+    """Loads applicant attributes and cached bureau flags into columnar arrays."""
+    query = select(
+        models.CreditRequest.credit_type,
+        models.CreditRequest.amount,
+        models.User.rating,
+        models.User.income,
+        models.CreditRequest.bureau_result["restriction"].as_boolean(),
+    ).join(models.User, models.User.id == models.CreditRequest.user_id)
+    if statuses:
+        query = query.where(models.CreditRequest.status.in_(statuses))
+
+    parts = {"credit_type": [], "amount": [], "rating": [], "income": [], "restricted": [], "bureau_known": []}
+    with bind.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=LOAD_CHUNK_SIZE).execute(query)
+        for rows in result.partitions():
+            credit_type, amount, rating, income, restricted = zip(*rows)
+            parts["credit_type"].append(np.array(credit_type, dtype=object))
+            parts["amount"].append(_floats(amount))
+            parts["rating"].append(_floats(rating))
+            parts["income"].append(_floats(income))
+            parts["restricted"].append(np.fromiter((bool(r) for r in restricted), dtype=bool, count=len(rows)))
+            parts["bureau_known"].append(np.fromiter((r is not None for r in restricted), dtype=bool, count=len(rows)))
+
+    columns = {
+        key: np.concatenate(values) if values else np.zeros(0, dtype=object if key == "credit_type" else np.float64)
+        for key, values in parts.items()
+    }
+    type_names, type_codes = np.unique(columns["credit_type"].astype(str), return_inverse=True)
+    return {
+        "type_names": [str(name) for name in type_names],
+        "type_codes": type_codes.astype(np.int64),
+        "amount": columns["amount"],
+        "rating": np.nan_to_num(columns["rating"], nan=0.0),
+        "income": np.nan_to_num(columns["income"], nan=0.0),
+        "restricted": columns["restricted"].astype(bool),
+        "bureau_known": columns["bureau_known"].astype(bool),
+    }
+
+
+def passes(portfolio, rule):
+    """Vectorized equivalent of the rule_engine predicates for one rule."""
+    mask = ~portfolio["restricted"]
+    if rule is not None and rule.get("min_rating"):
+        mask &= portfolio["rating"] >= rule["min_rating"]
+    if rule is not None and rule.get("min_income"):
+        mask &= portfolio["income"] >= rule["min_income"]
+    return mask
+
+
+def _rule_dict(rule):
+    if rule is None:
+        return None
+    return {key: getattr(rule, key) for key in ("name",) + SIMULATED_FIELDS}
+
+
+def simulate(portfolio, rules, rule_name, changes):
+    """Compares approval rates under `rules` with `rules[rule_name]` updated by `changes`.
+
+    Rows are scoped to credit types whose effective rule is `rule_name`
+    (a rule named after the credit type, else "default").
+    """
+    type_names = portfolio["type_names"]
+    effective = [name if name in rules else "default" for name in type_names]
+    affected_types = np.array([rule == rule_name for rule in effective], dtype=bool)
+    in_scope = affected_types[portfolio["type_codes"]]
+
+    current = dict(rules.get(rule_name) or {})
+    candidate = dict(current, **changes)
+    before = passes(portfolio, current) & in_scope
+    after = passes(portfolio, candidate) & in_scope
+
+    band = np.searchsorted(AMOUNT_BANDS, portfolio["amount"], side="right") - 1
+    band = np.clip(band, 0, len(AMOUNT_BANDS) - 1)
+    groups = portfolio["type_codes"] * len(AMOUNT_BANDS) + band
+    size = len(type_names) * len(AMOUNT_BANDS)
+
+    def count(mask):
+        return np.bincount(groups[mask], minlength=size)
+
+    totals = count(in_scope)
+    passed_before = count(before)
+    passed_after = count(after)
+    to_fail = count(before & ~after)
+    to_pass = count(~before & after)
+
+    results = []
+    for group in np.nonzero(totals)[0]:
+        total = int(totals[group])
+        rate_before = passed_before[group] / total
+        rate_after = passed_after[group] / total
+        results.append({
+            "credit_type": type_names[group // len(AMOUNT_BANDS)],
+            "amount_band": AMOUNT_BAND_LABELS[group % len(AMOUNT_BANDS)],
+            "requests": total,
+            "approval_rate_before": round(float(rate_before), 4),
+            "approval_rate_after": round(float(rate_after), 4),
+            "approval_rate_delta": round(float(rate_after - rate_before), 4),
+            "flipped_to_fail": int(to_fail[group]),
+            "flipped_to_pass": int(to_pass[group]),
+        })
+    total = int(in_scope.sum())
+    return {
+        "rule": rule_name,
+        "changes": changes,
+        "requests": total,
+        "without_bureau_result": int((in_scope & ~portfolio["bureau_known"]).sum()),
+        "flipped_to_fail": int((before & ~after).sum()),
+        "flipped_to_pass": int((~before & after).sum()),
+        "groups": results,
+    }
+
+
+def simulate_rule_change(db, rule, changes, statuses=None):
+    changes = {key: value for key, value in changes.items() if key in SIMULATED_FIELDS}
+    rules = {r.name: _rule_dict(r) for r in db.query(models.BusinessRule).all()}
+    portfolio = load_portfolio(db.get_bind(), statuses)
+    return simulate(portfolio, rules, rule.name, changes)
+
+
+def main():
+    from database import ReadSessionLocal
+
+    parser = argparse.ArgumentParser(description="Simulate a BusinessRule change over the portfolio")
+    parser.add_argument("--rule", default="default")
+    parser.add_argument("--min-rating", type=float)
+    parser.add_argument("--min-income", type=float)
+    parser.add_argument("--status", action="append", choices=[s.name for s in models.ApprovalStatus],
+                        help="Restrict to requests in this status (repeatable)")
+    args = parser.parse_args()
+    changes = {k: v for k, v in {"min_rating": args.min_rating, "min_income": args.min_income}.items() if v is not None}
+
+    db = ReadSessionLocal()
+    try:
+        rule = db.query(models.BusinessRule).filter_by(name=args.rule).first()
+        if rule is None:
+            parser.error(f"Unknown rule {args.rule!r}")
+        statuses = [models.ApprovalStatus[s] for s in args.status] if args.status else None
+        print(json.dumps(simulate_rule_change(db, rule, changes, statuses), indent=2))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import collections
+import contextlib
+import contextvars
+import logging
+import os
+import re
+import time
+
+from prometheus_client import Histogram
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SQL_SLOW_QUERY_SECONDS = float(os.getenv("SQL_SLOW_QUERY_MS", "200")) / 1000
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "10"))
+
+query_duration = Histogram(
+    "db_query_duration_seconds", "Duration of a single SQL statement", ["operation"]
+)
+request_queries = Histogram(
+    "db_request_queries", "SQL statements issued by one request", ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+request_db_seconds = Histogram(
+    "db_request_seconds", "Total SQL time of one request", ["route"]
+)
+request_slowest_query = Histogram(
+    "db_request_slowest_query_seconds", "Slowest SQL statement of one request", ["route"]
+)
+
+_current = contextvars.ContextVar("sql_request_stats", default=None)
+_IN_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)|\(__\[POSTCOMPILE_\w+\]\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement):
+    """Statement text with whitespace and IN-list lengths normalized."""
+    return _IN_LIST.sub("(?...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def redact(parameters):
+    if parameters is None:
+        return "none"
+    if isinstance(parameters, (list, tuple)) and parameters and isinstance(parameters[0], (list, tuple, dict)):
+        return f"<{len(parameters)} parameter sets redacted>"
+    return f"<{len(parameters)} redacted>"
+
+
+class RequestStats:
+    def __init__(self, route=None):
+        self.route = route
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest = (0.0, None)
+        self.shapes = collections.Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.seconds += duration
+        if duration > self.slowest[0]:
+            self.slowest = (duration, statement)
+        shape = statement_shape(statement)
+        self.shapes[shape] += 1
+        if self.shapes[shape] == SQL_REPEAT_THRESHOLD:
+            logger.warning(
+                f"Possible N+1 on {self.route}: statement ran {SQL_REPEAT_THRESHOLD} times: {shape}"
+            )
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    duration = time.perf_counter() - started
+    query_duration.labels(statement.split(None, 1)[0].upper() if statement else "").observe(duration)
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, duration)
+    if duration >= SQL_SLOW_QUERY_SECONDS:
+        logger.warning(f"Slow query ({duration * 1000:.0f} ms): {statement_shape(statement)} params={redact(parameters)}")
+
+
+def _on_error(context):
+    if context.connection is not None and context.connection.info.get("query_started"):
+        context.connection.info["query_started"].pop()
+
+
+def instrument(engine):
+    """Attaches the statement hooks to a sync engine (use `.sync_engine` for async ones)."""
+    if not event.contains(engine, "before_cursor_execute", _before_execute):
+        event.listen(engine, "before_cursor_execute", _before_execute)
+        event.listen(engine, "after_cursor_execute", _after_execute)
+        event.listen(engine, "handle_error", _on_error)
+
+
+def start_request(route=None):
+    stats = RequestStats(route)
+    return stats, _current.set(stats)
+
+
+def finish_request(stats, token, route=None):
+    _current.reset(token)
+    record_request(stats, route)
+
+
+def record_request(stats, route=None):
+    route = route or "unmatched"
+    request_queries.labels(route).observe(stats.count)
+    request_db_seconds.labels(route).observe(stats.seconds)
+    request_slowest_query.labels(route).observe(stats.slowest[0])
+
+
+def route_template(scope):
+    """Templated path of the matched route, including any router prefix, or None."""
+    route = scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    if path_format is None:
+        return None
+    try:
+        filled = path_format.format(**scope.get("path_params", {}))
+    except (KeyError, IndexError, ValueError):
+        return path_format
+    path = scope.get("path", "")
+    if filled and path.endswith(filled):
+        return path[: len(path) - len(filled)] + path_format
+    return path_format
+
+
+class SQLMetricsMiddleware:
+    """Records the SQL statements of each HTTP request under its route template.
+
+    Stats are recorded once the last body message is sent, so statements run
+    while a streaming response is generated are counted as well.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats, token = start_request(scope.get("path"))
+        recorded = False
+
+        def record():
+            nonlocal recorded
+            if not recorded:
+                recorded = True
+                record_request(stats, route_template(scope))
+
+        async def send_and_record(message):
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+
+        try:
+            await self.app(scope, receive, send_and_record)
+        finally:
+            _current.reset(token)
+            record()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextlib.contextmanager
+def query_budget(engine, max_queries):
+    """Fails if more than `max_queries` statements run on `engine` inside the block.
+
+        with query_budget(engine, 3) as statements:
+            client.get("/api/v1/credit-requests/1/detail")
+    """
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    if len(statements) > max_queries:
+        listing = "\n".join(f"  {statement_shape(s)}" for s in statements)
+        raise QueryBudgetExceeded(f"{len(statements)} queries, budget was {max_queries}:\n{listing}")
@@ -1,4 +1,32 @@
+import asyncio
+import datetime
+import logging
+import os
+import smtplib
+import socket
+
 from celery import Celery
+from sqlalchemy import or_, select, update
+
+import screening
+from bureau import BureauUnavailable
+from config_cache import config_cache
+from database import SessionLocal
+from models import EmailOutbox, NotificationLog
+from notifications import DEFAULT_FROM_EMAIL, build_message, smtp_session
+from rule_engine import evaluate_rules
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_BACKOFF_SECONDS", "30"))
+OUTBOX_MAX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_MAX_BACKOFF_SECONDS", "3600"))
+OUTBOX_DRAIN_INTERVAL = float(os.getenv("OUTBOX_DRAIN_INTERVAL", "5"))
+OUTBOX_CLAIM_TIMEOUT_SECONDS = float(os.getenv("OUTBOX_CLAIM_TIMEOUT_SECONDS", "600"))
+SCREENING_RETRY_SECONDS = float(os.getenv("SCREENING_RETRY_SECONDS", "30"))
+SCREENING_MAX_RETRIES = int(os.getenv("SCREENING_MAX_RETRIES", "5"))
+SCREENING_REQUEUE_INTERVAL = float(os.getenv("SCREENING_REQUEUE_INTERVAL", "60"))
 
 celery_app = Celery(
     "tasks",
@@ -6,9 +34,155 @@ celery_app = Celery(
     backend="redis://localhost:6379/0"
 )
 
+celery_app.conf.beat_schedule = {
+    "drain-email-outbox": {
+        "task": "tasks.drain_email_outbox",
+        "schedule": OUTBOX_DRAIN_INTERVAL,
+    },
+    "requeue-stale-screening": {
+        "task": "tasks.requeue_stale_screening",
+        "schedule": SCREENING_REQUEUE_INTERVAL,
+    },
+}
+
+_loop = None
+
+def _run(coro):
+    """Runs `coro` on one loop per worker process, so the bureau and Redis clients keep their connections."""
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coro)
+
+@celery_app.task(bind=True, max_retries=SCREENING_MAX_RETRIES)
+def process_credit_request(self, credit_request_id):
+    """Screens a request accepted in async intake mode; bureau outages are retried with a delay."""
+    db = SessionLocal()
+    try:
+        loaded = screening.load(db, credit_request_id)
+        if loaded is None:
+            return {"request_id": credit_request_id, "status": "skipped"}
+        credit_request, ctx = loaded
+        try:
+            outcome = _run(evaluate_rules(ctx, config_cache))
+        except BureauUnavailable as exc:
+            logger.warning(f"Bureau unavailable while screening credit request {credit_request_id}: {exc}")
+            raise self.retry(exc=exc, countdown=SCREENING_RETRY_SECONDS)
+        status = screening.finish(db, credit_request, ctx, outcome, config_cache.stages(credit_request.credit_type))
+    finally:
+        db.close()
+    return {"request_id": credit_request_id, "status": status.value if status else "skipped"}
+
 @celery_app.task
-def process_credit_request(credit_request_id):
+def requeue_stale_screening(limit=screening.SCREENING_REQUEUE_LIMIT):
+    db = SessionLocal()
+    try:
+        ids = screening.stale(db, limit=limit)
+        screening.mark_enqueued(db, ids)
+    finally:
+        db.close()
+    for credit_request_id in ids:
+        process_credit_request.delay(credit_request_id)
+    if ids:
+        logger.warning(f"Queued {len(ids)} credit requests stuck in screening again")
+    return len(ids)
+
+def _log_notification(db, message, status, response):
+    db.add(NotificationLog(
+        user_id=message.user_id or 0,
+        notification_type="email",
+        destination=message.to_email,
+        status=status,
+        message=message.subject,
+        response=response,
+    ))
+
+def _record_failure(db, message, error, now):
+    message.attempts += 1
+    message.last_error = str(error)
+    if message.attempts >= OUTBOX_MAX_ATTEMPTS:
+        message.status = "dead"
+        logger.error(f"Email {message.id} to {message.to_email} dead-lettered after {message.attempts} attempts: {error}")
+        _log_notification(db, message, "dead", str(error))
+        return
+    delay = min(OUTBOX_BACKOFF_SECONDS * 2 ** (message.attempts - 1), OUTBOX_MAX_BACKOFF_SECONDS)
+    message.next_attempt_at = now + datetime.timedelta(seconds=delay)
+    _log_notification(db, message, "failed", str(error))
 
-    print(f"Processing credit request {credit_request_id}")
+def claim_outbox(db, batch_size, worker, now):
+    """Marks up to `batch_size` due messages as taken by `worker` and returns them.
 
-    return {"request_id": credit_request_id, "status": "processed"}
\ No newline at end of file
+    The claim is one conditional UPDATE committed before anything is sent, so
+    concurrent drains never pick the same row, on SQLite as on PostgreSQL.
+    Claims older than OUTBOX_CLAIM_TIMEOUT_SECONDS (a worker that died
+    mid-batch) can be taken over.
+    """
+    claimable = or_(
+        EmailOutbox.claimed_at.is_(None),
+        EmailOutbox.claimed_at < now - datetime.timedelta(seconds=OUTBOX_CLAIM_TIMEOUT_SECONDS),
+    )
+    due = (
+        select(EmailOutbox.id)
+        .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now, claimable)
+        .order_by(EmailOutbox.id)
+        .limit(batch_size)
+    )
+    ids = db.scalars(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(due.scalar_subquery()), claimable)
+        .values(claimed_by=worker, claimed_at=now)
+        .returning(EmailOutbox.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    if not ids:
+        return []
+    return db.query(EmailOutbox).filter(EmailOutbox.id.in_(ids)).order_by(EmailOutbox.id).all()
+
+def drain_outbox(db, batch_size=OUTBOX_BATCH_SIZE, worker=None):
+    now = datetime.datetime.utcnow()
+    messages = claim_outbox(db, batch_size, worker or f"{socket.gethostname()}:{os.getpid()}", now)
+    result = {"sent": 0, "failed": 0, "dead": 0}
+    if not messages:
+        return result
+    pending = list(messages)
+    try:
+        with smtp_session() as server:
+            while pending:
+                message = pending[0]
+                msg = build_message(message.to_email, message.subject, message.body)
+                try:
+                    server.sendmail(DEFAULT_FROM_EMAIL, [message.to_email], msg.as_string())
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, smtplib.SMTPSenderRefused) as exc:
+                    _record_failure(db, message, exc, now)
+                else:
+                    message.status = "sent"
+                    message.attempts += 1
+                    message.sent_at = datetime.datetime.utcnow()
+                    _log_notification(db, message, "sent", "OK")
+                pending.pop(0)
+    except (smtplib.SMTPException, OSError) as exc:
+        logger.warning(f"SMTP session failed with {len(pending)} emails unsent: {exc}")
+        for message in pending:
+            _record_failure(db, message, exc, now)
+    for message in messages:
+        message.claimed_by = None
+        message.claimed_at = None
+    db.commit()
+    for message in messages:
+        result["sent" if message.status == "sent" else "dead" if message.status == "dead" else "failed"] += 1
+    return result
+
+@celery_app.task
+def drain_email_outbox(batch_size=OUTBOX_BATCH_SIZE):
+    db = SessionLocal()
+    try:
+        total = {"sent": 0, "failed": 0, "dead": 0}
+        while True:
+            result = drain_outbox(db, batch_size)
+            for key, value in result.items():
+                total[key] += value
+            if result["sent"] < batch_size:
+                return total
+    finally:
+        db.close()
@@ -0,0 +1,115 @@
+import asyncio
+import os
+import tempfile
+
+# Point the application's default engines at a scratch database before anything imports database.py,
+# so tests never open (or leave WAL files next to) ./credit_approval.db.
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+import audit
+import models
+import routes
+from auth import Principal
+from config_cache import ConfigCache
+import database
+from database import async_url
+from query_cache import QueryCache
+
+models.Base.metadata.create_all(database.engine)
+
+
+class RecordingAuditBuffer(audit.AuditBuffer):
+    """Keeps buffered audit entries in memory instead of writing them to the default database."""
+
+    def __init__(self):
+        super().__init__(session_factory=None)
+        self.entries = []
+
+    def put(self, entry):
+        self.entries.append(entry)
+
+    def flush(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def audit_buffer(monkeypatch):
+    buffer = RecordingAuditBuffer()
+    monkeypatch.setattr(audit, "audit_logger", buffer)
+    return buffer
+
+
+@pytest.fixture
+def async_database(tmp_path):
+    """async_sessionmaker on the file behind `database`."""
+    return async_sessionmaker(
+        create_async_engine(async_url(f"sqlite:///{tmp_path / 'test.db'}"), poolclass=NullPool),
+        autoflush=False, expire_on_commit=False,
+    )
+
+
+@pytest.fixture
+def database(tmp_path, async_database):
+    """File-backed SQLite shared by a sync sessionmaker and the get_async_db override."""
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(engine)
+
+    async def get_async_db():
+        async with async_database() as db:
+            yield db
+
+    routes.app.dependency_overrides[routes.get_async_db] = get_async_db
+    routes.app.dependency_overrides[routes.get_async_read_db] = get_async_db
+    yield sessionmaker(bind=engine)
+    routes.app.dependency_overrides.pop(routes.get_async_db, None)
+    routes.app.dependency_overrides.pop(routes.get_async_read_db, None)
+    engine.dispose()
+
+
+@pytest.fixture
+def session(database):
+    session = database()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def login():
+    """Makes the API see requests as Principal(id=user_id, role=role)."""
+    def login(user_id, role):
+        routes.app.dependency_overrides[routes.get_current_user] = lambda: Principal(id=user_id, role=role)
+    return login
+
+
+@pytest.fixture
+def client(database, session, monkeypatch):
+    """TestClient with Redis-free caches; sync endpoints share `session`. Test modules seed data by overriding it."""
+    monkeypatch.setattr(routes, "query_cache", QueryCache(redis_factory=lambda: None, async_redis_factory=lambda: None))
+    monkeypatch.setattr(routes, "config_cache", ConfigCache(
+        session_factory=database, redis_factory=lambda: None, async_redis_factory=lambda: None
+    ))
+    routes.app.dependency_overrides[routes.get_db] = lambda: session
+    routes.app.dependency_overrides[routes.get_read_db] = lambda: session
+    yield TestClient(routes.app)
+    routes.app.dependency_overrides.pop(routes.get_db, None)
+    routes.app.dependency_overrides.pop(routes.get_read_db, None)
+    routes.app.dependency_overrides.pop(routes.get_current_user, None)
+
+
+@pytest.fixture
+def persist_credit_request(client, async_database):
+    """Stores a credit request the way the create endpoint does: persist_credit_request(user_id, amount, credit_type)."""
+    def persist(user_id, amount, credit_type, bureau_result=None, ip=None, **kwargs):
+        async def run():
+            async with async_database() as db:
+                return await routes._apersist_credit_request(db, user_id, amount, credit_type, bureau_result, ip, **kwargs)
+        return asyncio.run(run())
+    return persist
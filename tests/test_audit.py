@@ -0,0 +1,128 @@
+import datetime
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import audit
+from audit import AuditBuffer, log_audit
+from models import AuditLog, Base
+
+
+@pytest.fixture
+def Session():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+def _entry(action="login"):
+    return {"user_id": 1, "action": action, "credit_request_id": None, "details": "", "ip": None}
+
+
+def _count(Session):
+    db = Session()
+    try:
+        return db.query(AuditLog).count()
+    finally:
+        db.close()
+
+
+def test_entries_are_buffered_until_flush(Session):
+    buffer = AuditBuffer(session_factory=Session, batch_size=100, flush_interval=60)
+    for _ in range(5):
+        buffer._queue.put(_entry())
+    assert _count(Session) == 0
+    buffer.flush()
+    assert _count(Session) == 5
+
+
+def test_background_writer_flushes_on_batch_size(Session):
+    buffer = AuditBuffer(session_factory=Session, batch_size=3, flush_interval=60)
+    for _ in range(3):
+        buffer.put(_entry())
+    for _ in range(50):
+        if _count(Session) == 3:
+            break
+        buffer._stop.wait(0.05)
+    assert _count(Session) == 3
+    buffer.stop()
+
+
+def test_stop_flushes_pending_entries(Session):
+    buffer = AuditBuffer(session_factory=Session, batch_size=100, flush_interval=0.2)
+    for _ in range(7):
+        buffer.put(_entry())
+    buffer.stop()
+    assert _count(Session) == 7
+
+
+def test_full_queue_falls_back_to_synchronous_write(Session):
+    buffer = AuditBuffer(session_factory=Session, maxsize=1, enqueue_timeout=0)
+    buffer._queue.put(_entry())
+    buffer.start = lambda: None
+    buffer.put(_entry("overflow"))
+    db = Session()
+    assert [a.action for a in db.query(AuditLog)] == ["overflow"]
+    db.close()
+
+
+def test_failed_batch_is_retried_then_spilled_and_replayed(Session, tmp_path, monkeypatch):
+    spill_path = tmp_path / "audit-spill.jsonl"
+    buffer = AuditBuffer(session_factory=Session, attempts=3, backoff=0, spill_path=str(spill_path))
+    real_insert = buffer._insert
+    attempts = []
+    monkeypatch.setattr(buffer, "_insert", lambda entries: attempts.append(len(entries)) and False)
+    buffer._write([{**_entry(), "timestamp": datetime.datetime(2024, 5, 1, 12)}, _entry("logout")])
+    assert attempts == [2, 2, 2]
+    own_spill = tmp_path / f"audit-spill.jsonl.{os.getpid()}"
+    assert len(own_spill.read_text().splitlines()) == 2
+    assert _count(Session) == 0
+
+    buffer.flush()
+    assert len(list(tmp_path.iterdir())) == 1
+
+    monkeypatch.setattr(buffer, "_insert", real_insert)
+    buffer.flush()
+    assert list(tmp_path.iterdir()) == []
+    db = Session()
+    assert [(a.action, a.timestamp) for a in db.query(AuditLog).order_by(AuditLog.id)][0] == (
+        "login", datetime.datetime(2024, 5, 1, 12)
+    )
+    assert _count(Session) == 2
+    db.close()
+
+
+def test_replay_skips_spill_files_of_live_processes(Session, tmp_path, monkeypatch):
+    spill_path = tmp_path / "audit-spill.jsonl"
+    line = '{"user_id": 1, "action": "login", "credit_request_id": null, "details": "", "ip": null}\n'
+    (tmp_path / "audit-spill.jsonl.101").write_text(line)
+    (tmp_path / "audit-spill.jsonl.202").write_text(line * 2)
+    monkeypatch.setattr(audit, "_process_alive", lambda pid: pid == 202)
+    AuditBuffer(session_factory=Session, spill_path=str(spill_path)).flush()
+    assert _count(Session) == 1
+    assert [p.name for p in tmp_path.iterdir()] == ["audit-spill.jsonl.202"]
+
+
+def test_retry_succeeds_without_spilling(Session, tmp_path, monkeypatch):
+    buffer = AuditBuffer(session_factory=Session, attempts=3, backoff=0, spill_path=str(tmp_path / "spill.jsonl"))
+    real_insert = buffer._insert
+    results = iter([False])
+    monkeypatch.setattr(buffer, "_insert", lambda entries: next(results, None) or real_insert(entries))
+    buffer._write([_entry()])
+    assert _count(Session) == 1
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_strict_mode_writes_in_callers_session(Session, monkeypatch):
+    buffer = AuditBuffer(session_factory=Session)
+    monkeypatch.setattr(audit, "audit_logger", buffer)
+    db = Session()
+    log_audit(db, 1, "approve", 10, "Stage approved", strict=True)
+    assert db.query(AuditLog).filter_by(action="approve").count() == 1
+    assert buffer._queue.qsize() == 0
+    db.close()
@@ -3,16 +3,17 @@ from auth import hash_password, verify_password, create_access_token, authentica
 from models import User, Base
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from datetime import timedelta
 import os
 
 @pytest.fixture
 def db_session(monkeypatch):
-    engine = create_engine("sqlite:///:memory:")
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
     Base.metadata.create_all(engine)
     Session = sessionmaker(bind=engine)
     session = Session()
-    monkeypatch.setattr("auth.SessionLocal", lambda: session)
+    monkeypatch.setattr("auth.ReadSessionLocal", lambda: session)
     yield session
     session.close()
 
@@ -41,4 +42,83 @@ def test_authenticate_user_fail(db_session):
     db_session.add(user)
     db_session.commit()
     assert authenticate_user("testuser2", "wrongpw") is None
-    assert authenticate_user("notfound", "pw") is None
\ No newline at end of file
+    assert authenticate_user("notfound", "pw") is None
+
+def test_get_current_user_caches_principal(db_session, monkeypatch):
+    import asyncio
+    import auth
+
+    db_session.add(User(username="cached", role="analyst", password=hash_password("pw")))
+    db_session.commit()
+    opened = []
+    monkeypatch.setattr("auth.ReadSessionLocal", lambda: opened.append(1) or db_session)
+    monkeypatch.setattr("auth.principal_cache", auth.PrincipalCache(redis_factory=lambda: None, async_redis_factory=lambda: None))
+    token = create_access_token({"sub": "cached"}, expires_delta=timedelta(minutes=1))
+
+    first = asyncio.run(auth.get_current_user(token))
+    second = asyncio.run(auth.get_current_user(token))
+    assert first is second
+    assert first.username == "cached" and first.role == "analyst"
+    assert not hasattr(first, "password")
+    assert len(opened) == 1
+
+    auth.invalidate_principal(first.id)
+    asyncio.run(auth.get_current_user(token))
+    assert len(opened) == 2
+
+
+def test_principal_cache_expires_with_ttl_and_token():
+    from auth import Principal, PrincipalCache
+
+    now = [1000.0]
+    cache = PrincipalCache(maxsize=2, ttl=30, clock=lambda: now[0])
+    cache.put("a", Principal(id=1), token_exp=1010)
+    cache.put("b", Principal(id=2))
+    now[0] = 1015
+    assert cache.get("a") is None
+    assert cache.get("b").id == 2
+    cache.put("c", Principal(id=3))
+    cache.put("d", Principal(id=3))
+    assert cache.get("b") is None
+    now[0] = 1046
+    assert cache.get("c") is None
+
+
+def test_principal_invalidation_reaches_other_workers():
+    import asyncio
+    from auth import Principal, PrincipalCache
+
+    class FakeRedis:
+        def __init__(self):
+            self.values = {}
+
+        def incr(self, key):
+            self.values[key] = self.values.get(key, 0) + 1
+            return self.values[key]
+
+    class FakeAsyncRedis:
+        def __init__(self, redis):
+            self.redis = redis
+
+        async def get(self, key):
+            value = self.redis.values.get(key)
+            return None if value is None else str(value)
+
+    redis = FakeRedis()
+    now = [1000.0]
+    workers = [
+        PrincipalCache(clock=lambda: now[0], check_interval=1, redis_factory=lambda: redis,
+                       async_redis_factory=lambda: FakeAsyncRedis(redis))
+        for _ in range(2)
+    ]
+    for worker in workers:
+        asyncio.run(worker.refresh())
+        worker.put("token", Principal(id=1))
+
+    workers[0].invalidate_user(1)
+    assert workers[0].get("token") is None
+    asyncio.run(workers[1].refresh())
+    assert workers[1].get("token").id == 1
+    now[0] += 1
+    asyncio.run(workers[1].refresh())
+    assert workers[1].get("token") is None
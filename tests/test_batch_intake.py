@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+import pytest
+
+import models
+import routes
+from bureau_cache import BureauCache
+
+
+@pytest.fixture
+def client(client, session, monkeypatch):
+    session.add_all([
+        models.User(id=1, username="alice", role="analyst", password="x", cpf="11111111111"),
+        models.User(id=2, username="bob", role="analyst", password="x", cpf="22222222222"),
+        models.BusinessRule(name="default", block_if_bureau_restriction=True),
+        models.WorkflowStage(name="analyst", order=1),
+        models.WorkflowStage(name="manager", order=2),
+    ])
+    session.commit()
+
+    async def fake_bureau(cpf):
+        return {"restriction": False}
+
+    monkeypatch.setattr("bureau_cache.bureau_cache", BureauCache(fetch=fake_bureau, use_redis=False))
+    monkeypatch.setattr(routes, "BATCH_CHUNK_SIZE", 2)
+    return client, session
+
+
+def test_batch_intake_streams_one_result_per_line(client):
+    client, session = client
+    body = "\n".join([
+        json.dumps({"user_id": 1, "amount": 1000, "credit_type": "pessoal"}),
+        json.dumps({"user_id": 2, "amount": 5000, "credit_type": "empresarial"}),
+        "{not json",
+        json.dumps({"user_id": 99, "amount": 10}),
+        "",
+        json.dumps({"user_id": 1, "amount": -5}),
+    ])
+    response = client.post(
+        "/api/v1/credit-requests/batch",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["line"] for r in results] == [1, 2, 3, 4, 6]
+    assert [r["status"] for r in results] == ["created", "created", "invalid", "rejected", "invalid"]
+
+    assert session.query(models.CreditRequest).count() == 2
+    assert session.query(models.AuditLog).filter_by(action="create_credit_request").count() == 2
+    empresarial = session.get(models.CreditRequest, results[1]["id"])
+    assert empresarial.credit_type == "empresarial"
+    assert session.query(models.CreditRequestApproval).filter_by(credit_request_id=empresarial.id).count() == 2
+
+
+def test_batch_intake_applies_business_rules(client, monkeypatch):
+    client, session = client
+
+    async def restricted(cpf):
+        return {"restriction": True}
+
+    monkeypatch.setattr("bureau_cache.bureau_cache", BureauCache(fetch=restricted, use_redis=False))
+    response = client.post(
+        "/api/v1/credit-requests/batch",
+        content=json.dumps({"user_id": 1, "amount": 1000}) + "\n",
+    )
+    result = json.loads(response.text)
+    assert result["status"] == "rejected"
+    assert result["detail"] == "Blocked by bureau restriction"
+    assert session.query(models.CreditRequest).count() == 0
+
+
+def test_batch_intake_bounds_concurrent_bureau_calls(client, monkeypatch):
+    client, session = client
+    session.add_all([
+        models.User(id=10 + i, username=f"customer-{i}", role="customer", password="x", cpf=f"{i:011d}")
+        for i in range(12)
+    ])
+    session.commit()
+    in_flight, peak = [0], [0]
+
+    async def slow_bureau(cpf):
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.01)
+        in_flight[0] -= 1
+        return {"restriction": False}
+
+    monkeypatch.setattr("bureau_cache.bureau_cache", BureauCache(fetch=slow_bureau, use_redis=False))
+    monkeypatch.setattr(routes, "BATCH_CHUNK_SIZE", 12)
+    monkeypatch.setattr(routes, "BATCH_BUREAU_CONCURRENCY", 3)
+    body = "\n".join(json.dumps({"user_id": 10 + i, "amount": 100}) for i in range(12))
+    response = client.post("/api/v1/credit-requests/batch", content=body)
+
+    assert [json.loads(line)["status"] for line in response.text.splitlines()] == ["created"] * 12
+    assert peak[0] == 3
@@ -0,0 +1,30 @@
+import json
+
+from benchmarks.compare import compare, regressions
+from benchmarks.report import percentile, summarize, write_report
+
+
+def test_summarize_reports_percentiles_in_ms_and_rps():
+    summary = summarize([i / 1000 for i in range(1, 101)], elapsed=2.0, errors=3)
+    assert summary["count"] == 100
+    assert summary["errors"] == 3
+    assert summary["p50_ms"] == 50
+    assert summary["p95_ms"] == 95
+    assert summary["p99_ms"] == 99
+    assert summary["max_ms"] == 100
+    assert summary["rps"] == 50
+
+
+def test_percentile_of_empty_run_is_none():
+    assert percentile([], 95) is None
+    assert summarize([])["p95_ms"] is None
+
+
+def test_write_report_round_trips_and_compare_flags_p95_regressions(tmp_path):
+    old = write_report("load", {"concurrency": 10}, {"create": summarize([0.010] * 10, 1.0)}, str(tmp_path / "a.json"))
+    new = write_report("load", {"concurrency": 10}, {"create": summarize([0.015] * 10, 1.0)}, str(tmp_path / "b.json"))
+    with open(old) as a, open(new) as b:
+        rows = compare(json.load(a), json.load(b))
+    assert rows["create"]["p95_ms"] == (10.0, 15.0, 50.0)
+    assert regressions(rows, 10) == ["create"]
+    assert regressions(rows, 60) == []
@@ -0,0 +1,54 @@
+import pytest
+
+import models
+import routes
+import transitions
+from events import EventBus
+
+
+@pytest.fixture
+def client(client, session, login):
+    session.add_all([
+        models.User(id=1, username="alice", role="analyst", password="x"),
+        models.User(id=2, username="bob", role="customer", password="x"),
+        models.WorkflowStage(name="analyst", order=1),
+        models.WorkflowStage(name="manager", order=2),
+    ])
+    session.commit()
+    login(1, "analyst")
+    return client, session
+
+
+def test_bulk_approve_reports_per_request_outcomes(client, monkeypatch, persist_credit_request):
+    def no_sync_redis():
+        raise AssertionError("sync Redis client used inside run_sync")
+
+    bus = EventBus(redis_factory=no_sync_redis, async_redis_factory=lambda: None)
+    monkeypatch.setattr(transitions, "event_bus", bus)
+    monkeypatch.setattr(routes.events, "event_bus", bus)
+    client, session = client
+    ids = [persist_credit_request(2, 100 + i, "pessoal", None, None).id for i in range(3)]
+    longer = persist_credit_request(2, 500, "empresarial", None, None).id
+
+    response = client.post("/api/v1/approvals/bulk", json={"credit_request_ids": ids + [longer, 404], "action": "approve"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["summary"] == {"approved": 3, "advanced": 1, "no_pending_approval": 1}
+    assert body["results"][-1] == {"credit_request_id": 404, "outcome": "no_pending_approval"}
+    session.expire_all()
+    assert {session.get(models.CreditRequest, i).status for i in ids} == {models.ApprovalStatus.APPROVED}
+    assert client.get("/api/v1/dashboard/summary").json()["approved"] == 3
+    assert sorted(event["type"] for _, event in bus._local) == ["request_approved"] * 3 + ["stage_approved"] * 4
+
+
+def test_bulk_reject_requires_reason_and_permission(client, login, persist_credit_request):
+    client, session = client
+    request_id = persist_credit_request(2, 100, "pessoal", None, None).id
+    assert client.post("/api/v1/approvals/bulk", json={"credit_request_ids": [request_id], "action": "reject"}).status_code == 422
+    assert client.post("/api/v1/approvals/bulk", json={"credit_request_ids": [], "action": "approve"}).status_code == 422
+
+    login(2, "customer")
+    assert client.post("/api/v1/approvals/bulk", json={
+        "credit_request_ids": [request_id], "action": "reject", "reason": "no",
+    }).status_code == 403
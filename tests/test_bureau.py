@@ -1,27 +1,151 @@
+import asyncio
 import unittest
-from unittest.mock import patch, MagicMock
-from bureau import cpf_bureau_check
-
-class TestBureau(unittest.TestCase):
-    @patch("bureau.requests.post")
-    def test_cpf_bureau_check_success(self, mock_post):
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {"restriction": False}
-        mock_post.return_value = mock_response
-
-        result = cpf_bureau_check("12345678900")
-        self.assertEqual(result, {"restriction": False})
-
-    @patch("bureau.requests.post")
-    def test_cpf_bureau_check_error(self, mock_post):
-        mock_response = MagicMock()
-        mock_response.status_code = 400
-        mock_response.text = "Invalid CPF"
-        mock_post.return_value = mock_response
-
-        result = cpf_bureau_check("invalid")
-        self.assertEqual(result, {"error": "Invalid CPF"})
+
+import httpx
+
+from bureau import BureauClient, BureauUnavailable, CircuitBreaker
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_threshold_and_probes_after_reset(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+        self.assertFalse(breaker.allow())
+
+        now[0] = 10
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+
+    def test_failed_probe_reopens(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 5
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+
+
+class TestBureauClient(unittest.TestCase):
+    def _client(self, handler, breaker=None):
+        return BureauClient(
+            url="http://bureau.test/check",
+            circuit_breaker=breaker or CircuitBreaker(failure_threshold=1, reset_timeout=60),
+            transport=httpx.MockTransport(handler),
+        )
+
+    def test_check_success(self):
+        client = self._client(lambda request: httpx.Response(200, json={"restriction": True}))
+
+        async def run():
+            try:
+                return await client.check("12345678900")
+            finally:
+                await client.aclose()
+
+        self.assertEqual(asyncio.run(run()), {"restriction": True})
+
+    def _run(self, client, cpf="1"):
+        async def run():
+            try:
+                return await client.check(cpf)
+            finally:
+                await client.aclose()
+
+        return asyncio.run(run())
+
+    def test_client_error_returns_body(self):
+        client = self._client(lambda request: httpx.Response(400, text="Invalid CPF"))
+        self.assertEqual(self._run(client, "invalid"), {"error": "Invalid CPF"})
+
+    def test_read_timeout_counts_as_bureau_failure(self):
+        def handler(request):
+            raise httpx.ReadTimeout("read timed out", request=request)
+
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        with self.assertRaises(BureauUnavailable):
+            self._run(self._client(handler, breaker))
+        self.assertEqual(breaker.state, "open")
+
+    def test_pool_timeout_does_not_trip_the_breaker(self):
+        def handler(request):
+            raise httpx.PoolTimeout("no connection available", request=request)
+
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5, clock=lambda: now[0])
+        with self.assertRaises(BureauUnavailable):
+            self._run(self._client(handler, breaker))
+        self.assertEqual((breaker.state, breaker.failures), ("closed", 0))
+
+        breaker.record_failure()
+        now[0] = 5
+        with self.assertRaises(BureauUnavailable):
+            self._run(self._client(handler, breaker))
+        self.assertTrue(breaker.allow())
+
+    def test_server_error_opens_circuit_and_fails_fast(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(503)
+
+        client = self._client(handler)
+
+        async def run():
+            try:
+                with self.assertRaises(BureauUnavailable):
+                    await client.check("1")
+                with self.assertRaises(BureauUnavailable):
+                    await client.check("1")
+            finally:
+                await client.aclose()
+
+        asyncio.run(run())
+        self.assertEqual(len(calls), 1)
+
+    def test_cancelled_probe_does_not_wedge_the_breaker(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 5
+
+        async def hang(request):
+            await asyncio.sleep(60)
+
+        client = self._client(hang, breaker)
+
+        async def run():
+            probe = asyncio.create_task(client.check("1"))
+            await asyncio.sleep(0.01)
+            probe.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await probe
+            await client.aclose()
+
+        asyncio.run(run())
+        self.assertEqual(breaker.state, "open")
+        now[0] = 10
+        self.assertTrue(breaker.allow())
+
+    def test_client_of_a_previous_loop_is_closed_on_that_loop(self):
+        client = self._client(lambda request: httpx.Response(200, json={}))
+        first_loop = asyncio.new_event_loop()
+        try:
+            first_loop.run_until_complete(client.check("1"))
+            stale = client._client
+            asyncio.run(client.check("1"))
+            first_loop.run_until_complete(asyncio.sleep(0))
+            self.assertTrue(stale.is_closed)
+            self.assertIsNot(client._client, stale)
+        finally:
+            first_loop.close()
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from bureau import BureauUnavailable
+from bureau_cache import BureauCache, LRUCache, cached_bureau_check
+
+
+class FakeBureau:
+    def __init__(self, result=None, delay=0, error=None):
+        self.calls = []
+        self.result = result if result is not None else {"restriction": False}
+        self.delay = delay
+        self.error = error
+
+    async def __call__(self, cpf):
+        self.calls.append(cpf)
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return dict(self.result, cpf=cpf)
+
+
+def test_lru_evicts_least_recently_used_and_expires():
+    now = [0.0]
+    cache = LRUCache(2, clock=lambda: now[0])
+    cache.set("a", 1, ttl=10)
+    cache.set("b", 2, ttl=10)
+    cache.get("a")
+    cache.set("c", 3, ttl=10)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    now[0] = 10
+    assert cache.get("a") is None
+
+
+def test_hit_avoids_second_call():
+    fetch = FakeBureau()
+    cache = BureauCache(fetch=fetch, use_redis=False)
+
+    async def run():
+        await cache.get("111")
+        return await cache.get("111")
+
+    assert asyncio.run(run())["cpf"] == "111"
+    assert fetch.calls == ["111"]
+
+
+def test_concurrent_lookups_are_coalesced():
+    fetch = FakeBureau(delay=0.05)
+    cache = BureauCache(fetch=fetch, use_redis=False)
+
+    async def run():
+        return await asyncio.gather(*(cache.get("222") for _ in range(20)))
+
+    results = asyncio.run(run())
+    assert len(results) == 20
+    assert fetch.calls == ["222"]
+
+
+def test_cancelled_leader_hands_the_lookup_to_a_waiter():
+    fetch = FakeBureau(delay=0.05)
+    cache = BureauCache(fetch=fetch, use_redis=False)
+
+    async def run():
+        leader = asyncio.create_task(cache.get("223"))
+        await asyncio.sleep(0.01)
+        waiters = [asyncio.create_task(cache.get("223")) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+        assert leader.cancelled()
+        return results
+
+    results = asyncio.run(run())
+    assert [r["cpf"] for r in results] == ["223"] * 3
+    assert fetch.calls == ["223", "223"]
+
+
+def test_negative_results_use_negative_ttl():
+    now = [0.0]
+    fetch = FakeBureau(result={"restriction": True})
+    cache = BureauCache(fetch=fetch, positive_ttl=100, negative_ttl=5, use_redis=False, clock=lambda: now[0])
+
+    async def run():
+        await cache.get("333")
+        now[0] = 6
+        await cache.get("333")
+
+    asyncio.run(run())
+    assert fetch.calls == ["333", "333"]
+
+
+def test_errors_are_not_cached_and_propagate_to_waiters():
+    fetch = FakeBureau(delay=0.01, error=BureauUnavailable("down"))
+    cache = BureauCache(fetch=fetch, use_redis=False)
+
+    async def run():
+        return await asyncio.gather(cache.get("444"), cache.get("444"), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, BureauUnavailable) for r in results)
+    assert fetch.calls == ["444"]
+    assert len(cache._local) == 0
+
+
+def test_empty_cpf_is_never_looked_up_or_cached():
+    fetch = FakeBureau()
+    cache = BureauCache(fetch=fetch, use_redis=False)
+    for cpf in (None, ""):
+        with pytest.raises(ValueError):
+            asyncio.run(cache.get(cpf))
+    assert fetch.calls == []
+    assert len(cache._local) == 0
+
+
+def test_stored_result_skips_bureau():
+    stored = {"restriction": False}
+    assert asyncio.run(cached_bureau_check("555", stored=stored)) is stored
+
+
+@pytest.mark.parametrize("result,ttl", [({"error": "x"}, 0), ({"restriction": True}, 5), ({"restriction": False}, 100)])
+def test_ttl_for(result, ttl):
+    cache = BureauCache(fetch=FakeBureau(), positive_ttl=100, negative_ttl=5, use_redis=False)
+    assert cache.ttl_for(result) == ttl
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from config_cache import ConfigCache
+from models import Base, BusinessRule, WorkflowStage
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def incr(self, key):
+        self.values[key] = str(int(self.values.get(key, "0")) + 1)
+
+
+class FakeAsyncRedis:
+    def __init__(self, redis):
+        self.redis = redis
+
+    async def get(self, key):
+        return self.redis.get(key)
+
+
+class BrokenRedis:
+    def get(self, key):
+        raise ConnectionError("down")
+
+
+class CountingSession:
+    def __init__(self, Session):
+        self.Session = Session
+        self.opened = 0
+
+    def __call__(self):
+        self.opened += 1
+        return self.Session()
+
+
+@pytest.fixture
+def Session():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.add_all([
+        BusinessRule(name="default", min_rating=600, min_income=2000),
+        WorkflowStage(name="manager", order=2),
+        WorkflowStage(name="analyst", order=1),
+        WorkflowStage(name="director", order=3),
+    ])
+    db.commit()
+    db.close()
+    return Session
+
+
+def test_stages_are_precomputed_per_credit_type_in_order(Session):
+    cache = ConfigCache(session_factory=Session, redis_factory=lambda: None, async_redis_factory=lambda: None)
+    assert [s.name for s in cache.stages("consignado")] == ["analyst", "manager", "director"]
+    assert [s.name for s in cache.stages("empresarial")] == ["analyst", "manager"]
+    assert [s.name for s in cache.stages("unknown")] == ["analyst"]
+    assert cache.rule("default").min_rating == 600
+
+
+def test_reads_do_not_query_until_version_changes(Session):
+    now = [0.0]
+    redis = FakeRedis()
+    sessions = CountingSession(Session)
+    writer = ConfigCache(session_factory=sessions, redis_factory=lambda: redis, clock=lambda: now[0])
+    reader = ConfigCache(session_factory=sessions, redis_factory=lambda: redis, clock=lambda: now[0])
+
+    reader.rule("default")
+    for _ in range(10):
+        now[0] += 5
+        reader.rule("default")
+    assert sessions.opened == 1
+
+    db = Session()
+    db.query(BusinessRule).filter_by(name="default").update({"min_rating": 700})
+    db.commit()
+    db.close()
+    writer.invalidate()
+
+    assert reader.rule("default").min_rating == 600
+    now[0] += 5
+    assert reader.rule("default").min_rating == 700
+    assert sessions.opened == 2
+
+
+def test_without_redis_snapshot_expires_after_ttl(Session):
+    now = [0.0]
+    sessions = CountingSession(Session)
+    cache = ConfigCache(session_factory=sessions, redis_factory=lambda: None, async_redis_factory=lambda: None, ttl=30, clock=lambda: now[0])
+    cache.rule("default")
+    now[0] = 29
+    cache.rule("default")
+    assert sessions.opened == 1
+    now[0] = 31
+    cache.rule("default")
+    assert sessions.opened == 2
+
+
+def test_aget_checks_version_asynchronously_and_reloads_off_the_loop(Session):
+    now = [0.0]
+    redis = FakeRedis()
+    loaded_on = []
+
+    def session_factory():
+        loaded_on.append(threading.current_thread())
+        return Session()
+
+    cache = ConfigCache(session_factory=session_factory, redis_factory=lambda: None,
+                        async_redis_factory=lambda: FakeAsyncRedis(redis), clock=lambda: now[0])
+
+    async def run():
+        first = await cache.aget()
+        now[0] += 5
+        assert await cache.aget() is first
+        redis.incr("config:version")
+        assert await cache.aget() is first
+        now[0] += 5
+        return first, await cache.aget()
+
+    first, reloaded = asyncio.run(run())
+    assert reloaded is not first
+    assert len(loaded_on) == 2
+    assert threading.main_thread() not in loaded_on
+
+
+def test_redis_failures_are_logged_at_most_once_a_minute(Session, caplog):
+    now = [0.0]
+    cache = ConfigCache(session_factory=Session, redis_factory=BrokenRedis, ttl=1000, clock=lambda: now[0])
+    with caplog.at_level(logging.WARNING, logger="config_cache"):
+        for _ in range(30):
+            now[0] += 1
+            cache.rule("default")
+        assert len(caplog.records) == 1
+        now[0] += 60
+        cache.rule("default")
+    assert len(caplog.records) == 2
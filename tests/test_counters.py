@@ -0,0 +1,67 @@
+import datetime
+
+import pytest
+
+import counters
+import models
+import routes
+
+
+@pytest.fixture
+def client(client, session, login):
+    session.add_all([
+        models.User(id=1, username="alice", role="analyst", password="x", cpf="11111111111"),
+        models.WorkflowStage(name="analyst", order=1),
+        models.WorkflowStage(name="manager", order=2),
+    ])
+    session.commit()
+    login(1, "analyst")
+    return client, session
+
+
+def test_counters_follow_creation_and_transitions(client, persist_credit_request):
+    client, session = client
+    first = persist_credit_request(1, 100, "pessoal", None, None)
+    second = persist_credit_request(1, 200, "pessoal", None, None)
+    third = persist_credit_request(1, 300, "empresarial", None, None)
+
+    assert client.post(f"/api/v1/credit-requests/{first.id}/approve").status_code == 200
+    assert client.post(f"/api/v1/credit-requests/{second.id}/reject", params={"reason": "no"}).status_code == 200
+    assert client.post(f"/api/v1/credit-requests/{third.id}/approve").status_code == 200
+
+    summary = client.get("/api/v1/dashboard/summary").json()
+    assert summary["total_requests"] == 3
+    assert (summary["pending"], summary["approved"], summary["rejected"]) == (1, 1, 1)
+    assert summary["by_credit_type"] == {
+        "pessoal": {"pending": 0, "approved": 1, "rejected": 1},
+        "empresarial": {"pending": 1},
+    }
+    assert summary["by_day"] == {datetime.datetime.utcnow().date().isoformat(): {"pending": 1, "approved": 1, "rejected": 1}}
+
+    incremental = counters.summary(session)
+    counters.rebuild(session)
+    rebuilt = counters.summary(session)
+    assert rebuilt["by_credit_type"]["pessoal"] == {"approved": 1, "rejected": 1}
+    assert {k: rebuilt[k] for k in ("total_requests", "pending", "approved", "rejected", "by_day")} == \
+        {k: incremental[k] for k in ("total_requests", "pending", "approved", "rejected", "by_day")}
+
+
+def test_async_create_and_status(client, monkeypatch):
+    from bureau_cache import BureauCache
+
+    async def fake_bureau(cpf):
+        return {"restriction": False}
+
+    def blocking(*args):
+        raise AssertionError("sync cache call on the event loop")
+
+    monkeypatch.setattr("bureau_cache.bureau_cache", BureauCache(fetch=fake_bureau, use_redis=False))
+    monkeypatch.setattr(routes.query_cache, "invalidate", blocking)
+    monkeypatch.setattr(routes.config_cache, "stages", blocking)
+    client, session = client
+    response = client.post("/api/v1/credit-requests/", params={"user_id": 1, "amount": 1000, "credit_type": "empresarial"})
+    assert response.status_code == 200
+    created = response.json()
+    assert client.get(f"/api/v1/credit-requests/{created['id']}").json()["status"] == "pending"
+    assert counters.summary(session)["by_credit_type"] == {"empresarial": {"pending": 1}}
+    assert client.post("/api/v1/credit-requests/", params={"user_id": 99, "amount": 1, "credit_type": "pessoal"}).status_code == 404
@@ -0,0 +1,92 @@
+import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models
+import routes
+from auth import Principal
+from sql_metrics import query_budget
+
+
+@pytest.fixture
+def client():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    models.Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        models.User(id=1, username="alice", role="customer", password="x"),
+        models.User(id=2, username="ana", role="analyst", password="x"),
+        models.User(id=3, username="mario", role="manager", password="x"),
+        models.WorkflowStage(id=1, name="analyst", order=1),
+        models.WorkflowStage(id=2, name="manager", order=2),
+        models.CreditRequest(id=1, user_id=1, amount=500, credit_type="empresarial"),
+    ])
+    session.add_all([
+        models.CreditRequestApproval(
+            credit_request_id=1, stage_id=2, status=models.ApprovalStatus.PENDING
+        ),
+        models.CreditRequestApproval(
+            credit_request_id=1, stage_id=1, status=models.ApprovalStatus.APPROVED,
+            approver_id=2, reviewed_at=datetime.datetime(2026, 1, 2)
+        ),
+        models.AuditLog(user_id=1, action="create_credit_request", credit_request_id=1,
+                        timestamp=datetime.datetime(2026, 1, 1)),
+        models.AuditLog(user_id=2, action="approve", credit_request_id=1,
+                        timestamp=datetime.datetime(2026, 1, 2)),
+    ])
+    session.commit()
+    session.expunge_all()
+    routes.app.dependency_overrides[routes.get_db] = lambda: session
+    routes.app.dependency_overrides[routes.get_read_db] = lambda: session
+    routes.app.dependency_overrides[routes.get_current_user] = lambda: Principal(id=1, role="customer")
+    yield TestClient(routes.app), engine
+    routes.app.dependency_overrides.clear()
+    session.close()
+
+
+def test_detail_uses_three_queries(client):
+    client, engine = client
+    with query_budget(engine, 3):
+        response = client.get("/api/v1/credit-requests/1/detail")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "pending"
+    assert [(a["stage"], a["status"], a["approver"]) for a in data["approvals"]] == [
+        ("analyst", "approved", "ana"),
+        ("manager", "pending", None),
+    ]
+    assert [(e["action"], e["user"]) for e in data["audit_trail"]] == [
+        ("create_credit_request", "alice"),
+        ("approve", "ana"),
+    ]
+
+
+def test_approvals_and_history_use_one_query(client):
+    client, engine = client
+    with query_budget(engine, 2):
+        approvals = client.get("/api/v1/credit-requests/1/approvals").json()
+        history = client.get("/api/v1/credit-requests/1/history").json()
+    assert [a["approver"] for a in approvals] == ["ana", None]
+    assert history[0] == {
+        "stage": "analyst", "status": "approved", "approver": "ana",
+        "reviewed_at": "2026-01-02T00:00:00", "rejection_reason": None,
+    }
+
+
+def test_detail_unknown_request(client):
+    client, _ = client
+    assert client.get("/api/v1/credit-requests/99/detail").status_code == 404
+
+
+def test_detail_is_limited_to_owner_and_view_all(client):
+    client, _ = client
+    routes.app.dependency_overrides[routes.get_current_user] = lambda: Principal(id=2, role="analyst")
+    assert client.get("/api/v1/credit-requests/1/detail").status_code == 403
+    routes.app.dependency_overrides[routes.get_current_user] = lambda: Principal(id=3, role="manager")
+    assert client.get("/api/v1/credit-requests/1/detail").status_code == 200
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+from sqlalchemy import text
+
+from database import async_url, engine_options, make_async_engine, make_engine
+
+
+def test_async_url_maps_drivers():
+    assert async_url("sqlite:///./x.db") == "sqlite+aiosqlite:///./x.db"
+    assert async_url("postgresql+psycopg2://u@h/db") == "postgresql+asyncpg://u@h/db"
+
+
+def test_server_databases_get_pool_settings():
+    options = engine_options("postgresql://u@h/db")
+    assert {"pool_size", "max_overflow", "pool_pre_ping", "pool_recycle"} <= set(options)
+
+
+def test_sqlite_profile(tmp_path):
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    writer = make_engine(url)
+    reader = make_engine(url, writer=False)
+    assert writer.pool.size() == 1
+    assert reader.pool.size() > 1
+    with writer.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() > 0
+
+    async def journal_mode():
+        engine = make_async_engine(url)
+        async with engine.connect() as conn:
+            mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+        await engine.dispose()
+        return mode
+
+    assert asyncio.run(journal_mode()) == "wal"
+    writer.dispose()
+    reader.dispose()
+
+
+def test_sqlite_writers_queue_in_process_and_readers_are_not_blocked(tmp_path):
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    writer = make_engine(url)
+    reader = make_engine(url, writer=False)
+    with writer.connect() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        conn.commit()
+
+    held = writer.connect()
+    held.execute(text("INSERT INTO t VALUES (1)"))
+    with reader.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM t")).scalar() == 0
+
+    def second_writer():
+        with writer.begin() as conn:
+            conn.execute(text("INSERT INTO t VALUES (2)"))
+
+    thread = threading.Thread(target=second_writer)
+    thread.start()
+    thread.join(0.2)
+    assert thread.is_alive()
+    held.commit()
+    held.close()
+    thread.join()
+    with reader.connect() as conn:
+        assert conn.execute(text("SELECT x FROM t ORDER BY x")).scalars().all() == [1, 2]
+    writer.dispose()
+    reader.dispose()
+
+
+def test_sqlite_memory_keeps_default_pool():
+    assert "pool_size" not in engine_options("sqlite://")
+    assert "pool_size" not in engine_options("sqlite:///:memory:")
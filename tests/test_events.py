@@ -0,0 +1,203 @@
+import asyncio
+
+import pytest
+
+import routes
+from auth import Principal
+from events import EVENT_STREAM_KEY, EventBus, valid_event_id
+
+
+class FakeStream:
+    """Sync and asyncio faces of one Redis stream."""
+
+    def __init__(self):
+        self.entries = []
+        self.blocking_reads = 0
+
+    def pipeline(self, transaction=False):
+        return self
+
+    def xadd(self, key, fields, maxlen=None, approximate=True):
+        self.entries.append((f"{len(self.entries) + 1}-0", dict(fields)))
+
+    def execute(self):
+        pass
+
+    async def xrevrange(self, key, count=None):
+        return list(reversed(self.entries))[:count]
+
+    async def xread(self, streams, block=None, count=None):
+        after = int(streams[EVENT_STREAM_KEY].split("-")[0])
+        entries = [entry for entry in self.entries if int(entry[0].split("-")[0]) > after][:count]
+        if block is not None:
+            self.blocking_reads += 1
+        if not entries and block is not None:
+            await asyncio.sleep(block / 1000)
+            return []
+        return [(EVENT_STREAM_KEY, entries)]
+
+
+def _event(credit_request_id, user_id=1, stage="analyst", actor_id=2, kind="stage_approved"):
+    return {"type": kind, "credit_request_id": credit_request_id, "user_id": user_id, "stage": stage,
+            "actor_id": actor_id, "at": "2026-01-01T00:00:00"}
+
+
+async def _take(subscription, count):
+    items = []
+    async for item in subscription:
+        items.append(item)
+        if len(items) == count:
+            break
+    await subscription.aclose()
+    return items
+
+
+def _buses():
+    stream = FakeStream()
+    return [
+        EventBus(redis_factory=lambda: None, async_redis_factory=lambda: None, heartbeat=0.05),
+        EventBus(redis_factory=lambda: stream, async_redis_factory=lambda: stream, heartbeat=0.05),
+    ]
+
+
+@pytest.mark.parametrize("bus", _buses(), ids=["local", "redis"])
+def test_subscribers_resume_after_last_event_id(bus):
+    bus.publish_many([_event(1), _event(2), _event(3)])
+    items = asyncio.run(_take(bus.subscribe("1-0"), 2))
+    assert [(event_id, event["credit_request_id"]) for event_id, event in items] == [("2-0", 2), ("3-0", 3)]
+
+
+@pytest.mark.parametrize("bus", _buses(), ids=["local", "redis"])
+def test_new_subscribers_only_get_later_events_and_heartbeats(bus):
+    bus.publish_many([_event(1)])
+
+    async def scenario():
+        subscription = bus.subscribe()
+        first = await subscription.__anext__()
+        bus.publish_many([_event(2)])
+        second = await subscription.__anext__()
+        while second is None:
+            second = await subscription.__anext__()
+        await subscription.aclose()
+        return first, second
+
+    heartbeat, (event_id, event) = asyncio.run(scenario())
+    assert heartbeat is None
+    assert (event_id, event["credit_request_id"]) == ("2-0", 2)
+
+
+def test_subscribers_share_one_stream_reader():
+    stream = FakeStream()
+    bus = EventBus(redis_factory=lambda: stream, async_redis_factory=lambda: stream, heartbeat=0.05)
+    bus.publish_many([_event(1)])
+
+    async def scenario():
+        subscriptions = [bus.subscribe() for _ in range(5)]
+        takes = [asyncio.ensure_future(_take(_without_heartbeats(subscription), 1)) for subscription in subscriptions]
+        await asyncio.sleep(0.12)
+        reads = stream.blocking_reads
+        bus.publish_many([_event(2)])
+        received = await asyncio.gather(*takes)
+        await asyncio.sleep(0)
+        return reads, received, bus._readers
+
+    reads, received, readers = asyncio.run(scenario())
+    assert reads <= 3
+    assert [[event_id for event_id, _ in items] for items in received] == [["2-0"]] * 5
+    assert readers == {}
+
+
+def test_subscriber_that_falls_behind_is_closed():
+    stream = FakeStream()
+    bus = EventBus(redis_factory=lambda: stream, async_redis_factory=lambda: stream, heartbeat=0.05, queue_size=2)
+
+    async def scenario():
+        subscription = bus.subscribe()
+        assert await subscription.__anext__() is None
+        bus.publish_many([_event(i) for i in range(1, 6)])
+        await asyncio.sleep(0.1)
+        return [item async for item in subscription]
+
+    assert [event_id for event_id, _ in asyncio.run(scenario())] == ["1-0", "2-0"]
+
+
+async def _without_heartbeats(subscription):
+    try:
+        async for item in subscription:
+            if item is not None:
+                yield item
+    finally:
+        await subscription.aclose()
+
+
+def test_event_ids_are_validated():
+    assert valid_event_id("1700000000000-3")
+    assert not valid_event_id("abc")
+
+
+class _Request:
+    async def is_disconnected(self):
+        return False
+
+
+def test_stream_filters_events_by_permission(monkeypatch):
+    bus = EventBus(redis_factory=lambda: None, async_redis_factory=lambda: None, heartbeat=0.05)
+    monkeypatch.setattr(routes.events, "event_bus", bus)
+    bus.publish_many([
+        _event(1, user_id=7),
+        _event(2, user_id=8, stage="manager", actor_id=3, kind="request_rejected"),
+    ])
+
+    def received(user, count, credit_request_id=None):
+        chunks = asyncio.run(_take(routes._event_stream(_Request(), user, "0-0", credit_request_id), count))
+        return [chunk for chunk in chunks if chunk.startswith("id:")]
+
+    customer = received(Principal(id=7, role="customer"), 3)
+    assert len(customer) == 1 and customer[0].startswith("id: 1-0\nevent: stage_approved\n")
+    manager = received(Principal(id=3, role="manager"), 3)
+    assert len(manager) == 2
+    assert received(Principal(id=3, role="manager"), 3, credit_request_id=2)[0].startswith("id: 2-0\nevent: request_rejected")
+
+
+def test_async_publish_uses_the_asyncio_client():
+    stream = FakeStream()
+
+    class AsyncPipeline:
+        def __init__(self):
+            self.pending = []
+
+        def xadd(self, *args, **kwargs):
+            self.pending.append((args, kwargs))
+
+        async def execute(self):
+            for args, kwargs in self.pending:
+                stream.xadd(*args, **kwargs)
+
+    class AsyncClient:
+        def pipeline(self, transaction=False):
+            return AsyncPipeline()
+
+    def sync_client():
+        raise AssertionError("sync Redis client used from async code")
+
+    bus = EventBus(redis_factory=sync_client, async_redis_factory=AsyncClient)
+    asyncio.run(bus.apublish_many([_event(1), _event(2)]))
+    assert [entry_id for entry_id, _ in stream.entries] == ["1-0", "2-0"]
+
+
+def test_subscribers_back_off_and_end_when_redis_keeps_failing():
+    class BrokenStream:
+        calls = 0
+
+        async def xrevrange(self, key, count=None):
+            BrokenStream.calls += 1
+            raise ConnectionError("redis down")
+
+    bus = EventBus(redis_factory=lambda: None, async_redis_factory=BrokenStream, heartbeat=0.05,
+                   retry_backoff=0.001, max_failures=3)
+
+    async def drain():
+        return [item async for item in bus.subscribe()]
+
+    assert asyncio.run(drain()) == [None, None]
+    assert BrokenStream.calls == 3
@@ -0,0 +1,68 @@
+import datetime
+
+import pytest
+
+import models
+from pagination import InvalidCursor, decode_cursor, decode_position, encode_cursor, encode_position
+
+
+@pytest.fixture
+def client(client, session, login):
+    base = datetime.datetime(2026, 1, 1)
+    session.add(models.User(id=1, username="alice", role="analyst", password="x"))
+    session.add_all([
+        models.CreditRequest(
+            id=i,
+            user_id=1,
+            amount=100 * i,
+            status=models.ApprovalStatus.APPROVED if i % 3 == 0 else models.ApprovalStatus.PENDING,
+            created_at=base + datetime.timedelta(hours=i // 2),
+        )
+        for i in range(1, 26)
+    ])
+    session.commit()
+    login(1, "admin")
+    return client
+
+
+def _all_pages(client, **params):
+    ids, cursor = [], None
+    while True:
+        response = client.get("/api/v1/credit-requests/", params=dict(params, cursor=cursor) if cursor else params)
+        assert response.status_code == 200
+        ids.extend(r["id"] for r in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return ids
+
+
+def test_cursor_round_trip():
+    created_at = datetime.datetime(2026, 3, 4, 5, 6, 7, 890)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+
+def test_pages_cover_every_row_once_newest_first(client):
+    assert _all_pages(client, limit=7) == list(range(25, 0, -1))
+
+
+def test_pages_respect_filters(client):
+    assert _all_pages(client, limit=2, status="APPROVED") == [24, 21, 18, 15, 12, 9, 6, 3]
+
+
+def test_next_cursor_is_exposed_to_browsers(client):
+    response = client.get("/api/v1/credit-requests/", params={"limit": 2}, headers={"Origin": "https://app.example.com"})
+    assert response.headers["X-Next-Cursor"]
+    assert "X-Next-Cursor" in response.headers["Access-Control-Expose-Headers"]
+
+
+def test_invalid_cursor_is_rejected(client):
+    response = client.get("/api/v1/credit-requests/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_position_cursor_round_trips_and_rejects_wrong_shape():
+    assert decode_position(encode_position([2, 41]), 2) == (2, 41)
+    with pytest.raises(InvalidCursor):
+        decode_position(encode_position([2]), 2)
+    with pytest.raises(InvalidCursor):
+        decode_position("not-a-cursor", 2)
@@ -0,0 +1,24 @@
+import pytest
+
+import models
+
+
+@pytest.fixture
+def client(client, session, login):
+    session.add(models.User(id=1, username="alice", role="customer", password="x"))
+    session.commit()
+    login(1, "customer")
+    return client, session
+
+
+def test_update_preferences(client, audit_buffer):
+    client, session = client
+    response = client.put("/api/v1/users/1/preferences", json={"notify_email": False, "notify_sms": True})
+    assert response.status_code == 200
+    session.expire_all()
+    user = session.get(models.User, 1)
+    assert (user.notify_email, user.notify_sms) == (False, True)
+    [entry] = [e for e in audit_buffer.entries if e["action"] == "update_preferences"]
+    assert entry["ip"] == "testclient"
+
+    assert client.put("/api/v1/users/404/preferences", json={}).status_code == 404
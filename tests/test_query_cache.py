@@ -0,0 +1,114 @@
+import datetime
+import logging
+
+import pytest
+
+import counters
+import models
+from query_cache import QueryCache, normalize_params
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+
+def test_normalize_params_ignores_unset_and_order():
+    assert normalize_params({"b": 2, "a": None, "c": datetime.date(2026, 1, 2)}) == [("b", 2), ("c", "2026-01-02")]
+    assert normalize_params({"x": 1, "y": 2}) == normalize_params({"y": 2, "x": 1})
+
+
+@pytest.mark.parametrize("redis", [None, FakeRedis()])
+def test_entries_are_keyed_by_params_and_scope_and_invalidated_by_tag(redis):
+    cache = QueryCache(redis_factory=lambda: redis)
+    calls = []
+
+    def compute(value):
+        return lambda: calls.append(value) or value
+
+    assert cache.get_or_compute("e", {"user_id": 1}, "analyst", ["t"], compute(1)) == 1
+    assert cache.get_or_compute("e", {"user_id": 1}, "analyst", ["t"], compute(99)) == 1
+    assert cache.get_or_compute("e", {"user_id": 2}, "analyst", ["t"], compute(2)) == 2
+    assert cache.get_or_compute("e", {"user_id": 1}, "admin", ["t"], compute(3)) == 3
+    cache.invalidate("other")
+    assert cache.get_or_compute("e", {"user_id": 1}, "analyst", ["t"], compute(99)) == 1
+    cache.invalidate("t")
+    assert cache.get_or_compute("e", {"user_id": 1}, "analyst", ["t"], compute(4)) == 4
+    assert calls == [1, 2, 3, 4]
+
+
+def test_async_invalidate_bumps_the_shared_version():
+    import asyncio
+
+    redis = FakeRedis()
+
+    class AsyncRedis:
+        async def incr(self, key):
+            return redis.incr(key)
+
+    cache = QueryCache(redis_factory=lambda: redis, async_redis_factory=AsyncRedis)
+    assert cache.get_or_compute("e", {}, None, ["t"], lambda: 1) == 1
+    asyncio.run(cache.ainvalidate("t"))
+    assert cache.get_or_compute("e", {}, None, ["t"], lambda: 2) == 2
+
+
+
+def test_redis_failures_are_logged_at_most_once_per_interval(caplog):
+    class BrokenRedis:
+        def mget(self, keys):
+            raise ConnectionError("redis down")
+
+        incr = mget
+
+    now = [0.0]
+    cache = QueryCache(redis_factory=BrokenRedis, clock=lambda: now[0])
+    with caplog.at_level(logging.WARNING, logger="query_cache"):
+        for _ in range(5):
+            assert cache.get_or_compute("e", {}, None, ["t"], lambda: 1) == 1
+            cache.invalidate("t")
+        now[0] = 61
+        cache.get_or_compute("e", {}, None, ["t"], lambda: 1)
+    assert len(caplog.records) == 2
+
+@pytest.fixture
+def client(client, session, login):
+    session.add_all([
+        models.User(id=1, username="alice", role="analyst", password="x"),
+        models.User(id=2, username="bob", role="analyst", password="x"),
+        models.CreditRequest(id=1, user_id=1, amount=100),
+        models.CreditRequest(id=2, user_id=2, amount=200),
+    ])
+    session.commit()
+    counters.rebuild(session)
+    login(1, "admin")
+    return client, session
+
+
+def test_list_credit_requests_cache_respects_filters(client):
+    client, _ = client
+
+    def by_user(user_id):
+        return [r["id"] for r in client.get("/api/v1/credit-requests/", params={"user_id": user_id}).json()]
+
+    assert by_user(1) == [1]
+    assert by_user(2) == [2]
+
+
+def test_dashboard_is_invalidated_by_writes(client, persist_credit_request):
+    client, session = client
+    assert client.get("/api/v1/dashboard/summary").json()["total_requests"] == 2
+    persist_credit_request(1, 300, "pessoal", None, None)
+    assert client.get("/api/v1/dashboard/summary").json()["total_requests"] == 3
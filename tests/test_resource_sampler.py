@@ -0,0 +1,26 @@
+import asyncio
+
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+
+from resource_sampler import ResourceSampler
+
+
+def test_sampler_updates_gauges(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'x.db'}")
+    sampler = ResourceSampler(interval=0.01, engines={"test": engine})
+
+    async def run():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            sampler.start()
+            await asyncio.sleep(0.05)
+        await sampler.stop()
+
+    asyncio.run(run())
+    assert REGISTRY.get_sample_value("app_memory_usage_mb") > 0
+    assert REGISTRY.get_sample_value("app_threads") >= 1
+    assert REGISTRY.get_sample_value("app_db_connections_checked_out", {"engine": "test"}) == 1
+    assert REGISTRY.get_sample_value("app_threadpool_saturation") == 0
+    assert REGISTRY.get_sample_value("app_event_loop_lag_seconds") is not None
+    assert sampler._task is None
@@ -0,0 +1,161 @@
+from datetime import timedelta
+
+from revocation import REVOKE_SCRIPT, BloomFilter, RevocationStore
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.zsets = {}
+        self.zscore_calls = 0
+        self.down = False
+
+    def eval(self, script, numkeys, *args):
+        assert script == REVOKE_SCRIPT and numkeys == 3
+        revoked_key, log_key, seq_key, token_id, exp = args
+        seq = self.incr(seq_key)
+        self.zadd(revoked_key, {token_id: exp})
+        self.zadd(log_key, {token_id: seq})
+        return seq
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def incr(self, key):
+        self.values[key] = int(self.values.get(key, 0)) + 1
+        return self.values[key]
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def zscore(self, key, member):
+        self.zscore_calls += 1
+        return self.zsets.get(key, {}).get(member)
+
+    def zrem(self, key, *members):
+        for member in members:
+            self.zsets.get(key, {}).pop(member, None)
+
+    def zrangebyscore(self, key, low, high, withscores=False):
+        def bound(value):
+            value = str(value)
+            if value in ("-inf", "+inf"):
+                return float(value), False
+            if value.startswith("("):
+                return float(value[1:]), True
+            return float(value), False
+
+        if self.down:
+            raise ConnectionError("redis down")
+        low, low_open = bound(low)
+        high, high_open = bound(high)
+        items = sorted(self.zsets.get(key, {}).items(), key=lambda item: item[1])
+        items = [
+            (member, score) for member, score in items
+            if (score > low if low_open else score >= low) and (score < high if high_open else score <= high)
+        ]
+        return items if withscores else [member for member, _ in items]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    for i in range(1000):
+        bloom.add(f"token-{i}")
+    assert all(f"token-{i}" in bloom for i in range(1000))
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_local_store_expires_entries():
+    now = [1000.0]
+    store = RevocationStore(redis_factory=lambda: None, rebuild_interval=60, clock=lambda: now[0])
+    store.revoke("a", exp=1100)
+    store.revoke("stale", exp=900)
+    assert store.is_revoked("a")
+    assert not store.is_revoked("b")
+    assert not store.is_revoked("stale")
+    now[0] = 1200
+    assert not store.is_revoked("a")
+    assert "a" not in store._local
+
+
+def test_revocation_is_shared_through_redis():
+    redis = FakeRedis()
+    now = [1000.0]
+    writer = RevocationStore(redis_factory=lambda: redis, sync_interval=1, clock=lambda: now[0])
+    reader = RevocationStore(redis_factory=lambda: redis, sync_interval=1, clock=lambda: now[0])
+    assert not reader.is_revoked("jti-1")
+
+    writer.revoke("jti-1", exp=1500)
+    now[0] += 1
+    assert reader.is_revoked("jti-1")
+
+    calls = redis.zscore_calls
+    for i in range(100):
+        assert not reader.is_revoked(f"other-{i}")
+    assert redis.zscore_calls - calls < 5
+
+    now[0] = 2000
+    assert not reader.is_revoked("jti-1")
+    assert redis.zsets["auth:revoked"] == {}
+
+
+def test_failed_rebuild_keeps_the_filter_and_retries():
+    redis = FakeRedis()
+    now = [1000.0]
+    writer = RevocationStore(redis_factory=lambda: redis, sync_interval=1, clock=lambda: now[0])
+    reader = RevocationStore(redis_factory=lambda: redis, sync_interval=1, rebuild_interval=60, clock=lambda: now[0])
+    writer.revoke("jti-1", exp=1500)
+    assert reader.is_revoked("jti-1")
+
+    now[0] = 1100
+    redis.down = True
+    assert reader.is_revoked("jti-1")
+    assert reader._rebuilt_at == 1000.0
+
+    redis.down = False
+    writer.revoke("jti-2", exp=1500)
+    now[0] = 1101
+    assert reader.is_revoked("jti-2")
+    assert reader._rebuilt_at == 1101
+
+
+def test_logout_revokes_token_by_jti(monkeypatch):
+    import auth
+
+    monkeypatch.setattr(auth, "revocation_store", RevocationStore(redis_factory=lambda: None))
+    token = auth.create_access_token({"sub": "someone"}, expires_delta=timedelta(minutes=5))
+    other = auth.create_access_token({"sub": "someone"}, expires_delta=timedelta(minutes=5))
+    assert not auth.is_token_blacklisted(token)
+    auth.blacklist_token(token)
+    assert auth.is_token_blacklisted(token)
+    assert not auth.is_token_blacklisted(other)
+
+
+def test_async_check_answers_bloom_misses_without_redis():
+    import asyncio
+
+    redis = FakeRedis()
+    now = [1000.0]
+    store = RevocationStore(redis_factory=lambda: redis, sync_interval=1, clock=lambda: now[0])
+    store.revoke("jti-1", exp=1500)
+    assert asyncio.run(store.ais_revoked("jti-1"))
+
+    redis_calls = []
+    store.redis_factory = lambda: redis_calls.append(1) or redis
+    assert not asyncio.run(store.ais_revoked("jti-2"))
+    assert redis_calls == []
+
+
+def test_routes_issue_tokens_with_jti(monkeypatch):
+    import auth
+    import routes
+    from fastapi.testclient import TestClient
+
+    user = auth.Principal(id=1, username="someone", mfa_enabled=False)
+    monkeypatch.setattr(routes, "authenticate_user", lambda username, password: user)
+    monkeypatch.setattr(routes, "log_audit", lambda *args, **kwargs: None)
+    response = TestClient(routes.app).post("/api/v1/token", data={"username": "someone", "password": "pw"})
+    assert response.status_code == 200
+    claims = auth.jwt.get_unverified_claims(response.json()["access_token"])
+    assert claims["sub"] == "someone" and claims["jti"]
@@ -0,0 +1,108 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import rule_engine
+from bureau_cache import BureauCache
+from rule_engine import EXTERNAL_COST, Predicate, RuleContext, compile_rules, evaluate_rules
+
+
+class FakeConfigCache:
+    def __init__(self, rules):
+        self.snapshot = SimpleNamespace(rules=rules)
+
+    async def aget(self):
+        return self.snapshot
+
+
+@pytest.fixture
+def bureau_calls(monkeypatch):
+    calls = []
+
+    async def fetch(cpf):
+        calls.append(cpf)
+        return {"restriction": cpf == "restricted"}
+
+    monkeypatch.setattr("bureau_cache.bureau_cache", BureauCache(fetch=fetch, use_redis=False))
+    return calls
+
+
+def _rule(**kwargs):
+    values = {"min_rating": 600, "min_income": 2000, "block_if_bureau_restriction": True}
+    values.update(kwargs)
+    return SimpleNamespace(**values)
+
+
+def _user(rating=700, income=5000, cpf="clean"):
+    return SimpleNamespace(id=1, rating=rating, income=income, cpf=cpf)
+
+
+def _evaluate(rule, user):
+    ctx = RuleContext(user, "pessoal")
+    return asyncio.run(compile_rules(rule, "pessoal").evaluate(ctx)), ctx
+
+
+def test_local_failure_never_calls_bureau(bureau_calls):
+    outcome, _ = _evaluate(_rule(), _user(rating=500))
+    assert outcome.failed_rule == "min_rating"
+    assert outcome.detail == "Rating below minimum"
+    assert bureau_calls == []
+
+
+def test_bureau_runs_last_and_result_is_kept(bureau_calls):
+    outcome, ctx = _evaluate(_rule(), _user())
+    assert outcome.passed
+    assert list(outcome.timings) == ["min_rating", "min_income", "bureau_restriction"]
+    assert ctx.bureau_result == {"restriction": False}
+    assert bureau_calls == ["clean"]
+
+
+def test_bureau_restriction_checked_once(bureau_calls):
+    outcome, _ = _evaluate(_rule(block_if_bureau_restriction=False), _user(cpf="restricted"))
+    assert outcome.detail == "Request blocked due to a restriction at the credit bureau"
+    assert bureau_calls == ["restricted"]
+
+
+def test_missing_cpf_fails_without_a_lookup(bureau_calls):
+    outcome, ctx = _evaluate(_rule(), _user(cpf=None))
+    assert outcome.failed_rule == "bureau_restriction"
+    assert outcome.detail == "A CPF is required for the credit bureau check"
+    assert ctx.bureau_result is None
+    assert bureau_calls == []
+
+
+def test_stored_bureau_result_is_reused(bureau_calls):
+    ctx = RuleContext(_user(), "pessoal", bureau_result={"restriction": True})
+    outcome = asyncio.run(compile_rules(_rule(), "pessoal").evaluate(ctx))
+    assert outcome.detail == "Blocked by bureau restriction"
+    assert bureau_calls == []
+
+
+def test_registered_builders_are_ordered_by_cost(bureau_calls, monkeypatch):
+    monkeypatch.setattr(rule_engine, "_rule_builders", list(rule_engine._rule_builders))
+
+    @rule_engine.rule_builder
+    def max_amount(rule, credit_type):
+        return Predicate("max_amount", lambda ctx: "Amount too high" if ctx.amount > 1000 else None)
+
+    @rule_engine.rule_builder
+    def slow_check(rule, credit_type):
+        return Predicate("slow_check", lambda ctx: None, cost=EXTERNAL_COST * 2)
+
+    pipeline = compile_rules(_rule(), "pessoal")
+    assert [p.name for p in pipeline.predicates] == [
+        "min_rating", "min_income", "max_amount", "bureau_restriction", "slow_check",
+    ]
+    outcome = asyncio.run(pipeline.evaluate(RuleContext(_user(), "pessoal", amount=5000)))
+    assert outcome.failed_rule == "max_amount"
+    assert bureau_calls == []
+
+
+def test_evaluate_rules_prefers_credit_type_rule_and_caches_pipeline():
+    cache = FakeConfigCache({"default": _rule(min_rating=600), "consignado": _rule(min_rating=800)})
+    outcome = asyncio.run(evaluate_rules(RuleContext(_user(rating=700), "consignado"), cache))
+    assert outcome.failed_rule == "min_rating"
+    pipeline = cache.snapshot.compiled_rules["consignado"]
+    asyncio.run(evaluate_rules(RuleContext(_user(rating=750), "consignado"), cache))
+    assert cache.snapshot.compiled_rules["consignado"] is pipeline
@@ -0,0 +1,142 @@
+import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+import counters
+import models
+import routes
+import screening
+import tasks
+from bureau import BureauUnavailable
+from bureau_cache import BureauCache
+from config_cache import ConfigCache
+from events import EventBus
+from models import ApprovalStatus
+from query_cache import QueryCache
+
+
+@pytest.fixture
+def intake(database, monkeypatch):
+    Session = database
+    session = Session()
+    session.add_all([
+        models.User(id=1, username="alice", role="customer", password="x", rating=700, income=5000,
+                    cpf="11111111111"),
+        models.User(id=2, username="bob", role="customer", password="x", rating=400, income=5000,
+                    cpf="22222222222", email="bob@example.com"),
+        models.BusinessRule(name="default", min_rating=600, block_if_bureau_restriction=True),
+        models.WorkflowStage(id=1, name="analyst", order=1),
+        models.WorkflowStage(id=2, name="manager", order=2),
+    ])
+    session.commit()
+    session.close()
+
+    async def fake_bureau(cpf):
+        return {"restriction": False}
+
+    queued = []
+    cache = ConfigCache(session_factory=Session, redis_factory=lambda: None, async_redis_factory=lambda: None)
+    bus = EventBus(redis_factory=lambda: None, async_redis_factory=lambda: None)
+    no_redis = QueryCache(redis_factory=lambda: None, async_redis_factory=lambda: None)
+    monkeypatch.setattr("bureau_cache.bureau_cache", BureauCache(fetch=fake_bureau, use_redis=False))
+    monkeypatch.setattr(routes, "config_cache", cache)
+    monkeypatch.setattr(routes, "query_cache", no_redis)
+    monkeypatch.setattr(tasks, "config_cache", cache)
+    monkeypatch.setattr(tasks, "SessionLocal", Session)
+    monkeypatch.setattr(screening, "query_cache", no_redis)
+    monkeypatch.setattr(screening, "event_bus", bus)
+    monkeypatch.setattr(tasks.process_credit_request, "delay", queued.append)
+    monkeypatch.setattr(screening, "ReadSessionLocal", Session)
+    return TestClient(routes.app), Session, queued, bus
+
+
+def _accept(client, user_id):
+    response = client.post(
+        "/api/v1/credit-requests/",
+        params={"user_id": user_id, "amount": 1000, "credit_type": "empresarial", "mode": "async"},
+    )
+    assert response.status_code == 202
+    return response
+
+
+def test_async_intake_returns_202_and_worker_opens_the_approval_chain(intake):
+    client, Session, queued, bus = intake
+    response = _accept(client, 1)
+
+    body = response.json()
+    assert body["status"] == "screening"
+    assert response.headers["Location"] == body["status_url"]
+    assert body["status_url"].endswith(f"/api/v1/credit-requests/{body['id']}")
+    assert queued == [body["id"]]
+    assert client.get(body["status_url"]).json()["status"] == "screening"
+    db = Session()
+    assert db.query(models.CreditRequestApproval).count() == 0
+    assert counters.summary(db)["screening"] == 1
+
+    assert tasks.process_credit_request.run(body["id"]) == {"request_id": body["id"], "status": "pending"}
+    db.expire_all()
+    assert db.get(models.CreditRequest, body["id"]).bureau_result == {"restriction": False}
+    assert [a.stage_id for a in db.query(models.CreditRequestApproval).order_by("stage_id")] == [1, 2]
+    assert counters.summary(db)["screening"] == 0
+    assert counters.summary(db)["pending"] == 1
+    assert [event["type"] for _, event in bus._local] == ["screening_passed"]
+    assert tasks.process_credit_request.run(body["id"])["status"] == "skipped"
+    db.close()
+
+
+def test_failed_rules_reject_the_request(intake):
+    client, Session, queued, bus = intake
+    credit_request_id = _accept(client, 2).json()["id"]
+
+    assert tasks.process_credit_request.run(credit_request_id)["status"] == "rejected"
+    db = Session()
+    assert db.get(models.CreditRequest, credit_request_id).status == ApprovalStatus.REJECTED
+    assert db.query(models.CreditRequestApproval).count() == 0
+    assert db.query(models.AuditLog).filter_by(action="screen").one().details == "Rule min_rating: Rating below minimum"
+    assert counters.summary(db)["rejected"] == 1
+    assert [(m.user_id, m.to_email) for m in db.query(models.EmailOutbox)] == [(2, "bob@example.com")]
+    assert [(event["type"], event["user_id"]) for _, event in bus._local] == [("request_rejected", 2)]
+    db.close()
+
+
+def test_bureau_outage_leaves_the_request_screening(intake, monkeypatch):
+    client, Session, queued, bus = intake
+    credit_request_id = _accept(client, 1).json()["id"]
+
+    async def unavailable(cpf):
+        raise BureauUnavailable("down")
+
+    monkeypatch.setattr("bureau_cache.bureau_cache", BureauCache(fetch=unavailable, use_redis=False))
+    with pytest.raises(BureauUnavailable):
+        tasks.process_credit_request.run(credit_request_id)
+    db = Session()
+    assert db.get(models.CreditRequest, credit_request_id).status == ApprovalStatus.SCREENING
+
+    period = datetime.timedelta(seconds=screening.SCREENING_REQUEUE_SECONDS + 1)
+    later = datetime.datetime.utcnow() + period
+    assert screening.stale(db) == []
+    assert screening.stale(db, now=later) == [credit_request_id]
+    screening.mark_enqueued(db, [credit_request_id], now=later)
+    assert screening.stale(db, now=later) == []
+    assert screening.stale(db, now=later + period) == [credit_request_id]
+    assert screening.stale(db, now=later + period, max_enqueues=2) == []
+    screening.sample_backlog(Session, now=later)
+    assert screening.screening_backlog._value.get() == 1
+    assert screening.screening_lag._value.get() > screening.SCREENING_REQUEUE_SECONDS
+    db.close()
+
+
+def test_requeue_caps_each_run(intake):
+    client, Session, queued, bus = intake
+    ids = [_accept(client, 1).json()["id"] for _ in range(3)]
+    db = Session()
+    db.query(models.CreditRequest).update({"screening_enqueued_at": datetime.datetime(2020, 1, 1)})
+    db.commit()
+    db.close()
+    queued.clear()
+
+    assert tasks.requeue_stale_screening.run(limit=2) == 2
+    assert tasks.requeue_stale_screening.run(limit=2) == 1
+    assert tasks.requeue_stale_screening.run(limit=2) == 0
+    assert queued == ids
@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import counters
+import models
+import seed_data
+from config_cache import APPROVAL_FLOWS
+
+
+@pytest.fixture(autouse=True)
+def fast_hash(monkeypatch):
+    monkeypatch.setattr("auth.hash_password", lambda password: f"hashed-{password}")
+
+
+def _generate(argv):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    args = seed_data.parse_args(["--end-date", "2024-06-30", "--staff-per-role", "3", "--batch-size", "70"] + argv)
+    seed_data.generate(args, bind=engine, session_factory=Session, log=lambda message: None)
+    return Session()
+
+
+def _dump(db, model):
+    return [tuple(row) for row in db.execute(select(*model.__table__.columns).order_by(model.id))]
+
+
+def test_generates_requested_volume_with_consistent_chains():
+    db = _generate(["--users", "50", "--requests", "200", "--seed", "1"])
+    assert db.query(models.User).filter_by(role="customer").count() == 50
+    assert db.query(models.CreditRequest).count() == 200
+    for credit_request in db.query(models.CreditRequest):
+        chain = (db.query(models.CreditRequestApproval)
+                 .filter_by(credit_request_id=credit_request.id)
+                 .order_by(models.CreditRequestApproval.stage_id).all())
+        assert len(chain) == len(APPROVAL_FLOWS[credit_request.credit_type])
+        statuses = [approval.status for approval in chain]
+        if credit_request.status == models.ApprovalStatus.APPROVED:
+            assert set(statuses) == {models.ApprovalStatus.APPROVED}
+        elif credit_request.status == models.ApprovalStatus.REJECTED:
+            assert statuses.count(models.ApprovalStatus.REJECTED) == 1
+            assert models.ApprovalStatus.PENDING not in statuses
+        else:
+            assert models.ApprovalStatus.PENDING in statuses
+            assert models.ApprovalStatus.REJECTED not in statuses
+    decided = db.query(models.CreditRequest).filter(
+        models.CreditRequest.status != models.ApprovalStatus.PENDING
+    ).count()
+    assert db.query(models.NotificationLog).count() == decided
+    assert db.query(models.AuditLog).filter_by(action="create_credit_request").count() == 200
+    assert counters.summary(db)["total_requests"] == 200
+
+
+def test_distributions_and_date_range_are_configurable():
+    db = _generate([
+        "--users", "10", "--requests", "100", "--status-mix", "APPROVED=1",
+        "--credit-types", "empresarial=1", "--days", "10",
+    ])
+    assert {s for (s,) in db.query(models.CreditRequest.status).distinct()} == {models.ApprovalStatus.APPROVED}
+    assert {t for (t,) in db.query(models.CreditRequest.credit_type).distinct()} == {"empresarial"}
+    first, last = db.query(func.min(models.CreditRequest.created_at), func.max(models.CreditRequest.created_at)).one()
+    assert first.date().isoformat() >= "2024-06-21"
+    assert last.date().isoformat() <= "2024-06-30"
+
+
+def test_same_seed_produces_same_rows():
+    argv = ["--users", "20", "--requests", "150", "--seed", "7"]
+    first, second = _generate(argv), _generate(argv)
+    for model in (models.User, models.CreditRequest, models.CreditRequestApproval, models.AuditLog):
+        assert _dump(first, model) == _dump(second, model)
+    other = _generate(["--users", "20", "--requests", "150", "--seed", "8"])
+    assert _dump(first, models.CreditRequest) != _dump(other, models.CreditRequest)
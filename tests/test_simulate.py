@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import ApprovalStatus, Base, BusinessRule, CreditRequest, User
+from simulate import load_portfolio, simulate, simulate_rule_change
+
+
+@pytest.fixture
+def db_session():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        User(id=1, username="low", role="client", password="x", rating=620, income=3000),
+        User(id=2, username="high", role="client", password="x", rating=800, income=9000),
+        User(id=3, username="unknown", role="client", password="x"),
+        BusinessRule(name="default", min_rating=600, min_income=2000),
+    ])
+    session.add_all([
+        CreditRequest(user_id=1, amount=500, credit_type="pessoal", bureau_result={"restriction": False}),
+        CreditRequest(user_id=2, amount=500, credit_type="pessoal", bureau_result={"restriction": False}),
+        CreditRequest(user_id=2, amount=30000, credit_type="empresarial", bureau_result={"restriction": True}),
+        CreditRequest(user_id=1, amount=30000, credit_type="empresarial", status=ApprovalStatus.APPROVED),
+        CreditRequest(user_id=3, amount=2000, credit_type="pessoal"),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_load_portfolio_is_columnar(db_session):
+    portfolio = load_portfolio(db_session.get_bind())
+    assert portfolio["type_names"] == ["empresarial", "pessoal"]
+    assert portfolio["amount"].dtype == np.float64
+    assert portfolio["restricted"].tolist() == [False, False, True, False, False]
+    assert portfolio["bureau_known"].tolist() == [True, True, True, False, False]
+    assert portfolio["rating"].tolist() == [620, 800, 800, 620, 0]
+
+
+def test_simulate_reports_flips_by_type_and_band(db_session):
+    rule = db_session.query(BusinessRule).filter_by(name="default").one()
+    result = simulate_rule_change(db_session, rule, {"min_rating": 700, "unrelated": 1})
+
+    assert result["changes"] == {"min_rating": 700}
+    assert result["requests"] == 5
+    assert result["flipped_to_fail"] == 2
+    assert result["without_bureau_result"] == 2
+    groups = {(g["credit_type"], g["amount_band"]): g for g in result["groups"]}
+    pessoal_small = groups[("pessoal", "0-1k")]
+    assert pessoal_small["approval_rate_before"] == 1.0
+    assert pessoal_small["approval_rate_after"] == 0.5
+    assert pessoal_small["approval_rate_delta"] == -0.5
+    assert groups[("empresarial", "20k-100k")]["flipped_to_fail"] == 1
+
+
+def test_simulate_filters_by_status(db_session):
+    rule = db_session.query(BusinessRule).filter_by(name="default").one()
+    result = simulate_rule_change(db_session, rule, {"min_rating": 700}, [ApprovalStatus.APPROVED])
+    assert result["requests"] == 1
+    assert result["flipped_to_fail"] == 1
+
+
+def test_simulate_scopes_rows_to_effective_rule():
+    portfolio = {
+        "type_names": ["consignado", "pessoal"],
+        "type_codes": np.array([0, 1]),
+        "amount": np.array([100.0, 100.0]),
+        "rating": np.array([650.0, 650.0]),
+        "income": np.array([5000.0, 5000.0]),
+        "restricted": np.array([False, False]),
+        "bureau_known": np.array([True, True]),
+    }
+    rules = {"default": {"min_rating": 600}, "consignado": {"min_rating": 600}}
+    result = simulate(portfolio, rules, "default", {"min_rating": 700})
+    assert result["requests"] == 1
+    assert result["groups"][0]["credit_type"] == "pessoal"
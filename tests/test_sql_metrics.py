@@ -0,0 +1,93 @@
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+import models
+import routes
+import sql_metrics
+from sql_metrics import QueryBudgetExceeded, query_budget, statement_shape
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    sql_metrics.instrument(engine)
+    return engine
+
+
+def test_statement_shape_collapses_in_lists():
+    assert statement_shape("SELECT *\n  FROM t WHERE id IN (?, ?, ?)") == statement_shape("SELECT * FROM t WHERE id IN (?, ?)")
+    assert statement_shape("SELECT * FROM t WHERE id IN (__[POSTCOMPILE_id_1])") == "SELECT * FROM t WHERE id IN (?...)"
+
+
+def test_repeated_statements_are_flagged(engine, monkeypatch, caplog):
+    monkeypatch.setattr(sql_metrics, "SQL_REPEAT_THRESHOLD", 3)
+    stats, token = sql_metrics.start_request("/things")
+    with caplog.at_level(logging.WARNING, logger="sql_metrics"), engine.connect() as conn:
+        for i in range(5):
+            conn.execute(text("SELECT :i"), {"i": i})
+    sql_metrics.finish_request(stats, token, "/things")
+    assert stats.count == 5
+    assert stats.slowest[1] == "SELECT ?"
+    warnings = [r.getMessage() for r in caplog.records if "N+1" in r.getMessage()]
+    assert warnings == ["Possible N+1 on /things: statement ran 3 times: SELECT ?"]
+
+
+def test_slow_queries_are_logged_without_parameters(engine, monkeypatch, caplog):
+    monkeypatch.setattr(sql_metrics, "SQL_SLOW_QUERY_SECONDS", 0)
+    with caplog.at_level(logging.WARNING, logger="sql_metrics"), engine.connect() as conn:
+        conn.execute(text("SELECT :secret"), {"secret": "123.456.789-00"})
+    message = caplog.records[-1].getMessage()
+    assert "Slow query" in message and "<1 redacted>" in message
+    assert "123.456.789-00" not in message
+
+
+def test_middleware_records_queries_per_route(engine):
+    models.Base.metadata.create_all(engine)
+    from sqlalchemy.orm import sessionmaker
+
+    session = sessionmaker(bind=engine)()
+    routes.app.dependency_overrides[routes.get_read_db] = lambda: session
+    labels = {"route": "/api/v1/credit-requests/{credit_request_id}/history"}
+    before = REGISTRY.get_sample_value("db_request_queries_sum", labels) or 0
+    try:
+        assert TestClient(routes.app).get("/api/v1/credit-requests/1/history").json() == []
+    finally:
+        routes.app.dependency_overrides.clear()
+        session.close()
+    assert REGISTRY.get_sample_value("db_request_queries_sum", labels) - before == 1
+
+
+def test_middleware_counts_queries_of_streaming_responses(engine):
+    from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
+
+    app = FastAPI()
+    app.add_middleware(sql_metrics.SQLMetricsMiddleware)
+
+    @app.get("/stream/{n}")
+    def stream(n: int):
+        def rows():
+            with engine.connect() as conn:
+                for i in range(n):
+                    yield f"{conn.execute(text('SELECT :i'), {'i': i}).scalar()}\n"
+
+        return StreamingResponse(rows(), media_type="text/plain")
+
+    labels = {"route": "/stream/{n}"}
+    before = REGISTRY.get_sample_value("db_request_queries_sum", labels) or 0
+    assert TestClient(app).get("/stream/3").text == "0\n1\n2\n"
+    assert REGISTRY.get_sample_value("db_request_queries_sum", labels) - before == 3
+
+
+def test_query_budget_reports_statements(engine):
+    with pytest.raises(QueryBudgetExceeded, match="2 queries, budget was 1"):
+        with query_budget(engine, 1), engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
@@ -1,5 +1,98 @@
-from tasks import process_credit_request
+import datetime
 
-def test_process_credit_request():
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import notifications
+import tasks
+from benchmarks.stub_smtp import StubSMTPServer
+from models import Base, EmailOutbox, NotificationLog
+from notifications import queue_email
+from tasks import claim_outbox, drain_outbox, process_credit_request
+
+
+def test_process_credit_request_skips_requests_not_in_screening(db_session, monkeypatch):
+    monkeypatch.setattr(tasks, "SessionLocal", lambda: db_session)
     result = process_credit_request.run(123)
-    assert result == {"request_id": 123, "status": "processed"}
\ No newline at end of file
+    assert result == {"request_id": 123, "status": "skipped"}
+
+
+@pytest.fixture
+def db_session():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    server = StubSMTPServer(reject_recipients={"bounce@example.com"}).start()
+    monkeypatch.setattr(notifications, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(notifications, "SMTP_PORT", server.port)
+    monkeypatch.setattr(notifications, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(notifications, "SMTP_USER", "")
+    yield server
+    server.stop()
+
+
+def test_drain_outbox_sends_batch_over_one_connection(db_session, smtp_server):
+    for i in range(3):
+        queue_email(db_session, i, f"user{i}@example.com", f"Subject {i}", "Body")
+    db_session.commit()
+
+    assert drain_outbox(db_session) == {"sent": 3, "failed": 0, "dead": 0}
+    assert smtp_server.connections == 1
+    assert [m["to"] for m in smtp_server.messages] == [[f"user{i}@example.com"] for i in range(3)]
+    assert db_session.query(EmailOutbox).filter_by(status="sent").count() == 3
+    assert db_session.query(NotificationLog).filter_by(status="sent").count() == 3
+
+
+def test_drain_outbox_retries_with_backoff_then_dead_letters(db_session, smtp_server, monkeypatch):
+    monkeypatch.setattr(tasks, "OUTBOX_MAX_ATTEMPTS", 2)
+    queue_email(db_session, 1, "bounce@example.com", "Subject", "Body")
+    queue_email(db_session, 2, "ok@example.com", "Subject", "Body")
+    db_session.commit()
+
+    assert drain_outbox(db_session) == {"sent": 1, "failed": 1, "dead": 0}
+    bounced = db_session.query(EmailOutbox).filter_by(to_email="bounce@example.com").one()
+    assert bounced.status == "pending"
+    assert bounced.next_attempt_at > datetime.datetime.utcnow()
+
+    assert drain_outbox(db_session) == {"sent": 0, "failed": 0, "dead": 0}
+
+    bounced.next_attempt_at = datetime.datetime.utcnow()
+    db_session.commit()
+    assert drain_outbox(db_session) == {"sent": 0, "failed": 0, "dead": 1}
+    assert bounced.status == "dead"
+    assert db_session.query(NotificationLog).filter_by(status="dead").count() == 1
+
+
+def test_drain_outbox_reschedules_everything_when_smtp_is_down(db_session, monkeypatch):
+    monkeypatch.setattr(notifications, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(notifications, "SMTP_PORT", 1)
+    queue_email(db_session, 1, "user@example.com", "Subject", "Body")
+    db_session.commit()
+
+    assert drain_outbox(db_session) == {"sent": 0, "failed": 1, "dead": 0}
+    assert db_session.query(EmailOutbox).one().attempts == 1
+
+
+def test_outbox_claims_are_exclusive_until_released_or_stale(db_session, smtp_server, monkeypatch):
+    for i in range(4):
+        queue_email(db_session, i, f"user{i}@example.com", f"Subject {i}", "Body")
+    db_session.commit()
+    now = datetime.datetime.utcnow()
+
+    first = [m.to_email for m in claim_outbox(db_session, 2, "worker-a", now)]
+    second = [m.to_email for m in claim_outbox(db_session, 10, "worker-b", now)]
+    assert first == ["user0@example.com", "user1@example.com"]
+    assert second == ["user2@example.com", "user3@example.com"]
+    assert claim_outbox(db_session, 10, "worker-c", now) == []
+
+    assert drain_outbox(db_session, worker="worker-c") == {"sent": 0, "failed": 0, "dead": 0}
+    monkeypatch.setattr(tasks, "OUTBOX_CLAIM_TIMEOUT_SECONDS", 0)
+    assert drain_outbox(db_session, worker="worker-c") == {"sent": 4, "failed": 0, "dead": 0}
+    assert db_session.query(EmailOutbox).filter(EmailOutbox.claimed_by.isnot(None)).count() == 0
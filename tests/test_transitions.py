@@ -0,0 +1,165 @@
+import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import counters
+import models
+import transitions
+from auth import Principal
+from events import EventBus
+from models import ApprovalStatus
+from sql_metrics import query_budget
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    session.add_all([
+        models.User(id=1, username="customer", role="customer", password="x", email="customer@example.com"),
+        models.User(id=2, username="ana", role="analyst", password="x"),
+        models.User(id=3, username="max", role="manager", password="x"),
+        models.WorkflowStage(id=1, name="analyst", order=1),
+        models.WorkflowStage(id=2, name="manager", order=2),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture(autouse=True)
+def bus(monkeypatch):
+    bus = EventBus(redis_factory=lambda: None, async_redis_factory=lambda: None)
+    monkeypatch.setattr(transitions, "event_bus", bus)
+    return bus
+
+
+def _request(db, credit_type, stage_ids):
+    credit_request = models.CreditRequest(
+        user_id=1, amount=1000, credit_type=credit_type, created_at=datetime.datetime.utcnow()
+    )
+    db.add(credit_request)
+    db.flush()
+    counters.record_created(db, [(credit_request.created_at, credit_type)])
+    db.add_all([models.CreditRequestApproval(credit_request_id=credit_request.id, stage_id=stage_id)
+                for stage_id in stage_ids])
+    db.commit()
+    return credit_request.id
+
+
+ANALYST = Principal(id=2, role="analyst")
+MANAGER = Principal(id=3, role="manager")
+
+
+def test_stages_are_decided_in_order_and_last_one_advances_the_request(db, bus):
+    request_id = _request(db, "empresarial", [1, 2])
+    with pytest.raises(transitions.NoPendingApproval):
+        transitions.approve(db, request_id, MANAGER)
+
+    assert transitions.approve(db, request_id, ANALYST) == ApprovalStatus.PENDING
+    assert transitions.approve(db, request_id, MANAGER) == ApprovalStatus.APPROVED
+
+    db.expire_all()
+    assert db.get(models.CreditRequest, request_id).status == ApprovalStatus.APPROVED
+    chain = db.query(models.CreditRequestApproval).order_by(models.CreditRequestApproval.stage_id).all()
+    assert [(a.status, a.approver_id, a.version) for a in chain] == [
+        (ApprovalStatus.APPROVED, 2, 2), (ApprovalStatus.APPROVED, 3, 2),
+    ]
+    assert [a.action for a in db.query(models.AuditLog)] == ["approve", "approve"]
+    assert counters.summary(db)["approved"] == 1
+    outbox = db.query(models.EmailOutbox).one()
+    assert (outbox.user_id, outbox.to_email, outbox.status) == (1, "customer@example.com", "pending")
+    assert str(request_id) in outbox.subject
+    assert [(event["type"], event["stage"], event["actor_id"]) for _, event in bus._local] == [
+        ("stage_approved", "analyst", 2), ("stage_approved", "manager", 3), ("request_approved", "manager", 3),
+    ]
+    with pytest.raises(transitions.NoPendingApproval):
+        transitions.approve(db, request_id, MANAGER)
+
+
+def test_rejection_closes_the_request_and_cancels_later_stages(db):
+    request_id = _request(db, "empresarial", [1, 2])
+    assert transitions.reject(db, request_id, ANALYST, "Low score") == ApprovalStatus.REJECTED
+
+    db.expire_all()
+    assert db.get(models.CreditRequest, request_id).status == ApprovalStatus.REJECTED
+    chain = db.query(models.CreditRequestApproval).order_by(models.CreditRequestApproval.stage_id).all()
+    assert [a.status for a in chain] == [ApprovalStatus.REJECTED, ApprovalStatus.CANCELLED]
+    assert chain[0].rejection_reason == "Low score"
+    assert counters.summary(db)["rejected"] == 1
+    assert [(m.to_email, "Low score" in m.body) for m in db.query(models.EmailOutbox)] == [
+        ("customer@example.com", True)
+    ]
+    with pytest.raises(transitions.NoPendingApproval):
+        transitions.approve(db, request_id, MANAGER)
+
+
+def test_customers_who_opted_out_get_no_email(db):
+    db.get(models.User, 1).notify_email = False
+    db.commit()
+    transitions.reject(db, _request(db, "pessoal", [1]), ANALYST, "Low score")
+    assert db.query(models.EmailOutbox).count() == 0
+
+
+def test_stale_version_loses_without_double_approval(db, monkeypatch):
+    request_id = _request(db, "pessoal", [1])
+    stale = transitions.current_stages(db, [request_id])
+    db.rollback()
+    assert transitions.approve(db, request_id, ANALYST) == ApprovalStatus.APPROVED
+
+    monkeypatch.setattr(transitions, "current_stages", lambda db, credit_request_ids: stale)
+    with pytest.raises(transitions.TransitionConflict):
+        transitions.approve(db, request_id, Principal(id=3, role="analyst"))
+
+    approval = db.query(models.CreditRequestApproval).one()
+    assert (approval.approver_id, approval.version) == (2, 2)
+    assert db.query(models.AuditLog).count() == 1
+    assert counters.summary(db)["approved"] == 1
+
+
+def test_statement_count_does_not_depend_on_chain_length(db):
+    db.add(models.WorkflowStage(id=3, name="director", order=3))
+    db.commit()
+    short = _request(db, "pessoal", [1])
+    long = _request(db, "consignado", [1, 2, 3])
+
+    with query_budget(db.get_bind(), 7) as final_statements:
+        transitions.approve(db, short, ANALYST)
+    with query_budget(db.get_bind(), 3) as intermediate_statements:
+        transitions.approve(db, long, ANALYST)
+    assert len(final_statements) == 7
+    assert len(intermediate_statements) == 3
+
+
+def test_decide_many_reports_each_request(db):
+    closable = _request(db, "pessoal", [1])
+    longer = _request(db, "empresarial", [1, 2])
+    waiting_on_manager = _request(db, "empresarial", [1, 2])
+    transitions.approve(db, waiting_on_manager, ANALYST)
+
+    outcomes = transitions.decide_many(
+        db, [closable, longer, waiting_on_manager, 999, closable], ANALYST, ApprovalStatus.APPROVED
+    )
+
+    assert outcomes == {
+        closable: "approved", longer: "advanced", waiting_on_manager: "no_pending_approval", 999: "no_pending_approval",
+    }
+    assert counters.summary(db)["approved"] == 1
+
+
+def test_decide_many_statement_count_is_independent_of_batch_size(db):
+    one = [_request(db, "pessoal", [1])]
+    many = [_request(db, "pessoal", [1]) for _ in range(50)]
+
+    with query_budget(db.get_bind(), 8) as single:
+        transitions.decide_many(db, one, ANALYST, ApprovalStatus.REJECTED, reason="no")
+    with query_budget(db.get_bind(), 8) as batch:
+        outcomes = transitions.decide_many(db, many, ANALYST, ApprovalStatus.REJECTED, reason="no")
+    assert len(batch) == len(single)
+    assert set(outcomes.values()) == {"rejected"}
+    assert db.query(models.AuditLog).filter_by(action="reject").count() == 51
+    assert counters.summary(db)["rejected"] == 51
@@ -0,0 +1,50 @@
+import pytest
+
+import models
+import transitions
+from auth import Principal
+
+
+@pytest.fixture
+def client(client, session):
+    session.add_all([
+        models.User(id=1, username="bob", role="customer", password="x"),
+        models.WorkflowStage(name="analyst", order=1),
+        models.WorkflowStage(name="manager", order=2),
+    ])
+    session.commit()
+    return client, session
+
+
+def test_queue_lists_only_actionable_stages_for_the_role(client, login, persist_credit_request):
+    client, session = client
+    personal = persist_credit_request(1, 100, "pessoal", None, None).id
+    business = persist_credit_request(1, 200, "empresarial", None, None).id
+    escalated = persist_credit_request(1, 300, "empresarial", None, None).id
+    rejected = persist_credit_request(1, 400, "empresarial", None, None).id
+    transitions.approve(session, escalated, Principal(id=2, role="analyst"))
+    transitions.reject(session, rejected, Principal(id=2, role="analyst"), "no")
+
+    login(2, "analyst")
+    analyst_queue = client.get("/api/v1/work-queue").json()
+    assert [item["credit_request_id"] for item in analyst_queue] == [personal, business]
+    assert analyst_queue[0]["stage"] == "analyst"
+
+    login(2, "manager")
+    assert [item["credit_request_id"] for item in client.get("/api/v1/work-queue").json()] == [escalated]
+
+
+def test_queue_pages_with_cursor(client, login, persist_credit_request):
+    client, session = client
+    ids = [persist_credit_request(1, 100 + i, "pessoal", None, None).id for i in range(5)]
+    login(2, "analyst")
+
+    seen, cursor = [], None
+    while True:
+        response = client.get("/api/v1/work-queue", params={"limit": 2, **({"cursor": cursor} if cursor else {})})
+        seen += [item["credit_request_id"] for item in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == ids
+    assert client.get("/api/v1/work-queue", params={"cursor": "garbage"}).status_code == 400
@@ -0,0 +1,204 @@
+"""Approval state transitions.
+
+Stages are worked in order: only the first pending stage of a request can be
+decided, by a user whose role matches the stage name. The decision is a
+conditional UPDATE on the approval's version, so of two concurrent approvers
+exactly one wins and the other gets a conflict; nobody holds a lock between
+the read and the write. The winner also moves the request to APPROVED (last
+stage) or REJECTED, cancels the stages a rejection leaves undecided, updates
+the dashboard counters, queues the customer email and writes the audit entry,
+all in one transaction. Every step is set-based,
+so deciding 500 requests issues the same statements as deciding one. After
+the commit, stage and request events go out on the event bus for streaming
+clients; async callers pass an `events` list instead and publish it
+themselves, so the sync Redis client never runs on the event loop.
+"""
+import datetime
+
+from sqlalchemy import func, insert, select, tuple_, update
+from sqlalchemy.orm import aliased
+
+import counters
+import models
+from audit import audit_entries
+from events import event_bus
+from models import ApprovalStatus
+from notifications import email_address, queue_emails
+from utils import get_email_template
+
+
+class NoPendingApproval(Exception):
+    pass
+
+
+class TransitionConflict(Exception):
+    pass
+
+
+NO_PENDING_APPROVAL = "no_pending_approval"
+CONFLICT = "conflict"
+ADVANCED = "advanced"
+
+
+def current_stages(db, credit_request_ids):
+    """First pending approval of each still-pending request, with its stage name, the request's columns,
+    its owner and how many of its approvals are pending."""
+    Approval = models.CreditRequestApproval
+    ranked = (
+        select(
+            Approval.id, Approval.version, Approval.credit_request_id, models.WorkflowStage.name.label("stage"),
+            func.row_number().over(
+                partition_by=Approval.credit_request_id, order_by=models.WorkflowStage.order
+            ).label("position"),
+            func.count().over(partition_by=Approval.credit_request_id).label("pending"),
+        )
+        .join(models.WorkflowStage, Approval.stage_id == models.WorkflowStage.id)
+        .where(Approval.credit_request_id.in_(credit_request_ids), Approval.status == ApprovalStatus.PENDING)
+        .subquery()
+    )
+    return db.execute(
+        select(
+            ranked.c.id, ranked.c.version, ranked.c.credit_request_id, ranked.c.stage, ranked.c.pending,
+            models.CreditRequest.status, models.CreditRequest.created_at, models.CreditRequest.credit_type,
+            models.User,
+        )
+        .join(models.CreditRequest, ranked.c.credit_request_id == models.CreditRequest.id)
+        .join(models.User, models.CreditRequest.user_id == models.User.id)
+        .where(ranked.c.position == 1, models.CreditRequest.status == ApprovalStatus.PENDING)
+    ).all()
+
+
+def work_queue(db, stage):
+    """Query for the approvals of `stage` (a WorkflowStage) that can be acted on now: pending, with
+    no earlier stage of the same request still pending, on a request that is still pending."""
+    Approval = models.CreditRequestApproval
+    earlier = aliased(models.CreditRequestApproval)
+    earlier_stage = aliased(models.WorkflowStage)
+    blocked = (
+        select(earlier.id)
+        .join(earlier_stage, earlier.stage_id == earlier_stage.id)
+        .where(
+            earlier.credit_request_id == Approval.credit_request_id,
+            earlier.status == ApprovalStatus.PENDING,
+            earlier_stage.order < stage.order,
+        )
+        .exists()
+    )
+    return (
+        db.query(
+            Approval.id, Approval.credit_request_id, models.CreditRequest.user_id, models.CreditRequest.amount,
+            models.CreditRequest.credit_type, models.CreditRequest.created_at,
+        )
+        .join(models.CreditRequest, Approval.credit_request_id == models.CreditRequest.id)
+        .filter(
+            Approval.stage_id == stage.id,
+            Approval.status == ApprovalStatus.PENDING,
+            models.CreditRequest.status == ApprovalStatus.PENDING,
+            ~blocked,
+        )
+    )
+
+
+def decide_many(db, credit_request_ids, actor, decision, reason=None, ip=None, events=None):
+    """Applies one decision as `actor` to many requests in one transaction; returns {credit_request_id: outcome}.
+
+    The outcome is "approved" or "rejected" when the request was closed, "advanced" when an
+    earlier stage of a longer chain was approved, "no_pending_approval" when no stage is
+    waiting on the actor's role and "conflict" when another approver decided it first.
+    The resulting events are appended to `events` when it is given, and published otherwise.
+    """
+    ids = list(dict.fromkeys(credit_request_ids))
+    outcomes = dict.fromkeys(ids, NO_PENDING_APPROVAL)
+    stages = {row.credit_request_id: row for row in current_stages(db, ids) if row.stage == actor.role}
+    if not stages:
+        db.rollback()
+        return outcomes
+    now = datetime.datetime.utcnow()
+    Approval = models.CreditRequestApproval
+    won = set(db.scalars(
+        update(Approval)
+        .where(
+            tuple_(Approval.id, Approval.version).in_([(stage.id, stage.version) for stage in stages.values()]),
+            Approval.status == ApprovalStatus.PENDING,
+        )
+        .values(status=decision, approver_id=actor.id, reviewed_at=now, rejection_reason=reason,
+                version=Approval.version + 1)
+        .returning(Approval.credit_request_id)
+        .execution_options(synchronize_session=False)
+    ))
+    for credit_request_id in stages.keys() - won:
+        outcomes[credit_request_id] = CONFLICT
+    if not won:
+        db.rollback()
+        return outcomes
+
+    closed = [stages[i] for i in won if decision == ApprovalStatus.REJECTED or stages[i].pending == 1]
+    if closed:
+        db.execute(
+            update(models.CreditRequest)
+            .where(models.CreditRequest.id.in_([stage.credit_request_id for stage in closed]),
+                   models.CreditRequest.status == ApprovalStatus.PENDING)
+            .values(status=decision)
+            .execution_options(synchronize_session=False)
+        )
+        if decision == ApprovalStatus.REJECTED:
+            db.execute(
+                update(Approval)
+                .where(Approval.credit_request_id.in_([stage.credit_request_id for stage in closed]),
+                       Approval.status == ApprovalStatus.PENDING)
+                .values(status=ApprovalStatus.CANCELLED, version=Approval.version + 1)
+                .execution_options(synchronize_session=False)
+            )
+        counters.record_transitions(db, closed, ApprovalStatus.PENDING, decision)
+        emails = []
+        for stage in closed:
+            template = get_email_template(decision.value, stage.credit_request_id, reason=reason)
+            emails.append((stage.User.id, email_address(stage.User), template["subject"], template["body"]))
+        queue_emails(db, emails)
+
+    action = "approve" if decision == ApprovalStatus.APPROVED else "reject"
+    details = "Stage approved" if action == "approve" else f"Reason: {reason}"
+    db.execute(insert(models.AuditLog), [
+        {"user_id": actor.id, "action": action, "credit_request_id": credit_request_id, "timestamp": now,
+         "ip": ip, "details": details}
+        for credit_request_id in sorted(won)
+    ])
+    decided_events = _events([stages[i] for i in sorted(won)], closed, actor, decision, now)
+    db.commit()
+    audit_entries.labels("strict").inc(len(won))
+    for credit_request_id in won:
+        outcomes[credit_request_id] = ADVANCED
+    for stage in closed:
+        outcomes[stage.credit_request_id] = decision.value
+    if events is None:
+        event_bus.publish_many(decided_events)
+    else:
+        events.extend(decided_events)
+    return outcomes
+
+
+def _events(decided, closed, actor, decision, now):
+    def event(kind, stage):
+        return {"type": kind, "credit_request_id": stage.credit_request_id, "user_id": stage.User.id,
+                "stage": stage.stage, "actor_id": actor.id, "at": now.isoformat()}
+
+    return ([event(f"stage_{decision.value}", stage) for stage in decided]
+            + [event(f"request_{decision.value}", stage) for stage in closed])
+
+
+def decide(db, credit_request_id, actor, decision, reason=None, ip=None, events=None):
+    """decide_many for one request; returns the request's status afterwards."""
+    outcome = decide_many(db, [credit_request_id], actor, decision, reason=reason, ip=ip, events=events)[credit_request_id]
+    if outcome == NO_PENDING_APPROVAL:
+        raise NoPendingApproval(credit_request_id)
+    if outcome == CONFLICT:
+        raise TransitionConflict(credit_request_id)
+    return decision if outcome == decision.value else ApprovalStatus.PENDING
+
+
+def approve(db, credit_request_id, actor, ip=None, events=None):
+    return decide(db, credit_request_id, actor, ApprovalStatus.APPROVED, ip=ip, events=events)
+
+
+def reject(db, credit_request_id, actor, reason, ip=None, events=None):
+    return decide(db, credit_request_id, actor, ApprovalStatus.REJECTED, reason=reason, ip=ip, events=events)